@@ -95,7 +95,7 @@ def lister_vehicules(user_id: int) -> str:
     from vehicles.models import Vehicle
     vehicules = list(
         Vehicle.objects.filter(owner_id=user_id).values(
-            'id', 'make', 'model', 'year', 'mileage', 'fuel_type',
+            'id', 'make', 'model', 'year', 'current_mileage', 'fuel_type',
             'license_plate', 'color', 'transmission',
         )
     )
@@ -105,7 +105,7 @@ def lister_vehicules(user_id: int) -> str:
     for v in vehicules:
         lines.append(
             f"- [ID:{v['id']}] {v['make']} {v['model']} ({v['year']}) | "
-            f"{v.get('mileage') or 'N/A'} km | {v.get('fuel_type') or 'N/A'} | "
+            f"{v.get('current_mileage') or 'N/A'} km | {v.get('fuel_type') or 'N/A'} | "
             f"Boîte : {v.get('transmission') or 'N/A'} | "
             f"Plaque : {v.get('license_plate') or 'N/A'} | "
             f"Couleur : {v.get('color') or 'N/A'}"
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from urllib.parse import urlparse, parse_qsl
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 import os
 from dotenv import load_dotenv
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -285,6 +286,23 @@ EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
 GEP_API_KEY = config('GEP_API_KEY', default='')
 AGENT_MODEL = config('AGENT_MODEL', default='anthropic.claude-sonnet-4-6')
 
+# Cache (Redis when configured, per-process memory otherwise)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'autotrack',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Celery Settings
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
@@ -292,6 +310,8 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Processes per worker (None => cores); also sizes the per-process OCR pool
+CELERY_WORKER_CONCURRENCY = config('CELERY_WORKER_CONCURRENCY', default=0, cast=int) or None
 
 # Celery Beat Schedule (Tâches périodiques)
 from celery.schedules import crontab
@@ -322,11 +342,121 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'users.cleanup_inactive_sessions',
         'schedule': crontab(hour=1, minute=0),
     },
+    # Envoyer les rappels de réservation (J-1) tous les jours à 10h
+    'send-booking-reminders': {
+        'task': 'bookings.tasks.send_daily_reminders',
+        'schedule': crontab(hour=10, minute=0),
+    },
+    # Matérialiser l'inventaire des créneaux de réservation tous les jours à 0h30
+    'materialize-slot-inventory': {
+        'task': 'bookings.tasks.materialize_slot_inventory',
+        'schedule': crontab(hour=0, minute=30),
+    },
+    # Purger le cache d'analyse des documents tous les dimanches à 3h30
+    'prune-document-analysis-cache': {
+        'task': 'documents.tasks.prune_analysis_cache',
+        'schedule': crontab(hour=3, minute=30, day_of_week=0),
+    },
+    # Abandonner les envois de documents par morceaux expirés toutes les heures
+    'prune-stale-document-uploads': {
+        'task': 'documents.tasks.prune_stale_uploads',
+        'schedule': crontab(minute=15),
+    },
+    # Réconcilier les compteurs de stockage des documents tous les jours à 4h
+    'reconcile-document-storage-usage': {
+        'task': 'documents.tasks.reconcile_storage_usage',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    # Réconcilier les compteurs de notes des garages tous les jours à 2h
+    'reconcile-garage-ratings': {
+        'task': 'garages.tasks.reconcile_garage_ratings',
+        'schedule': crontab(hour=2, minute=0),
+    },
 }
 
 # File Upload Settings
 MAX_UPLOAD_SIZE = config('MAX_UPLOAD_SIZE', default=10485760, cast=int)  # 10MB
 
+# Report downloads - offload file transfer to the front proxy
+# '' (serve from Django), 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile)
+REPORTS_SENDFILE_BACKEND = config('REPORTS_SENDFILE_BACKEND', default='')
+# Filesystem root exposed by the nginx internal location, and its URL prefix
+REPORTS_SENDFILE_ROOT = BASE_DIR / config('REPORTS_SENDFILE_ROOT', default=str(MEDIA_ROOT))
+REPORTS_SENDFILE_URL = config('REPORTS_SENDFILE_URL', default='/protected/')
+
+# Maximum number of vehicles in a single batch report
+REPORTS_BATCH_MAX_VEHICLES = config('REPORTS_BATCH_MAX_VEHICLES', default=500, cast=int)
+
+# Serve search_nearby from the per-process NumPy garage index instead of SQL
+# (off by default without a shared cache: garage writes could not reach the
+# other processes), and seconds after which an index is reloaded regardless
+GARAGES_GEO_INDEX_ENABLED = config('GARAGES_GEO_INDEX_ENABLED', default=bool(REDIS_URL), cast=bool)
+GARAGES_GEO_INDEX_MAX_AGE = config('GARAGES_GEO_INDEX_MAX_AGE', default=300, cast=int)
+
+# Serve the car brand / model catalog from a per-process response cache
+# (off by default without a shared cache: catalog writes could not reach the
+# other processes), and seconds after which its entries are dropped regardless
+VEHICLES_CATALOG_CACHE_ENABLED = config('VEHICLES_CATALOG_CACHE_ENABLED', default=bool(REDIS_URL), cast=bool)
+VEHICLES_CATALOG_CACHE_MAX_AGE = config('VEHICLES_CATALOG_CACHE_MAX_AGE', default=300, cast=int)
+
+# Odometer: readings of the last N days feed the vehicle's km/day rate
+VEHICLES_ODOMETER_RATE_WINDOW_DAYS = config('VEHICLES_ODOMETER_RATE_WINDOW_DAYS', default=365, cast=int)
+
+# Text search configuration of the garage full-text index
+GARAGES_SEARCH_CONFIG = config('GARAGES_SEARCH_CONFIG', default='french')
+
+# Garage specialty facet counts cache lifetime (seconds); invalidated on writes
+GARAGES_FACETS_CACHE_TIMEOUT = config('GARAGES_FACETS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Public garage catalog caching: server-side response cache lifetime and
+# Cache-Control max-age for clients / shared caches (seconds)
+GARAGES_RESPONSE_CACHE_TIMEOUT = config('GARAGES_RESPONSE_CACHE_TIMEOUT', default=600, cast=int)
+GARAGES_HTTP_MAX_AGE = config('GARAGES_HTTP_MAX_AGE', default=60, cast=int)
+GARAGES_HTTP_SHARED_MAX_AGE = config('GARAGES_HTTP_SHARED_MAX_AGE', default=300, cast=int)
+
+# Booking horizon: number of days of slot inventory materialized ahead
+BOOKINGS_SLOT_INVENTORY_DAYS = config('BOOKINGS_SLOT_INVENTORY_DAYS', default=60, cast=int)
+
+# Booking reminder emails: messages per SMTP connection, retries of failed sends
+BOOKINGS_EMAIL_BATCH_SIZE = config('BOOKINGS_EMAIL_BATCH_SIZE', default=100, cast=int)
+BOOKINGS_EMAIL_MAX_RETRIES = config('BOOKINGS_EMAIL_MAX_RETRIES', default=3, cast=int)
+BOOKINGS_EMAIL_RETRY_DELAY = config('BOOKINGS_EMAIL_RETRY_DELAY', default=300, cast=int)  # seconds
+
+# Booking statistics cache lifetime (seconds); entries are also invalidated on writes
+BOOKINGS_STATS_CACHE_TIMEOUT = config('BOOKINGS_STATS_CACHE_TIMEOUT', default=300, cast=int)
+
+# Document OCR: concurrent tesseract processes per worker process
+# (0 => available cores / CELERY_WORKER_CONCURRENCY, i.e. 1 when the
+# concurrency is unset), and band height (px)
+# above which a page is split across the pool
+DOCUMENTS_OCR_MAX_WORKERS = config('DOCUMENTS_OCR_MAX_WORKERS', default=0, cast=int)
+DOCUMENTS_OCR_TILE_HEIGHT = config('DOCUMENTS_OCR_TILE_HEIGHT', default=1600, cast=int)
+# Pages are downscaled to this resolution before OCR; PDF pages whose text
+# layer has fewer characters are treated as scanned and OCR'd
+DOCUMENTS_OCR_TARGET_DPI = config('DOCUMENTS_OCR_TARGET_DPI', default=300, cast=int)
+DOCUMENTS_PDF_MIN_TEXT_CHARS = config('DOCUMENTS_PDF_MIN_TEXT_CHARS', default=20, cast=int)
+
+# Batch document analysis: parallel analyses per user, time allowed per
+# document of a lane before a stuck batch is closed (seconds, retries
+# included), and retries of a failed analysis (delay doubled at each attempt, seconds)
+DOCUMENTS_BATCH_USER_CONCURRENCY = config('DOCUMENTS_BATCH_USER_CONCURRENCY', default=4, cast=int)
+DOCUMENTS_BATCH_DOCUMENT_TIMEOUT = config('DOCUMENTS_BATCH_DOCUMENT_TIMEOUT', default=900, cast=int)
+DOCUMENTS_ANALYSIS_MAX_RETRIES = config('DOCUMENTS_ANALYSIS_MAX_RETRIES', default=3, cast=int)
+DOCUMENTS_ANALYSIS_RETRY_DELAY = config('DOCUMENTS_ANALYSIS_RETRY_DELAY', default=30, cast=int)
+
+# Text search configurations of the document full-text index (OCR text is
+# indexed once per configuration, queries match any of them)
+DOCUMENTS_SEARCH_CONFIGS = config('DOCUMENTS_SEARCH_CONFIGS', default='french,english', cast=Csv())
+
+# Chunked document uploads: maximum file and chunk sizes (bytes), and hours
+# after which an unfinished upload and its chunks are discarded
+DOCUMENTS_UPLOAD_MAX_SIZE = config('DOCUMENTS_UPLOAD_MAX_SIZE', default=100 * 1024 * 1024, cast=int)
+DOCUMENTS_UPLOAD_CHUNK_MAX_SIZE = config('DOCUMENTS_UPLOAD_CHUNK_MAX_SIZE', default=5 * 1024 * 1024, cast=int)
+DOCUMENTS_UPLOAD_EXPIRY_HOURS = config('DOCUMENTS_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Storage quota per user for documents (bytes, 0 => unlimited)
+DOCUMENTS_USER_STORAGE_QUOTA = config('DOCUMENTS_USER_STORAGE_QUOTA', default=0, cast=int)
+
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
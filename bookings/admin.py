@@ -3,7 +3,7 @@ Admin configuration for bookings
 """
 
 from django.contrib import admin
-from .models import GarageService, GarageAvailability, Booking, BookingReview
+from .models import GarageService, GarageAvailability, Booking, BookingReview, SlotInventory
 
 
 @admin.register(GarageService)
@@ -37,6 +37,15 @@ class GarageAvailabilityAdmin(admin.ModelAdmin):
     weekday_display.short_description = 'Jour'
 
 
+@admin.register(SlotInventory)
+class SlotInventoryAdmin(admin.ModelAdmin):
+    list_display = ['garage', 'slot_date', 'slot_time', 'reserved', 'capacity']
+    list_filter = ['slot_date', 'garage']
+    search_fields = ['garage__name']
+    readonly_fields = ['id', 'updated_at']
+    date_hierarchy = 'slot_date'
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = [
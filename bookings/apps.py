@@ -9,3 +9,6 @@ class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
     verbose_name = 'Réservations Garages'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
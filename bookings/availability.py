@@ -0,0 +1,269 @@
+"""
+Slot availability for garage bookings
+
+Bookable capacity is materialized in SlotInventory from GarageAvailability
+for the booking horizon. Reading availability is a single indexed range
+scan and reserving a spot is a single conditional UPDATE.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from .models import GarageAvailability, Booking, SlotInventory
+
+
+# Bookings that occupy a slot
+ACTIVE_BOOKING_STATUSES = Booking.ACTIVE_STATUSES
+
+# Slot granularity
+SLOT_INTERVAL_MINUTES = 30
+
+# Maximum number of days returned by a single availability request
+MAX_SLOT_RANGE_DAYS = 31
+
+
+def iter_slot_times(start_time, end_time, interval=SLOT_INTERVAL_MINUTES):
+    """Yield slot start times between start_time (inclusive) and end_time (exclusive)"""
+    current = datetime.combine(datetime.min.date(), start_time)
+    end = datetime.combine(datetime.min.date(), end_time)
+    step = timedelta(minutes=interval)
+
+    while current < end:
+        yield current.time()
+        current += step
+
+
+def get_booked_counts(garage_ids, date_from, date_to):
+    """
+    Count active bookings per (garage, date, time) in a single grouped query
+
+    Returns a dict keyed by (garage_id, booking_date, booking_time).
+    """
+    rows = (
+        Booking.objects.filter(
+            garage_id__in=garage_ids,
+            booking_date__gte=date_from,
+            booking_date__lte=date_to,
+            status__in=ACTIVE_BOOKING_STATUSES
+        )
+        .values('garage_id', 'booking_date', 'booking_time')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return {
+        (row['garage_id'], row['booking_date'], row['booking_time']): row['count']
+        for row in rows
+    }
+
+
+def materialize_slot_inventory(garage_ids=None, date_from=None, days=None):
+    """
+    Create or refresh SlotInventory rows from GarageAvailability
+
+    New rows start with the number of active bookings already in that slot;
+    existing rows only get their capacity updated so concurrent reservations
+    are never overwritten. Slots that no longer exist are removed when empty
+    and closed (capacity 0) otherwise.
+
+    Returns the number of slots in the refreshed range.
+    """
+    date_from = date_from or timezone.now().date()
+    days = days or settings.BOOKINGS_SLOT_INVENTORY_DAYS
+    date_to = date_from + timedelta(days=days - 1)
+
+    availabilities = GarageAvailability.objects.filter(is_active=True)
+    if garage_ids is not None:
+        garage_ids = list(garage_ids)
+        availabilities = availabilities.filter(garage_id__in=garage_ids)
+
+    windows = defaultdict(list)
+    for availability in availabilities:
+        windows[availability.weekday].append(availability)
+
+    scope_ids = garage_ids if garage_ids is not None else list(
+        {a.garage_id for day_windows in windows.values() for a in day_windows}
+    )
+    booked = get_booked_counts(scope_ids, date_from, date_to)
+
+    slots = {}
+    day = date_from
+    while day <= date_to:
+        for availability in windows.get(day.weekday(), []):
+            for slot_time in iter_slot_times(availability.start_time, availability.end_time):
+                key = (availability.garage_id, day, slot_time)
+                slots[key] = SlotInventory(
+                    garage_id=availability.garage_id,
+                    slot_date=day,
+                    slot_time=slot_time,
+                    capacity=availability.max_bookings_per_slot,
+                    reserved=booked.get(key, 0)
+                )
+        day += timedelta(days=1)
+
+    SlotInventory.objects.bulk_create(
+        slots.values(),
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['garage', 'slot_date', 'slot_time'],
+        update_fields=['capacity', 'updated_at']
+    )
+
+    # Close slots removed from the availability windows
+    existing = SlotInventory.objects.filter(slot_date__gte=date_from, slot_date__lte=date_to)
+    if garage_ids is not None:
+        existing = existing.filter(garage_id__in=garage_ids)
+    stale_ids = [
+        row['id'] for row in existing.values('id', 'garage_id', 'slot_date', 'slot_time')
+        if (row['garage_id'], row['slot_date'], row['slot_time']) not in slots
+    ]
+    if stale_ids:
+        stale = SlotInventory.objects.filter(id__in=stale_ids)
+        stale.filter(reserved=0).delete()
+        stale.update(capacity=0)
+
+    return len(slots)
+
+
+def reserve_slot(garage_id, slot_date, slot_time):
+    """
+    Take one spot in a slot, race-free
+
+    Slots beyond the materialized horizon are materialized on demand for that
+    garage and day before retrying once.
+    """
+    if SlotInventory.reserve(garage_id, slot_date, slot_time):
+        return True
+
+    slot_exists = SlotInventory.objects.filter(
+        garage_id=garage_id,
+        slot_date=slot_date,
+        slot_time=slot_time
+    ).exists()
+    if slot_exists or slot_date < timezone.now().date():
+        return False
+
+    materialize_slot_inventory([garage_id], date_from=slot_date, days=1)
+    return SlotInventory.reserve(garage_id, slot_date, slot_time)
+
+
+def compute_available_slots(garage_ids, date_from, date_to=None, not_before=None,
+                            time_from=None, time_to=None):
+    """
+    List the open slots of several garages over a date range
+
+    A single indexed range scan over SlotInventory. Slots are returned
+    ordered by date, garage and time. ``not_before`` (a datetime) drops slots
+    that already started; ``time_from``/``time_to`` restrict the time of day.
+    """
+    date_to = date_to or date_from
+
+    rows = SlotInventory.objects.filter(
+        garage_id__in=list(garage_ids),
+        slot_date__gte=date_from,
+        slot_date__lte=date_to,
+        reserved__lt=F('capacity')
+    )
+    if not_before is not None:
+        rows = rows.filter(
+            Q(slot_date__gt=not_before.date()) |
+            Q(slot_date=not_before.date(), slot_time__gte=not_before.time())
+        )
+    if time_from is not None:
+        rows = rows.filter(slot_time__gte=time_from)
+    if time_to is not None:
+        rows = rows.filter(slot_time__lt=time_to)
+
+    rows = (
+        rows.order_by('slot_date', 'garage_id', 'slot_time')
+        .values_list('garage_id', 'slot_date', 'slot_time', 'capacity', 'reserved')
+    )
+
+    return [
+        {
+            'date': slot_date,
+            'time': slot_time,
+            'available_spots': capacity - reserved,
+            'garage_id': garage_id
+        }
+        for garage_id, slot_date, slot_time, capacity, reserved in rows
+    ]
+
+
+def find_earliest_slots_nearby(lat, lng, radius_km, date_from, date_to, category=None,
+                               not_before=None, time_from=None, time_to=None,
+                               order='time', limit=10, slots_per_garage=3):
+    """
+    Earliest open slots of the garages around a location
+
+    One bounding-box query for the candidate garages, one range scan
+    over the slot inventory for all of them and one query for the matching
+    services - independent of the number of garages. Garages are ranked by
+    earliest slot then distance (order='time'), or by distance then
+    earliest slot (order='distance').
+    """
+    from garages.models import Garage
+    from garages.geo import garages_within_radius
+    from .models import GarageService
+
+    candidates = Garage.objects.all()
+    if category:
+        candidates = candidates.filter(
+            services__category=category,
+            services__is_active=True
+        ).distinct()
+
+    nearby = garages_within_radius(candidates, lat, lng, radius_km)
+    if not nearby:
+        return []
+
+    garage_ids = [garage.id for garage, _ in nearby]
+
+    slots_by_garage = defaultdict(list)
+    for slot in compute_available_slots(
+        garage_ids, date_from, date_to,
+        not_before=not_before, time_from=time_from, time_to=time_to
+    ):
+        garage_slots = slots_by_garage[slot['garage_id']]
+        if len(garage_slots) < slots_per_garage:
+            garage_slots.append(slot)
+
+    services = {}
+    if category:
+        for service in GarageService.objects.filter(
+            garage_id__in=garage_ids,
+            category=category,
+            is_active=True
+        ).order_by('-price'):
+            # Cheapest service of the category wins
+            services[service.garage_id] = service
+
+    results = []
+    for garage, distance in nearby:
+        garage_slots = slots_by_garage.get(garage.id)
+        if not garage_slots:
+            continue
+        first = garage_slots[0]
+        service = services.get(garage.id)
+        results.append({
+            'garage_id': garage.id,
+            'garage_name': garage.name,
+            'garage_address': garage.address,
+            'garage_city': garage.city,
+            'garage_phone': garage.phone,
+            'average_rating': garage.average_rating,
+            'distance_km': round(distance, 2),
+            'service_id': service.id if service else None,
+            'service_name': service.name if service else None,
+            'service_price': service.price if service else None,
+            'earliest_slot': datetime.combine(first['date'], first['time']),
+            'slots': garage_slots,
+        })
+
+    if order == 'distance':
+        results.sort(key=lambda r: (r['distance_km'], r['earliest_slot']))
+    else:
+        results.sort(key=lambda r: (r['earliest_slot'], r['distance_km']))
+
+    return results[:limit]
@@ -1,7 +1,8 @@
 from datetime import timedelta, time
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from bookings.models import GarageService, GarageAvailability, Booking, BookingReview
+from bookings.models import GarageService, GarageAvailability, Booking, BookingReview, SlotInventory
+from bookings.availability import materialize_slot_inventory
 from garages.models import Garage
 from users.models import User
 from vehicles.models import Vehicle
@@ -15,6 +16,7 @@ class Command(BaseCommand):
         GarageAvailability.objects.all().delete()
         BookingReview.objects.all().delete()
         Booking.objects.all().delete()
+        SlotInventory.objects.all().delete()
         self.stdout.write('Bookings tables cleared')
 
         garages = list(Garage.objects.all())
@@ -206,6 +208,9 @@ class Command(BaseCommand):
 
         self.stdout.write(f'  ✓ Created {len(bookings_data)} bookings')
 
+        slots_created = materialize_slot_inventory()
+        self.stdout.write(f'  ✓ Materialized {slots_created} inventory slots')
+
         self.stdout.write(self.style.SUCCESS('\n✅ Successfully created bookings data:'))
         self.stdout.write(f'   • {len(created_services)} services')
         self.stdout.write(f'   • {availabilities_created} availability slots')
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:29
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+        ('garages', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotInventory',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('slot_date', models.DateField()),
+                ('slot_time', models.TimeField()),
+                ('capacity', models.IntegerField(default=0)),
+                ('reserved', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('garage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_inventory', to='garages.garage')),
+            ],
+            options={
+                'verbose_name': 'Inventaire Créneau',
+                'verbose_name_plural': 'Inventaire Créneaux',
+                'ordering': ['slot_date', 'slot_time'],
+                'indexes': [models.Index(fields=['slot_date', 'garage'], name='bookings_sl_slot_da_14a929_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('reserved__gte', 0)), name='slot_inventory_reserved_gte_0')],
+                'unique_together': {('garage', 'slot_date', 'slot_time')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+ACTIVE_STATUSES = ['pending', 'confirmed', 'in_progress']
+SLOT_INTERVAL_MINUTES = 30
+
+
+def backfill_slot_inventory(apps, schema_editor):
+    """
+    Materialize the booking horizon right away, counting the active bookings
+    already taken, so availability does not read an empty inventory until the
+    nightly materialize_slot_inventory run. Existing rows are left untouched.
+    """
+    GarageAvailability = apps.get_model('bookings', 'GarageAvailability')
+    Booking = apps.get_model('bookings', 'Booking')
+    SlotInventory = apps.get_model('bookings', 'SlotInventory')
+
+    date_from = date.today()
+    date_to = date_from + timedelta(days=settings.BOOKINGS_SLOT_INVENTORY_DAYS - 1)
+
+    booked = Counter({
+        (row['garage_id'], row['booking_date'], row['booking_time']): row['count']
+        for row in Booking.objects.filter(
+            booking_date__gte=date_from,
+            booking_date__lte=date_to,
+            status__in=ACTIVE_STATUSES
+        ).values('garage_id', 'booking_date', 'booking_time').annotate(count=Count('id')).order_by()
+    })
+
+    windows = {}
+    for availability in GarageAvailability.objects.filter(is_active=True):
+        windows.setdefault(availability.weekday, []).append(availability)
+
+    step = timedelta(minutes=SLOT_INTERVAL_MINUTES)
+    slots = {}
+    day = date_from
+    while day <= date_to:
+        for availability in windows.get(day.weekday(), []):
+            current = datetime.combine(day, availability.start_time)
+            end = datetime.combine(day, availability.end_time)
+            while current < end:
+                key = (availability.garage_id, day, current.time())
+                slots[key] = SlotInventory(
+                    garage_id=availability.garage_id,
+                    slot_date=day,
+                    slot_time=current.time(),
+                    capacity=availability.max_bookings_per_slot,
+                    reserved=booked[key],
+                )
+                current += step
+        day += timedelta(days=1)
+
+    SlotInventory.objects.bulk_create(slots.values(), batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_slot_inventory'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slot_inventory, migrations.RunPython.noop),
+    ]
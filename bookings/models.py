@@ -4,7 +4,7 @@ Booking models for garage appointments
 
 import uuid
 from datetime import datetime, timedelta
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -90,6 +90,71 @@ class GarageAvailability(models.Model):
         return f"{self.garage.name} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
 
 
+class SlotInventory(models.Model):
+    """
+    Materialized booking capacity: one row per garage, date and slot time
+    
+    Rows are generated from GarageAvailability for the booking horizon.
+    Reservations use a conditional UPDATE so concurrent bookings can never
+    exceed the slot capacity.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    garage = models.ForeignKey('garages.Garage', on_delete=models.CASCADE, related_name='slot_inventory')
+    slot_date = models.DateField()
+    slot_time = models.TimeField()
+    capacity = models.IntegerField(default=0)
+    reserved = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['slot_date', 'slot_time']
+        verbose_name = 'Inventaire Créneau'
+        verbose_name_plural = 'Inventaire Créneaux'
+        unique_together = [['garage', 'slot_date', 'slot_time']]
+        indexes = [
+            models.Index(fields=['slot_date', 'garage']),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(reserved__gte=0),
+                name='slot_inventory_reserved_gte_0'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.garage_id} - {self.slot_date} {self.slot_time} ({self.reserved}/{self.capacity})"
+    
+    @property
+    def available_spots(self):
+        return max(self.capacity - self.reserved, 0)
+    
+    @classmethod
+    def reserve(cls, garage_id, slot_date, slot_time):
+        """
+        Atomically take one spot in a slot
+        
+        Issues UPDATE ... SET reserved = reserved + 1 WHERE reserved < capacity
+        and returns True when a spot was taken.
+        """
+        return cls.objects.filter(
+            garage_id=garage_id,
+            slot_date=slot_date,
+            slot_time=slot_time,
+            reserved__lt=models.F('capacity')
+        ).update(reserved=models.F('reserved') + 1, updated_at=timezone.now()) == 1
+    
+    @classmethod
+    def release(cls, garage_id, slot_date, slot_time):
+        """Atomically give back one spot in a slot"""
+        return cls.objects.filter(
+            garage_id=garage_id,
+            slot_date=slot_date,
+            slot_time=slot_time,
+            reserved__gt=0
+        ).update(reserved=models.F('reserved') - 1, updated_at=timezone.now()) == 1
+
+
 class Booking(models.Model):
     """Garage booking/appointment"""
     
@@ -102,6 +167,9 @@ class Booking(models.Model):
         ('no_show', 'Absent'),
     ]
     
+    # Statuses that occupy a slot
+    ACTIVE_STATUSES = ['pending', 'confirmed', 'in_progress']
+    
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'En attente'),
         ('paid', 'Payé'),
@@ -224,26 +292,59 @@ class Booking(models.Model):
         self.status = 'in_progress'
         self.save()
     
+    @property
+    def holds_slot(self):
+        """Whether the booking currently occupies slot capacity"""
+        return self.status in self.ACTIVE_STATUSES
+    
+    def release_slot(self):
+        """Give the booked slot back to the inventory"""
+        SlotInventory.release(self.garage_id, self.booking_date, self.booking_time)
+    
+    def _leave_active_status(self, status):
+        """
+        Switch to a final status; True if this call took the booking out of
+        an active status (and must give its slot back)
+        
+        The conditional UPDATE is the check: of two concurrent transitions,
+        only one matches the active row, so the slot is released once.
+        """
+        return Booking.objects.filter(
+            pk=self.pk, status__in=self.ACTIVE_STATUSES
+        ).update(status=status) == 1
+    
     def complete(self, final_price=None):
         """Complete the booking"""
-        self.status = 'completed'
-        self.completed_at = timezone.now()
-        if final_price is not None:
-            self.final_price = final_price
-        self.save()
+        with transaction.atomic():
+            held = self._leave_active_status('completed')
+            self.status = 'completed'
+            self.completed_at = timezone.now()
+            if final_price is not None:
+                self.final_price = final_price
+            self.save()
+            if held:
+                self.release_slot()
     
     def cancel(self, reason='', cancelled_by=None):
         """Cancel the booking"""
-        self.status = 'cancelled'
-        self.cancelled_at = timezone.now()
-        self.cancellation_reason = reason
-        self.cancelled_by = cancelled_by
-        self.save()
+        with transaction.atomic():
+            held = self._leave_active_status('cancelled')
+            self.status = 'cancelled'
+            self.cancelled_at = timezone.now()
+            self.cancellation_reason = reason
+            self.cancelled_by = cancelled_by
+            self.save()
+            if held:
+                self.release_slot()
     
     def mark_no_show(self):
         """Mark customer as no-show"""
-        self.status = 'no_show'
-        self.save()
+        with transaction.atomic():
+            held = self._leave_active_status('no_show')
+            self.status = 'no_show'
+            self.save()
+            if held:
+                self.release_slot()
 
 
 class BookingReview(models.Model):
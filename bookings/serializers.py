@@ -2,8 +2,10 @@
 Serializers for booking system
 """
 
+from django.db import transaction
 from rest_framework import serializers
 from .models import GarageService, GarageAvailability, Booking, BookingReview
+from .availability import reserve_slot
 
 
 class GarageServiceSerializer(serializers.ModelSerializer):
@@ -97,18 +99,7 @@ class BookingSerializer(serializers.ModelSerializer):
                     'booking_time': 'Le garage n\'est pas disponible à cette date/heure'
                 })
             
-            # Check if slot is not fully booked
-            existing_bookings = Booking.objects.filter(
-                garage=garage,
-                booking_date=booking_date,
-                booking_time=booking_time,
-                status__in=['pending', 'confirmed', 'in_progress']
-            ).count()
-            
-            if existing_bookings >= availability.max_bookings_per_slot:
-                raise serializers.ValidationError({
-                    'booking_time': 'Ce créneau est complet'
-                })
+            # Slot capacity is enforced atomically by the slot inventory on save
         
         return data
 
@@ -134,7 +125,18 @@ class CreateBookingSerializer(serializers.ModelSerializer):
         # Set user from request
         validated_data['user'] = self.context['request'].user
         
-        return super().create(validated_data)
+        with transaction.atomic():
+            # Take a spot in the slot inventory (race-free conditional UPDATE)
+            if not reserve_slot(
+                validated_data['garage'].id,
+                validated_data['booking_date'],
+                validated_data['booking_time']
+            ):
+                raise serializers.ValidationError({
+                    'booking_time': 'Ce créneau est complet ou indisponible'
+                })
+            
+            return super().create(validated_data)
 
 
 class BookingReviewSerializer(serializers.ModelSerializer):
@@ -196,6 +198,22 @@ class BookingStatsSerializer(serializers.Serializer):
     by_garage = serializers.DictField()
 
 
+class EarliestSlotSearchSerializer(serializers.Serializer):
+    """Query parameters of the earliest-slot-near-me search"""
+    
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(default=10, min_value=0.1, max_value=200)
+    category = serializers.ChoiceField(choices=GarageService.CATEGORY_CHOICES, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    time_from = serializers.TimeField(required=False)
+    time_to = serializers.TimeField(required=False)
+    order = serializers.ChoiceField(choices=['time', 'distance'], default='time')
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=50)
+    slots_per_garage = serializers.IntegerField(default=3, min_value=1, max_value=20)
+
+
 class AvailableSlotSerializer(serializers.Serializer):
     """Serializer for available time slots"""
     
@@ -203,4 +221,21 @@ class AvailableSlotSerializer(serializers.Serializer):
     time = serializers.TimeField()
     available_spots = serializers.IntegerField()
     service_id = serializers.UUIDField(required=False)
-    garage_id = serializers.UUIDField()
+    garage_id = serializers.IntegerField()
+
+
+class GarageEarliestSlotsSerializer(serializers.Serializer):
+    """A garage near the user with its earliest open slots"""
+    
+    garage_id = serializers.IntegerField()
+    garage_name = serializers.CharField()
+    garage_address = serializers.CharField()
+    garage_city = serializers.CharField(allow_null=True)
+    garage_phone = serializers.CharField(allow_null=True)
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2)
+    distance_km = serializers.FloatField()
+    service_id = serializers.UUIDField(allow_null=True)
+    service_name = serializers.CharField(allow_null=True)
+    service_price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    earliest_slot = serializers.DateTimeField()
+    slots = AvailableSlotSerializer(many=True)
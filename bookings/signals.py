@@ -0,0 +1,29 @@
+"""
+Signal handlers for bookings
+
+Keep the cached booking statistics in sync with Booking and BookingReview
+writes. Invalidation runs after commit so a concurrent reader cannot cache
+pre-commit data under the new version.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Booking, BookingReview
+from .stats import invalidate_booking_stats
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def invalidate_stats_on_booking_change(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_booking_stats(user_id=instance.user_id, garage_id=instance.garage_id)
+    )
+
+
+@receiver([post_save, post_delete], sender=BookingReview)
+def invalidate_stats_on_review_change(sender, instance, **kwargs):
+    booking = Booking.objects.filter(id=instance.booking_id).values('user_id', 'garage_id').first()
+    if booking:
+        transaction.on_commit(
+            lambda: invalidate_booking_stats(user_id=booking['user_id'], garage_id=booking['garage_id'])
+        )
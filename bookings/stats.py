@@ -0,0 +1,86 @@
+"""
+Booking statistics engine
+
+Statistics are computed with two conditional-aggregate queries (scalar
+counters, then the per-service/per-garage breakdown) and cached per scope
+(customer or garage). Cache entries are invalidated by bumping the scope
+version whenever a Booking or BookingReview changes.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum, Avg, Q
+from django.utils import timezone
+from common.cache import make_cache_key, bump_cache_version
+
+
+def user_stats_namespace(user_id):
+    return f'bookings:stats:user:{user_id}'
+
+
+def garage_stats_namespace(garage_id):
+    return f'bookings:stats:garage:{garage_id}'
+
+
+def compute_booking_stats(queryset):
+    """Compute booking statistics for a Booking queryset in two queries"""
+    today = timezone.now().date()
+
+    totals = queryset.order_by().aggregate(
+        total_bookings=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        confirmed=Count('id', filter=Q(status='confirmed')),
+        in_progress=Count('id', filter=Q(status='in_progress')),
+        completed=Count('id', filter=Q(status='completed')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        no_show=Count('id', filter=Q(status='no_show')),
+        upcoming_7_days=Count('id', filter=Q(
+            booking_date__gte=today,
+            booking_date__lte=today + timedelta(days=7),
+            status__in=['pending', 'confirmed']
+        )),
+        today=Count('id', filter=Q(
+            booking_date=today,
+            status__in=['pending', 'confirmed', 'in_progress']
+        )),
+        total_revenue=Sum('final_price', filter=Q(status='completed', final_price__isnull=False)),
+        average_rating=Avg('review__rating'),
+    )
+
+    # One grouped query feeds both breakdowns
+    by_service = {}
+    by_garage = {}
+    rows = (
+        queryset.order_by()
+        .values('service__name', 'garage__name')
+        .annotate(count=Count('id'))
+    )
+    for row in rows:
+        if row['service__name'] is not None:
+            by_service[row['service__name']] = by_service.get(row['service__name'], 0) + row['count']
+        by_garage[row['garage__name']] = by_garage.get(row['garage__name'], 0) + row['count']
+
+    totals['total_revenue'] = totals['total_revenue'] or 0
+    totals['average_rating'] = round(totals['average_rating'] or 0, 2)
+    totals['by_service'] = by_service
+    totals['by_garage'] = by_garage
+    return totals
+
+
+def get_cached_booking_stats(namespace, queryset, params=None):
+    """Return cached statistics for a scope, computing them on a miss"""
+    key = make_cache_key(namespace, timezone.now().date().isoformat(), params=params)
+    stats_data = cache.get(key)
+    if stats_data is None:
+        stats_data = compute_booking_stats(queryset)
+        cache.set(key, stats_data, settings.BOOKINGS_STATS_CACHE_TIMEOUT)
+    return stats_data
+
+
+def invalidate_booking_stats(user_id=None, garage_id=None):
+    """Drop cached statistics of a customer and/or a garage"""
+    if user_id is not None:
+        bump_cache_version(user_stats_namespace(user_id))
+    if garage_id is not None:
+        bump_cache_version(garage_stats_namespace(garage_id))
@@ -2,11 +2,16 @@
 Celery tasks for booking notifications
 """
 
+from datetime import timedelta
 from celery import shared_task
-from django.core.mail import send_mail
+from django.core.mail import send_mail, get_connection, EmailMessage
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils import timezone
 from .models import Booking
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @shared_task
@@ -107,38 +112,10 @@ def send_booking_reminder_email(booking_id):
         if booking.reminder_sent:
             return f"Rappel déjà envoyé pour {booking_id}"
         
-        subject = f'Rappel: Rendez-vous demain - {booking.garage.name}'
-        
-        message = f"""
-        Bonjour {booking.customer_name},
-
-        Rappel de votre rendez-vous DEMAIN:
-
-        - Garage: {booking.garage.name}
-        - Adresse: {booking.garage.address}
-        - Heure: {booking.booking_time.strftime('%H:%M')}
-        - Service: {booking.service.name if booking.service else 'Non spécifié'}
-        - Véhicule: {booking.vehicle.brand} {booking.vehicle.model}
-
-        Pensez à arriver 5 minutes en avance.
-
-        Contact garage: {booking.garage.phone}
-
-        À demain !
-        L'équipe AutoTrack
-        """
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[booking.customer_email],
-            fail_silently=False,
-        )
+        build_reminder_message(booking).send(fail_silently=False)
         
         # Mark reminder as sent
         booking.reminder_sent = True
-        from django.utils import timezone
         booking.reminder_sent_at = timezone.now()
         booking.save()
         
@@ -225,22 +202,156 @@ def send_booking_cancelled_email(booking_id):
 
 
 @shared_task
-def send_daily_reminders():
-    """Send reminders for bookings in 24 hours (run daily at 10am)"""
-    from datetime import datetime, timedelta
-    from django.utils import timezone
+def materialize_slot_inventory(batch_size=100):
+    """Materialize the slot inventory for the booking horizon (run daily)"""
+    from .availability import materialize_slot_inventory as materialize
+    from .models import GarageAvailability
     
-    tomorrow = timezone.now().date() + timedelta(days=1)
+    garage_ids = list(
+        GarageAvailability.objects.filter(is_active=True)
+        .values_list('garage_id', flat=True)
+        .distinct()
+        .order_by('garage_id')
+    )
+    
+    total = 0
+    for i in range(0, len(garage_ids), batch_size):
+        total += materialize(garage_ids[i:i + batch_size])
+    
+    return f"{total} créneaux matérialisés pour {len(garage_ids)} garages"
+
+
+def build_reminder_message(booking, connection=None):
+    """Render the 24h reminder email of a booking"""
+    subject = f'Rappel: Rendez-vous demain - {booking.garage.name}'
+    
+    message = f"""
+        Bonjour {booking.customer_name},
+
+        Rappel de votre rendez-vous DEMAIN:
+
+        - Garage: {booking.garage.name}
+        - Adresse: {booking.garage.address}
+        - Heure: {booking.booking_time.strftime('%H:%M')}
+        - Service: {booking.service.name if booking.service else 'Non spécifié'}
+        - Véhicule: {booking.vehicle.make} {booking.vehicle.model}
+
+        Pensez à arriver 5 minutes en avance.
+
+        Contact garage: {booking.garage.phone}
+
+        À demain !
+        L'équipe AutoTrack
+        """
+    
+    return EmailMessage(
+        subject=subject,
+        body=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[booking.customer_email],
+        connection=connection,
+    )
+
+
+def send_reminders_in_batches(bookings, batch_size=None):
+    """
+    Send reminder emails over reused SMTP connections
+    
+    Messages are rendered up front and sent in batches of batch_size, one
+    connection (and TLS handshake) per batch. A failing message does not
+    abort its batch. Bookings are marked as reminded after each batch, so
+    a run cut short never sends the delivered reminders again.
+    
+    Returns (sent_ids, failed) where failed maps booking id to the error.
+    """
+    batch_size = batch_size or settings.BOOKINGS_EMAIL_BATCH_SIZE
+    messages = [(str(booking.id), build_reminder_message(booking)) for booking in bookings]
+    
+    sent_ids = []
+    failed = {}
+    for start in range(0, len(messages), batch_size):
+        batch = messages[start:start + batch_size]
+        batch_sent_from = len(sent_ids)
+        connection = get_connection(fail_silently=False)
+        
+        try:
+            connection.open()
+        except Exception as e:
+            for booking_id, _ in batch:
+                failed[booking_id] = str(e)
+            continue
+        
+        try:
+            for booking_id, message in batch:
+                try:
+                    connection.send_messages([message])
+                    sent_ids.append(booking_id)
+                except Exception as e:
+                    failed[booking_id] = str(e)
+                    # Start over on a fresh connection if the server dropped it
+                    connection.close()
+                    connection.open()
+        except Exception as e:
+            # Reconnection failed: the rest of the batch is retried later
+            for booking_id, _ in batch:
+                if booking_id not in sent_ids and booking_id not in failed:
+                    failed[booking_id] = str(e)
+        finally:
+            connection.close()
+            _mark_reminded(sent_ids[batch_sent_from:])
     
-    bookings_to_remind = Booking.objects.filter(
+    return sent_ids, failed
+
+
+def _mark_reminded(booking_ids):
+    if booking_ids:
+        Booking.objects.filter(id__in=booking_ids).update(
+            reminder_sent=True,
+            reminder_sent_at=timezone.now()
+        )
+
+
+def _due_reminders():
+    """Confirmed bookings of tomorrow still waiting for their reminder"""
+    tomorrow = timezone.now().date() + timedelta(days=1)
+    return Booking.objects.filter(
         booking_date=tomorrow,
         status__in=['confirmed'],
         reminder_sent=False
-    )
+    ).select_related('garage', 'vehicle', 'service')
+
+
+@shared_task
+def send_daily_reminders():
+    """Send reminders for bookings in 24 hours (run daily at 10am)"""
+    sent_ids, failed = send_reminders_in_batches(_due_reminders())
+    
+    if failed:
+        retry_booking_reminders.apply_async(
+            args=[list(failed)],
+            kwargs={'attempt': 1},
+            countdown=settings.BOOKINGS_EMAIL_RETRY_DELAY
+        )
+    
+    return f"{len(sent_ids)} rappels envoyés pour demain, {len(failed)} en échec"
+
+
+@shared_task
+def retry_booking_reminders(booking_ids, attempt=1):
+    """Retry the reminders that failed, and only those"""
+    bookings = _due_reminders().filter(id__in=booking_ids)
+    sent_ids, failed = send_reminders_in_batches(bookings)
     
-    count = 0
-    for booking in bookings_to_remind:
-        send_booking_reminder_email.delay(str(booking.id))
-        count += 1
+    if failed:
+        if attempt < settings.BOOKINGS_EMAIL_MAX_RETRIES:
+            retry_booking_reminders.apply_async(
+                args=[list(failed)],
+                kwargs={'attempt': attempt + 1},
+                countdown=settings.BOOKINGS_EMAIL_RETRY_DELAY * 2 ** attempt
+            )
+        else:
+            logger.error(
+                f"Giving up on {len(failed)} booking reminders after {attempt} retries: {failed}"
+            )
     
-    return f"{count} rappels envoyés pour demain"
+    return f"{len(sent_ids)} rappels renvoyés, {len(failed)} en échec (tentative {attempt})"
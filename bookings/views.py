@@ -3,13 +3,14 @@ Views for booking system
 """
 
 from datetime import datetime, timedelta
-from django.db.models import Count, Avg, Q, Sum
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import GarageService, GarageAvailability, Booking, BookingReview
+from .models import GarageService, GarageAvailability, Booking, BookingReview, SlotInventory
 from .serializers import (
     GarageServiceSerializer,
     GarageAvailabilitySerializer,
@@ -17,7 +18,17 @@ from .serializers import (
     CreateBookingSerializer,
     BookingReviewSerializer,
     BookingStatsSerializer,
-    AvailableSlotSerializer
+    AvailableSlotSerializer,
+    EarliestSlotSearchSerializer,
+    GarageEarliestSlotsSerializer
+)
+from .stats import get_cached_booking_stats, user_stats_namespace, garage_stats_namespace
+from .availability import (
+    compute_available_slots,
+    find_earliest_slots_nearby,
+    materialize_slot_inventory,
+    reserve_slot,
+    MAX_SLOT_RANGE_DAYS
 )
 
 
@@ -60,6 +71,22 @@ class GarageAvailabilityViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(garage_id=garage_id)
         
         return queryset.select_related('garage')
+    
+    def perform_create(self, serializer):
+        """Materialize the new slots in the inventory"""
+        availability = serializer.save()
+        materialize_slot_inventory([availability.garage_id])
+    
+    def perform_update(self, serializer):
+        """Refresh the garage slot inventory"""
+        availability = serializer.save()
+        materialize_slot_inventory([availability.garage_id])
+    
+    def perform_destroy(self, instance):
+        """Close the removed slots in the inventory"""
+        garage_id = instance.garage_id
+        instance.delete()
+        materialize_slot_inventory([garage_id])
 
 
 class BookingViewSet(viewsets.ModelViewSet):
@@ -118,6 +145,36 @@ class BookingViewSet(viewsets.ModelViewSet):
         from .tasks import send_booking_confirmation_email
         send_booking_confirmation_email.delay(str(booking.id))
     
+    def perform_update(self, serializer):
+        """Move the slot reservation when the slot or status changes"""
+        with transaction.atomic():
+            # Locked row: concurrent updates see each other's slot moves
+            current = Booking.objects.select_for_update().get(pk=serializer.instance.pk)
+            old_slot = (current.garage_id, current.booking_date, current.booking_time)
+            held = current.holds_slot
+            
+            booking = serializer.save()
+            new_slot = (booking.garage_id, booking.booking_date, booking.booking_time)
+            moved = new_slot != old_slot
+            
+            if booking.holds_slot and (moved or not held):
+                if not reserve_slot(*new_slot):
+                    raise serializers.ValidationError({
+                        'booking_time': 'Ce créneau est complet ou indisponible'
+                    })
+            if held and (moved or not booking.holds_slot):
+                SlotInventory.release(*old_slot)
+    
+    def perform_destroy(self, instance):
+        """Give the slot back when deleting an active booking"""
+        with transaction.atomic():
+            held = Booking.objects.select_for_update().filter(
+                pk=instance.pk, status__in=Booking.ACTIVE_STATUSES
+            ).exists()
+            instance.delete()
+            if held:
+                instance.release_slot()
+    
     @action(detail=True, methods=['post'])
     def confirm(self, request, pk=None):
         """Confirm a booking"""
@@ -235,135 +292,132 @@ class BookingViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get booking statistics"""
-        queryset = self.get_queryset()
-        
-        # Count by status
-        total_bookings = queryset.count()
-        pending = queryset.filter(status='pending').count()
-        confirmed = queryset.filter(status='confirmed').count()
-        in_progress = queryset.filter(status='in_progress').count()
-        completed = queryset.filter(status='completed').count()
-        cancelled = queryset.filter(status='cancelled').count()
-        no_show = queryset.filter(status='no_show').count()
-        
-        # Upcoming bookings
-        upcoming_7_days = queryset.filter(
-            booking_date__gte=timezone.now().date(),
-            booking_date__lte=timezone.now().date() + timedelta(days=7),
-            status__in=['pending', 'confirmed']
-        ).count()
-        
-        today = queryset.filter(
-            booking_date=timezone.now().date(),
-            status__in=['pending', 'confirmed', 'in_progress']
-        ).count()
-        
-        # Revenue
-        total_revenue = queryset.filter(
-            status='completed',
-            final_price__isnull=False
-        ).aggregate(total=Sum('final_price'))['total'] or 0
-        
-        # Average rating
-        average_rating = BookingReview.objects.filter(
-            booking__user=request.user
-        ).aggregate(avg=Avg('rating'))['avg'] or 0
-        
-        # By service
-        by_service = dict(
-            queryset.filter(service__isnull=False)
-            .values('service__name')
-            .annotate(count=Count('id'))
-            .values_list('service__name', 'count')
+        """Get booking statistics (cached per user)"""
+        stats_data = get_cached_booking_stats(
+            user_stats_namespace(request.user.id),
+            self.get_queryset(),
+            params=request.query_params
         )
         
-        # By garage
-        by_garage = dict(
-            queryset.values('garage__name')
-            .annotate(count=Count('id'))
-            .values_list('garage__name', 'count')
-        )
+        serializer = BookingStatsSerializer(stats_data)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def garage_stats(self, request):
+        """Get statistics for all bookings at a garage owned by the user"""
+        from garages.models import Garage
+        
+        garage_id = request.query_params.get('garage')
+        if not garage_id:
+            return Response(
+                {'error': 'Paramètre garage requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        stats_data = {
-            'total_bookings': total_bookings,
-            'pending': pending,
-            'confirmed': confirmed,
-            'in_progress': in_progress,
-            'completed': completed,
-            'cancelled': cancelled,
-            'no_show': no_show,
-            'upcoming_7_days': upcoming_7_days,
-            'today': today,
-            'total_revenue': total_revenue,
-            'average_rating': round(average_rating, 2),
-            'by_service': by_service,
-            'by_garage': by_garage,
-        }
+        garages = Garage.objects.all()
+        if not request.user.is_staff:
+            garages = garages.filter(owner=request.user)
+        garage = garages.filter(id=garage_id).first()
+        if not garage:
+            return Response(
+                {'error': 'Garage introuvable'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        stats_data = get_cached_booking_stats(
+            garage_stats_namespace(garage.id),
+            Booking.objects.filter(garage=garage)
+        )
         
         serializer = BookingStatsSerializer(stats_data)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def available_slots(self, request):
-        """Get available time slots for a garage and date"""
+        """
+        Get available time slots for a garage
+        
+        Query params: garage and either date, or date_from/date_to for a
+        range (e.g. a week view) of at most MAX_SLOT_RANGE_DAYS days
+        """
         garage_id = request.query_params.get('garage')
         date_str = request.query_params.get('date')
+        date_from_str = request.query_params.get('date_from', date_str)
+        date_to_str = request.query_params.get('date_to', date_from_str)
         
-        if not garage_id or not date_str:
+        if not garage_id or not date_from_str:
             return Response(
                 {'error': 'Paramètres garage et date requis'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            garage_id = int(garage_id)
+        except ValueError:
+            return Response(
+                {'error': 'Identifiant de garage invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            date_from = datetime.strptime(date_from_str, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to_str, '%Y-%m-%d').date()
         except ValueError:
             return Response(
                 {'error': 'Format de date invalide (YYYY-MM-DD attendu)'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        weekday = booking_date.weekday()
+        if date_to < date_from or (date_to - date_from).days >= MAX_SLOT_RANGE_DAYS:
+            return Response(
+                {'error': f'Période invalide (maximum {MAX_SLOT_RANGE_DAYS} jours)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get garage availability for this weekday
-        availabilities = GarageAvailability.objects.filter(
-            garage_id=garage_id,
-            weekday=weekday,
-            is_active=True
-        )
+        available_slots = compute_available_slots([garage_id], date_from, date_to)
         
-        available_slots = []
+        serializer = AvailableSlotSerializer(available_slots, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def earliest_slots(self, request):
+        """
+        Find the earliest open slots in garages around a location
+        
+        Query params: lat, lng, radius (km, default 10), category,
+        date_from/date_to (default: the next 7 days), time_from/time_to,
+        order (time|distance), limit, slots_per_garage
+        """
+        params = EarliestSlotSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        
+        now = timezone.localtime()
+        date_from = max(data.get('date_from') or now.date(), now.date())
+        date_to = data.get('date_to') or date_from + timedelta(days=6)
+        
+        if date_to < date_from or (date_to - date_from).days >= MAX_SLOT_RANGE_DAYS:
+            return Response(
+                {'error': f'Période invalide (maximum {MAX_SLOT_RANGE_DAYS} jours)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for availability in availabilities:
-            # Generate time slots (every 30 minutes)
-            current_time = datetime.combine(booking_date, availability.start_time)
-            end_time = datetime.combine(booking_date, availability.end_time)
-            
-            while current_time < end_time:
-                slot_time = current_time.time()
-                
-                # Count existing bookings for this slot
-                existing_bookings = Booking.objects.filter(
-                    garage_id=garage_id,
-                    booking_date=booking_date,
-                    booking_time=slot_time,
-                    status__in=['pending', 'confirmed', 'in_progress']
-                ).count()
-                
-                available_spots = availability.max_bookings_per_slot - existing_bookings
-                
-                if available_spots > 0:
-                    available_slots.append({
-                        'date': booking_date,
-                        'time': slot_time,
-                        'available_spots': available_spots,
-                        'garage_id': garage_id
-                    })
-                
-                current_time += timedelta(minutes=30)
+        results = find_earliest_slots_nearby(
+            lat=data['lat'],
+            lng=data['lng'],
+            radius_km=data['radius'],
+            date_from=date_from,
+            date_to=date_to,
+            category=data.get('category'),
+            not_before=now.replace(tzinfo=None),
+            time_from=data.get('time_from'),
+            time_to=data.get('time_to'),
+            order=data['order'],
+            limit=data['limit'],
+            slots_per_garage=data['slots_per_garage'],
+        )
         
-        serializer = AvailableSlotSerializer(available_slots, many=True)
+        serializer = GarageEarliestSlotsSerializer(results, many=True)
         return Response(serializer.data)
 
 
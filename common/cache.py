@@ -0,0 +1,53 @@
+"""
+Versioned cache helpers
+
+Cached entries embed a version number in their key. Invalidating a whole
+namespace (e.g. every stats entry of a user) is then a single atomic
+increment of its version counter; stale entries simply expire.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+VERSION_KEY_PREFIX = 'version'
+
+
+def _version_key(namespace):
+    return f'{VERSION_KEY_PREFIX}:{namespace}'
+
+
+def get_cache_version(namespace):
+    """Return the current version of a cache namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from a timestamp so a lost counter never reuses an old version
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate every entry of a cache namespace"""
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        return cache.get(key)
+
+
+def make_cache_key(namespace, *parts, params=None):
+    """
+    Build a cache key bound to the current namespace version
+
+    ``params`` (e.g. request query params) are hashed into the key so every
+    filter combination gets its own entry.
+    """
+    key = ':'.join([namespace, f'v{get_cache_version(namespace)}', *[str(p) for p in parts]])
+    if params:
+        encoded = '&'.join(f'{k}={v}' for k, v in sorted(params.items()))
+        key = f"{key}:{hashlib.md5(encoded.encode()).hexdigest()}"
+    return key
@@ -0,0 +1,142 @@
+"""
+Keyset (cursor) pagination
+
+Pages are addressed by the sort key of their boundary row, e.g.
+``(service_date, id)``, instead of an offset: fetching page N is an index
+range scan of ``page_size`` rows whatever N is. The trailing ``id`` makes
+the key unique so rows sharing a date are never skipped or repeated.
+"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate a queryset on a composite descending key
+
+    ``ordering`` lists the key fields, most significant first, all
+    descending, the last one unique (typically ``-id``).
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering=('-created_at', '-id')):
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # Cursor encoding
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'k': values, 'r': int(reverse)}, default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = payload['k'], bool(payload['r'])
+            if len(values) != len(self.fields):
+                raise ValueError
+            return values, reverse
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _key_of(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def _parse_key(self, queryset, values):
+        try:
+            return [
+                queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, key, reverse):
+        """Q selecting rows strictly after ``key`` in the (possibly reversed) order"""
+        lookup = 'gt' if reverse else 'lt'
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.fields, key):
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    # Pagination API
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        values, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(name.lstrip('-') for name in self.ordering)
+        queryset = queryset.order_by(*ordering)
+
+        if values is not None:
+            queryset = queryset.filter(self._after(self._parse_key(queryset, values), reverse))
+
+        # One extra row tells whether there is a page beyond this one
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next, self.has_previous = values is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self._key_of(self.page[-1]), reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self._key_of(self.page[0]), reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+def paginate_history(request, queryset, serializer_class, ordering):
+    """Keyset-paginated response of a history queryset"""
+    paginator = KeysetPagination(ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('diagnostics', '0002_initial'),
+        ('vehicles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='diagnostic',
+            name='diagnostics_user_id_83522b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='diagnostic',
+            name='diagnostics_vehicle_f41af1_idx',
+        ),
+        migrations.AddIndex(
+            model_name='diagnostic',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='diagnostics_user_id_1334b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diagnostic',
+            index=models.Index(fields=['vehicle', '-created_at', '-id'], name='diagnostics_vehicle_c70f9a_idx'),
+        ),
+    ]
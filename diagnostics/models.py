@@ -45,8 +45,8 @@ class Diagnostic(models.Model):
         db_table = 'diagnostics'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user']),
-            models.Index(fields=['vehicle']),
+            models.Index(fields=['user', '-created_at', '-id']),
+            models.Index(fields=['vehicle', '-created_at', '-id']),
             models.Index(fields=['status']),
         ]
     
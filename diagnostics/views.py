@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Avg, Count, Q
+from common.pagination import KeysetPagination
 from .models import Diagnostic, DiagnosticReply
 from .serializers import (
     DiagnosticSerializer, DiagnosticCreateSerializer, DiagnosticDetailSerializer,
@@ -112,7 +113,12 @@ class DiagnosticViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def by_vehicle(self, request):
-        """Get diagnostics grouped by vehicle"""
+        """
+        Get diagnostics grouped by vehicle (cursor-paginated)
+        
+        A page holds the next diagnostics in (created_at, id) order grouped
+        by vehicle.
+        """
         vehicle_id = request.query_params.get('vehicle_id')
         
         if vehicle_id:
@@ -120,9 +126,12 @@ class DiagnosticViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
+        paginator = KeysetPagination(ordering=('-created_at', '-id'))
+        page = paginator.paginate_queryset(queryset, request)
+        
         # Group by vehicle
         vehicles = {}
-        for diagnostic in queryset:
+        for diagnostic in page:
             vehicle_key = str(diagnostic.vehicle.id)
             if vehicle_key not in vehicles:
                 vehicles[vehicle_key] = {
@@ -138,7 +147,7 @@ class DiagnosticViewSet(viewsets.ModelViewSet):
                 DiagnosticSerializer(diagnostic).data
             )
         
-        return Response(list(vehicles.values()))
+        return paginator.get_paginated_response(list(vehicles.values()))
 
 
 class DiagnosticReplyViewSet(viewsets.ModelViewSet):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Document
+from .models import Document, DocumentAnalysisCache, DocumentBatch, DocumentStorageUsage, DocumentUpload
 
 
 @admin.register(Document)
@@ -9,7 +9,7 @@ class DocumentAdmin(admin.ModelAdmin):
     list_filter = ['document_type', 'created_at']
     search_fields = ['title', 'description', 'vehicle__make', 'vehicle__model']
     ordering = ['-created_at']
-    readonly_fields = ['file_size', 'mime_type', 'created_at', 'updated_at']
+    readonly_fields = ['file_size', 'mime_type', 'content_hash', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Vehicle & Type', {
@@ -19,9 +19,44 @@ class DocumentAdmin(admin.ModelAdmin):
             'fields': ('title', 'description', 'file')
         }),
         ('File Details', {
-            'fields': ('file_size', 'mime_type', 'metadata')
+            'fields': ('file_size', 'mime_type', 'content_hash', 'metadata')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(DocumentAnalysisCache)
+class DocumentAnalysisCacheAdmin(admin.ModelAdmin):
+    """Cached document analyses"""
+    list_display = ['content_hash', 'analyzer_version', 'hits', 'created_at', 'last_used_at']
+    list_filter = ['analyzer_version']
+    search_fields = ['content_hash']
+    readonly_fields = ['content_hash', 'analyzer_version', 'hits', 'created_at', 'last_used_at']
+
+
+@admin.register(DocumentUpload)
+class DocumentUploadAdmin(admin.ModelAdmin):
+    """Chunked document uploads"""
+    list_display = ['filename', 'user', 'status', 'received_size', 'total_size', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['filename', 'title', 'user__email']
+    readonly_fields = ['received_size', 'parts', 'document', 'created_at', 'updated_at']
+
+
+@admin.register(DocumentStorageUsage)
+class DocumentStorageUsageAdmin(admin.ModelAdmin):
+    """Per-user document storage counters (fixed daily by reconcile_storage_usage)"""
+    list_display = ['user', 'document_count', 'total_bytes', 'updated_at']
+    search_fields = ['user__email']
+    readonly_fields = ['user', 'document_count', 'total_bytes', 'updated_at']
+
+
+@admin.register(DocumentBatch)
+class DocumentBatchAdmin(admin.ModelAdmin):
+    """Batch document analyses"""
+    list_display = ['id', 'user', 'total', 'success', 'failed', 'created_at', 'finished_at']
+    search_fields = ['user__email']
+    readonly_fields = ['id', 'user', 'document_ids', 'total', 'lanes', 'success', 'failed',
+                       'summary', 'created_at', 'finished_at']
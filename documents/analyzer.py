@@ -2,14 +2,58 @@
 Service d'analyse OCR pour les documents AutoTrack
 Extrait le texte et les données structurées des images de documents
 """
-import pytesseract
-from PIL import Image
-import re
 import logging
 from datetime import datetime
+from .services.ocr import OCREngine
+from .services.rules import RuleEngine, keyword_rules
 
 logger = logging.getLogger(__name__)
 
+# Segmentation automatique de tesseract (pas de --psm), pages réparties sur le pool
+ocr_engine = OCREngine(lang='fra+eng', config='')
+
+COMMON_BRANDS = [
+    'RENAULT', 'PEUGEOT', 'CITROËN', 'CITROEN', 'VOLKSWAGEN', 'BMW', 
+    'MERCEDES', 'AUDI', 'TOYOTA', 'NISSAN', 'FORD', 'OPEL',
+    'FIAT', 'SEAT', 'SKODA', 'HYUNDAI', 'KIA', 'MAZDA'
+]
+
+INSURANCE_COMPANIES = [
+    'AXA', 'MAAF', 'MACIF', 'MAIF', 'GROUPAMA', 'MMA', 
+    'ALLIANZ', 'GENERALI', 'MATMUT', 'GMF', 'DIRECT ASSURANCE'
+]
+
+# Règles par ordre de priorité quand plusieurs motifs visent le même champ
+AMOUNT_RULES = ['amount:total', 'amount:currency', 'amount:total_plain']
+INVOICE_NUMBER_RULES = ['invoice_number:label', 'invoice_number:short']
+EXPIRY_DATE_RULES = ['expiry_date', 'expiry_date:any_date']
+
+# Toutes les règles du service, compilées une fois et évaluées en un passage
+SERVICE_RULES = RuleEngine({
+    # Numéro d'immatriculation (format français AA-123-BB)
+    'registration_number': r'[A-Z]{2}-\d{3}-[A-Z]{2}',
+    # VIN (17 caractères alphanumériques)
+    'vin': r'\b[A-HJ-NPR-Z0-9]{17}\b',
+    # Date (format DD/MM/YYYY)
+    'date': r'\b(\d{2})/(\d{2})/(\d{4})\b',
+    # Montant (format français: 123,45 € ou 123.45 EUR)
+    'amount:total': r'(?:Total|TOTAL|Montant|MONTANT)[\s:]*(\d+[,\.]\d{2})\s*€',
+    'amount:currency': r'(\d+[,\.]\d{2})\s*(?:EUR|€)',
+    'amount:total_plain': r'Total[\s:]+(\d+[,\.]\d{2})',
+    'invoice_number:label': r'(?:Facture|FACTURE|Invoice|N°)[\s:]+([A-Z0-9\-]+)',
+    'invoice_number:short': r'(?:Fact|FACT)[\s:]+([0-9]+)',
+    'policy_number': r'(?:Police|Contrat|N°)[\s:]+([A-Z0-9]+)',
+    'expiry_date': r'(?:Expir|Valable jusqu|Validité).*?(\d{2})/(\d{2})/(\d{4})',
+    'expiry_date:any_date': r'(\d{2})/(\d{2})/(\d{4})',
+    **keyword_rules('brand', COMMON_BRANDS),
+    **keyword_rules('insurer', INSURANCE_COMPANIES),
+})
+
+
+def _iso_date(match):
+    """DD/MM/YYYY capturé en (jour, mois, année) -> YYYY-MM-DD"""
+    return f"{match.group(3)}-{match.group(2)}-{match.group(1)}"
+
 
 class DocumentAnalyzerService:
     """
@@ -29,8 +73,7 @@ class DocumentAnalyzerService:
             str: Texte extrait
         """
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image, lang='fra+eng')
+            text, _ = ocr_engine.ocr_file(image_path)
             return text
         except Exception as e:
             logger.error(f"Error extracting text from image: {str(e)}")
@@ -45,7 +88,11 @@ class DocumentAnalyzerService:
             dict: Informations extraites (immatriculation, marque, modèle, etc.)
         """
         text = DocumentAnalyzerService.extract_text_from_image(image_path)
-        
+        return DocumentAnalyzerService.parse_vehicle_registration(text)
+    
+    @staticmethod
+    def parse_vehicle_registration(text):
+        """Extrait les informations d'une carte grise depuis son texte (un passage des règles)"""
         data = {
             'document_type': 'registration',
             'registration_number': None,
@@ -56,34 +103,21 @@ class DocumentAnalyzerService:
             'raw_text': text
         }
         
-        # Extraction du numéro d'immatriculation (format français AA-123-BB)
-        registration_match = re.search(r'[A-Z]{2}-\d{3}-[A-Z]{2}', text)
-        if registration_match:
-            data['registration_number'] = registration_match.group()
-        
-        # Extraction du VIN (17 caractères alphanumériques)
-        vin_match = re.search(r'\b[A-HJ-NPR-Z0-9]{17}\b', text)
-        if vin_match:
-            data['vin'] = vin_match.group()
-        
-        # Extraction de la date (format DD/MM/YYYY)
-        date_match = re.search(r'\b(\d{2})/(\d{2})/(\d{4})\b', text)
-        if date_match:
-            try:
-                data['first_registration_date'] = f"{date_match.group(3)}-{date_match.group(2)}-{date_match.group(1)}"
-            except:
-                pass
-        
-        # Recherche de marques courantes
-        common_brands = [
-            'RENAULT', 'PEUGEOT', 'CITROËN', 'CITROEN', 'VOLKSWAGEN', 'BMW', 
-            'MERCEDES', 'AUDI', 'TOYOTA', 'NISSAN', 'FORD', 'OPEL',
-            'FIAT', 'SEAT', 'SKODA', 'HYUNDAI', 'KIA', 'MAZDA'
-        ]
-        
-        text_upper = text.upper()
-        for brand in common_brands:
-            if brand in text_upper:
+        matches = SERVICE_RULES.scan(text)
+        
+        # Numéro d'immatriculation, VIN et date de première immatriculation
+        if 'registration_number' in matches:
+            data['registration_number'] = matches['registration_number'].group()
+        
+        if 'vin' in matches:
+            data['vin'] = matches['vin'].group()
+        
+        if 'date' in matches:
+            data['first_registration_date'] = _iso_date(matches['date'])
+        
+        # Marques courantes, dans l'ordre de la liste
+        for brand in COMMON_BRANDS:
+            if f'brand:{brand}' in matches:
                 data['brand'] = brand.capitalize()
                 break
         
@@ -98,7 +132,11 @@ class DocumentAnalyzerService:
             dict: Informations extraites (montant, date, garage, etc.)
         """
         text = DocumentAnalyzerService.extract_text_from_image(image_path)
-        
+        return DocumentAnalyzerService.parse_invoice(text)
+    
+    @staticmethod
+    def parse_invoice(text):
+        """Extrait les informations d'une facture depuis son texte (un passage des règles)"""
         data = {
             'document_type': 'invoice',
             'amount': None,
@@ -108,42 +146,21 @@ class DocumentAnalyzerService:
             'raw_text': text
         }
         
-        # Extraction du montant (format français: 123,45 € ou 123.45 EUR)
-        amount_patterns = [
-            r'(?:Total|TOTAL|Montant|MONTANT)[\s:]*(\d+[,\.]\d{2})\s*€',
-            r'(\d+[,\.]\d{2})\s*(?:EUR|€)',
-            r'Total[\s:]+(\d+[,\.]\d{2})'
-        ]
-        
-        for pattern in amount_patterns:
-            match = re.search(pattern, text)
-            if match:
-                amount_str = match.group(1).replace(',', '.')
-                try:
-                    data['amount'] = float(amount_str)
-                    break
-                except:
-                    pass
-        
-        # Extraction de la date
-        date_match = re.search(r'\b(\d{2})/(\d{2})/(\d{4})\b', text)
-        if date_match:
-            try:
-                data['date'] = f"{date_match.group(3)}-{date_match.group(2)}-{date_match.group(1)}"
-            except:
-                pass
-        
-        # Extraction du numéro de facture
-        invoice_patterns = [
-            r'(?:Facture|FACTURE|Invoice|N°)[\s:]+([A-Z0-9\-]+)',
-            r'(?:Fact|FACT)[\s:]+([0-9]+)'
-        ]
-        
-        for pattern in invoice_patterns:
-            match = re.search(pattern, text)
-            if match:
-                data['invoice_number'] = match.group(1)
-                break
+        matches = SERVICE_RULES.scan(text)
+        
+        # Montant (motifs par ordre de priorité)
+        amount_match = RuleEngine.first(matches, AMOUNT_RULES)
+        if amount_match:
+            data['amount'] = float(amount_match.group(1).replace(',', '.'))
+        
+        # Date
+        if 'date' in matches:
+            data['date'] = _iso_date(matches['date'])
+        
+        # Numéro de facture
+        invoice_match = RuleEngine.first(matches, INVOICE_NUMBER_RULES)
+        if invoice_match:
+            data['invoice_number'] = invoice_match.group(1)
         
         # Essayer d'extraire le nom du garage (première ligne souvent)
         lines = text.split('\n')
@@ -164,7 +181,11 @@ class DocumentAnalyzerService:
             dict: Informations extraites
         """
         text = DocumentAnalyzerService.extract_text_from_image(image_path)
-        
+        return DocumentAnalyzerService.parse_insurance(text)
+    
+    @staticmethod
+    def parse_insurance(text):
+        """Extrait les informations d'une carte verte d'assurance depuis son texte (un passage des règles)"""
         data = {
             'document_type': 'insurance',
             'policy_number': None,
@@ -173,35 +194,20 @@ class DocumentAnalyzerService:
             'raw_text': text
         }
         
-        # Extraction du numéro de police
-        policy_match = re.search(r'(?:Police|Contrat|N°)[\s:]+([A-Z0-9]+)', text)
-        if policy_match:
-            data['policy_number'] = policy_match.group(1)
-        
-        # Extraction de la date d'expiration
-        date_patterns = [
-            r'(?:Expir|Valable jusqu|Validité).*?(\d{2})/(\d{2})/(\d{4})',
-            r'(\d{2})/(\d{2})/(\d{4})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                try:
-                    data['expiry_date'] = f"{match.group(3)}-{match.group(2)}-{match.group(1)}"
-                    break
-                except:
-                    pass
-        
-        # Compagnies d'assurance courantes
-        insurance_companies = [
-            'AXA', 'MAAF', 'MACIF', 'MAIF', 'GROUPAMA', 'MMA', 
-            'ALLIANZ', 'GENERALI', 'MATMUT', 'GMF', 'DIRECT ASSURANCE'
-        ]
-        
-        text_upper = text.upper()
-        for company in insurance_companies:
-            if company in text_upper:
+        matches = SERVICE_RULES.scan(text)
+        
+        # Numéro de police
+        if 'policy_number' in matches:
+            data['policy_number'] = matches['policy_number'].group(1)
+        
+        # Date d'expiration (à défaut, première date du document)
+        expiry_match = RuleEngine.first(matches, EXPIRY_DATE_RULES)
+        if expiry_match:
+            data['expiry_date'] = _iso_date(expiry_match)
+        
+        # Compagnies d'assurance courantes, dans l'ordre de la liste
+        for company in INSURANCE_COMPANIES:
+            if f'insurer:{company}' in matches:
                 data['insurance_company'] = company
                 break
         
@@ -0,0 +1,131 @@
+"""
+État des analyses de documents en lot
+
+Un lot est identifié par le task_id renvoyé au client (celui de la tâche
+de synthèse du chord). Son descriptif et ses compteurs vivent en base
+(DocumentBatch), visibles du web comme de tous les workers : chaque analyse
+incrémente success / failed à son issue finale (après ses propres essais),
+ce qui donne la progression sans toucher aux résultats Celery.
+
+Un utilisateur n'a qu'un lot en cours à la fois (contrainte d'unicité sur
+les lots non terminés). Un lot est terminé par sa synthèse, par l'errback
+du chord si une file échoue, ou d'office une fois son échéance passée
+(DOCUMENTS_BATCH_DOCUMENT_TIMEOUT par document d'une file) si une file
+ne se termine jamais.
+"""
+import math
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentBatch
+
+
+# Durée de conservation d'un lot terminé (progression consultable)
+BATCH_RETENTION = timedelta(hours=24)
+
+
+class BatchAlreadyRunning(Exception):
+    """L'utilisateur a déjà un lot en cours"""
+
+
+def create_batch(batch_id, user_id, document_ids):
+    """
+    Enregistrer un lot comme lot en cours de l'utilisateur
+
+    Raises:
+        BatchAlreadyRunning
+    """
+    DocumentBatch.objects.filter(
+        user_id=user_id, finished_at__lt=timezone.now() - BATCH_RETENTION
+    ).delete()
+    try:
+        with transaction.atomic():
+            return DocumentBatch.objects.create(
+                id=batch_id,
+                user_id=user_id,
+                document_ids=list(document_ids),
+                total=len(document_ids),
+                lanes=batch_lanes(len(document_ids)),
+            )
+    except IntegrityError:
+        raise BatchAlreadyRunning()
+
+
+def batch_lanes(total):
+    """Nombre d'analyses menées en parallèle pour un lot"""
+    return max(1, min(settings.DOCUMENTS_BATCH_USER_CONCURRENCY, total))
+
+
+def batch_deadline(batch):
+    """Échéance d'un lot : chaque file a DOCUMENTS_BATCH_DOCUMENT_TIMEOUT par document"""
+    per_lane = math.ceil(batch.total / batch.lanes)
+    return batch.created_at + timedelta(seconds=settings.DOCUMENTS_BATCH_DOCUMENT_TIMEOUT * per_lane)
+
+
+def _get_batch(batch_id):
+    try:
+        return DocumentBatch.objects.filter(id=uuid.UUID(str(batch_id))).first()
+    except ValueError:
+        return None
+
+
+def record_outcome(batch_id, success):
+    """Compter l'issue finale d'une analyse du lot (un UPDATE relatif)"""
+    field = 'success' if success else 'failed'
+    DocumentBatch.objects.filter(id=batch_id).update(**{field: F(field) + 1})
+
+
+def _progress(batch):
+    return {
+        'task_id': str(batch.id),
+        'user_id': batch.user_id,
+        'state': 'running' if batch.finished_at is None else 'completed',
+        'total': batch.total,
+        'success': batch.success,
+        'failed': batch.failed,
+        'pending': max(0, batch.total - batch.success - batch.failed),
+        'concurrency': batch.lanes,
+        'created_at': batch.created_at.isoformat(),
+        'summary': batch.summary,
+    }
+
+
+def get_progress(batch_id):
+    """Progression d'un lot (None s'il est inconnu ou purgé)"""
+    batch = _get_batch(batch_id)
+    if batch is None:
+        return None
+    return _progress(batch)
+
+
+def get_active_batch(user_id):
+    """Lot en cours de l'utilisateur (None si aucun ; un lot échu est terminé d'office)"""
+    batch = DocumentBatch.objects.filter(user_id=user_id, finished_at__isnull=True).first()
+    if batch is None:
+        return None
+    if timezone.now() > batch_deadline(batch):
+        close_batch(batch.id, {
+            'total': batch.total,
+            'success': batch.success,
+            'failed': batch.failed,
+            'error': 'Batch timed out',
+        })
+        return None
+    return _progress(batch)
+
+
+def close_batch(batch_id, summary):
+    """
+    Ranger la synthèse du lot et libérer l'utilisateur
+
+    Returns:
+        False si le lot était déjà terminé (la première synthèse est gardée)
+    """
+    return DocumentBatch.objects.filter(id=batch_id, finished_at__isnull=True).update(
+        summary=summary, finished_at=timezone.now()
+    ) == 1
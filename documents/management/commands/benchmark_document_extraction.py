@@ -0,0 +1,123 @@
+import difflib
+import resource
+import time
+from pathlib import Path
+
+import pytesseract
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, ImageSequence
+from PyPDF2 import PdfReader
+
+from documents.services.analyzer import document_analyzer
+
+
+EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg', '.tif', '.tiff'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the text-layer-first / preprocessed OCR pipeline with the former extraction '
+        '(PDF text layer only, full-resolution OCR of images) on a corpus. '
+        'A <file>.gt.txt next to a document is used as ground truth for accuracy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Documents or directories of documents')
+        parser.add_argument('--runs', type=int, default=1, help='Runs per document (median kept)')
+
+    def handle(self, *args, **options):
+        files = self._collect(options['paths'])
+        if not files:
+            raise CommandError('No document found')
+
+        self.stdout.write(
+            f"{'document':<32} {'former (s)':>10} {'cpu':>7} {'acc':>6}   "
+            f"{'new (s)':>8} {'cpu':>7} {'acc':>6} {'ocr pages':>10}"
+        )
+        totals = {'former': [0.0, 0.0], 'new': [0.0, 0.0]}
+        accuracies = {'former': [], 'new': []}
+
+        for path in files:
+            truth = self._ground_truth(path)
+            row = {}
+            for name, extract in (('former', self._former), ('new', self._new)):
+                text, wall, cpu, metrics = self._measure(extract, path, options['runs'])
+                accuracy = self._accuracy(text, truth)
+                totals[name][0] += wall
+                totals[name][1] += cpu
+                if accuracy is not None:
+                    accuracies[name].append(accuracy)
+                row[name] = (wall, cpu, accuracy, metrics)
+
+            ocr_pages = (row['new'][3] or {}).get('ocr_pages', '-')
+            self.stdout.write(
+                f"{path.name[:32]:<32} {row['former'][0]:>10.2f} {row['former'][1]:>7.2f} "
+                f"{self._fmt(row['former'][2]):>6}   {row['new'][0]:>8.2f} {row['new'][1]:>7.2f} "
+                f"{self._fmt(row['new'][2]):>6} {str(ocr_pages):>10}"
+            )
+
+        self.stdout.write('')
+        for name in ('former', 'new'):
+            mean = sum(accuracies[name]) / len(accuracies[name]) if accuracies[name] else None
+            self.stdout.write(
+                f"{name:<8} wall {totals[name][0]:.2f}s  cpu {totals[name][1]:.2f}s  "
+                f"accuracy {self._fmt(mean)}"
+            )
+
+    def _collect(self, paths):
+        files = []
+        for raw in paths:
+            path = Path(raw)
+            candidates = sorted(path.rglob('*')) if path.is_dir() else [path]
+            files.extend(p for p in candidates if p.is_file() and p.suffix.lower() in EXTENSIONS)
+        return files
+
+    def _ground_truth(self, path):
+        truth = path.with_name(path.name + '.gt.txt')
+        return truth.read_text(encoding='utf-8') if truth.exists() else None
+
+    # Extractions compared
+
+    def _former(self, path):
+        """Extraction before the hybrid pipeline"""
+        if path.suffix.lower() == '.pdf':
+            reader = PdfReader(str(path))
+            return '\n'.join(page.extract_text() or '' for page in reader.pages).strip(), None
+        texts = []
+        with Image.open(path) as image:
+            for frame in ImageSequence.Iterator(image):
+                texts.append(pytesseract.image_to_string(
+                    frame.convert('RGB'), lang='fra+eng', config=document_analyzer.tesseract_config
+                ))
+        return '\n'.join(texts).strip(), None
+
+    def _new(self, path):
+        return document_analyzer.extract_text_with_metrics(str(path))
+
+    # Measures
+
+    def _measure(self, extract, path, runs):
+        """Median wall time and CPU time (this process + tesseract children)"""
+        samples = []
+        for _ in range(runs):
+            before = self._cpu()
+            start = time.perf_counter()
+            text, metrics = extract(path)
+            samples.append((time.perf_counter() - start, self._cpu() - before, text, metrics))
+        samples.sort(key=lambda sample: sample[0])
+        wall, cpu, text, metrics = samples[len(samples) // 2]
+        return text, wall, cpu, metrics
+
+    def _cpu(self):
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+    def _accuracy(self, text, truth):
+        """Word-level similarity with the ground truth (0-1)"""
+        if truth is None:
+            return None
+        return difflib.SequenceMatcher(None, text.lower().split(), truth.lower().split()).ratio()
+
+    def _fmt(self, value):
+        return '-' if value is None else f'{value:.3f}'
@@ -0,0 +1,89 @@
+import random
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.analyzer import SERVICE_RULES
+from documents.services.analyzer import ANALYZER_RULES, document_analyzer
+
+
+SAMPLES = [
+    "GARAGE DU CENTRE\n12 rue de la Gare\nFacture N° facture : F2024-{n}\nDate : {d}/03/2024\n"
+    "Vidange + filtre à huile 89,90 €\nPlaquettes de frein avant 120,00 €\nTotal TTC : 209,90 €\n"
+    "Kilométrage : {km} km\nMerci de votre visite",
+    "CERTIFICAT D'IMMATRICULATION\nCarte grise\nImmatriculation : AB-{n:03d}-CD\nMarque : RENAULT\n"
+    "Modèle : CLIO\nVIN VF1BB05CF{n:08d}\nDate de première immatriculation {d}/06/2019",
+    "ATTESTATION D'ASSURANCE\nAssureur : MAIF\nN° contrat : C{n}\nPolice d'assurance automobile\n"
+    "Valable jusqu'au {d}/12/2025\nVéhicule immatriculé AB-{n:03d}-CD",
+    "Révision des {km} km\nEntretien périodique, remplacement des pneus avant\nVidange moteur\n"
+    "Garage Martin - ticket de caisse n°{n}",
+    "CONTRAT DE LOCATION\nArticle 1 : objet de la convention\nArticle 2 : durée\n"
+    "Le signataire reconnaît avoir pris connaissance des conditions générales.",
+    "Reçu de paiement\nTicket n°{n}\nMontant 45,00 EUR\nMerci de votre visite",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the single-pass document rule engine against one regex search per rule '
+        '(the former approach) on a corpus of sample texts, and checks both give the same matches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=2000, help='Synthetic texts to generate')
+        parser.add_argument('--pages', type=int, default=3, help='Repetitions of a sample per text (longer OCR output)')
+        parser.add_argument('--corpus', help='Directory of .txt files to use instead of synthetic texts')
+
+    def handle(self, *args, **options):
+        texts = self._corpus(options)
+        if not texts:
+            raise CommandError('Empty corpus')
+        self.stdout.write(f'{len(texts)} texts, {sum(len(t) for t in texts) / len(texts):.0f} chars on average')
+
+        for name, engine in (('analyzer', ANALYZER_RULES), ('service', SERVICE_RULES)):
+            mismatches = sum(1 for text in texts if not self._same(engine, text))
+            separate = self._time(engine.scan_separately, texts)
+            single = self._time(engine.scan, texts)
+            self.stdout.write(
+                f"{name:<9} {len(engine.rules):>3} rules  per-rule search {separate:8.1f} ms  "
+                f"single pass {single:8.1f} ms  x{separate / single:.2f}  mismatches {mismatches}"
+            )
+
+        # Classification + extraction as run by the analysis task
+        def analyze(text):
+            document_type = document_analyzer.detect_document_type(text)
+            document_analyzer.parse_structured_data(text, document_type)
+        self.stdout.write(f"full analysis (classification + fields): {self._time(analyze, texts):.1f} ms")
+
+    def _corpus(self, options):
+        if options['corpus']:
+            return [path.read_text(encoding='utf-8') for path in sorted(Path(options['corpus']).glob('*.txt'))]
+
+        rng = random.Random(42)
+        texts = []
+        for n in range(options['documents']):
+            sample = rng.choice(SAMPLES)
+            pages = [
+                sample.format(n=n, d=rng.randint(10, 28), km=rng.randint(10, 250) * 1000)
+                for _ in range(options['pages'])
+            ]
+            texts.append('\n\n'.join(pages))
+        return texts
+
+    def _same(self, engine, text):
+        expected = engine.scan_separately(text)
+        found = engine.scan(text)
+        return expected.keys() == found.keys() and all(
+            expected[name].span() == found[name].span() for name in expected
+        )
+
+    def _time(self, function, texts):
+        """Best of 3 (ms) over the whole corpus"""
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            for text in texts:
+                function(text)
+            timings.append((time.perf_counter() - start) * 1000)
+        return min(timings)
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_history_cursor_indexes'),
+        ('vehicles', '0002_odometer_readings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentAnalysisCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('analyzer_version', models.CharField(max_length=32)),
+                ('extracted_text', models.TextField(blank=True, default='')),
+                ('analysis_data', models.JSONField(blank=True, default=dict)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'document_analysis_cache',
+            },
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['content_hash'], name='documents_content_25403e_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentanalysiscache',
+            constraint=models.UniqueConstraint(fields=('content_hash', 'analyzer_version'), name='document_analysis_cache_key'),
+        ),
+    ]
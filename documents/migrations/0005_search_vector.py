@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def backfill_search_vector(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    vector = None
+    for config in settings.DOCUMENTS_SEARCH_CONFIGS:
+        part = (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('extracted_text', weight='B', config=config)
+            + SearchVector('description', weight='C', config=config)
+        )
+        vector = part if vector is None else vector + part
+
+    # Par tranches d'ids : chaque UPDATE reste court (migration non atomique)
+    last_id = 0
+    while True:
+        ids = list(
+            Document.objects.filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not ids:
+            break
+        Document.objects.filter(id__gte=ids[0], id__lte=ids[-1]).update(search_vector=vector)
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('documents', '0004_analysis_cache'),
+        ('vehicles', '0002_odometer_readings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        # Remplissage avant l'index : il est construit une fois plutôt que mis à jour ligne à ligne
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='document',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='documents_search_vector_gin'),
+        ),
+    ]
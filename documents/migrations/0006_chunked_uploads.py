@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:14
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0005_search_vector'),
+        ('vehicles', '0002_odometer_readings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('document_type', models.CharField(choices=[('invoice', 'Invoice'), ('insurance', 'Insurance'), ('registration', 'Registration'), ('inspection', 'Inspection'), ('maintenance', 'Maintenance Record'), ('other', 'Other')], default='other', max_length=20)),
+                ('filename', models.CharField(max_length=255)),
+                ('mime_type', models.CharField(max_length=100)),
+                ('total_size', models.BigIntegerField()),
+                ('received_size', models.BigIntegerField(default=0)),
+                ('parts', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('committed', 'Committed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='documents.document')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_uploads', to=settings.AUTH_USER_MODEL)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_uploads', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'document_uploads',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'status'], name='document_up_user_id_5d14c1_idx'), models.Index(fields=['updated_at'], name='document_up_updated_c7630a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_storage_usage(apps, schema_editor):
+    Document = apps.get_model('documents', 'Document')
+    DocumentStorageUsage = apps.get_model('documents', 'DocumentStorageUsage')
+    rows = (
+        Document.objects.order_by().values('user_id')
+        .annotate(document_count=Count('id'), total_bytes=Coalesce(Sum('file_size'), 0))
+    )
+    DocumentStorageUsage.objects.bulk_create(
+        [DocumentStorageUsage(**row) for row in rows.iterator()], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0006_chunked_uploads'),
+        ('users', '0005_remove_user_users_stripe__0fdd23_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentStorageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document_storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('document_count', models.PositiveIntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'document_storage_usage',
+            },
+        ),
+        migrations.RunPython(backfill_storage_usage, migrations.RunPython.noop),
+    ]
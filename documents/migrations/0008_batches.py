@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_storage_usage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBatch',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('document_ids', models.JSONField(default=list)),
+                ('total', models.PositiveIntegerField()),
+                ('lanes', models.PositiveSmallIntegerField()),
+                ('success', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('summary', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'document_batches',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('finished_at__isnull', True)), fields=('user',), name='document_batches_one_running_per_user')],
+            },
+        ),
+    ]
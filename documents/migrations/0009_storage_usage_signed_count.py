@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_batches'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentstorageusage',
+            name='document_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
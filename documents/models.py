@@ -1,6 +1,12 @@
-from django.db import models
+import uuid
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from vehicles.models import Vehicle
+from .search import SEARCH_FIELDS, update_search_vectors
 
 
 class Document(models.Model):
@@ -41,11 +47,15 @@ class Document(models.Model):
     file = models.FileField(upload_to='documents/%Y/%m/%d/')
     file_size = models.IntegerField(blank=True, null=True)  # in bytes
     mime_type = models.CharField(max_length=100, blank=True, null=True)
+    # SHA-256 of the file content, computed at upload (analysis cache key)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, editable=False)
     
     # OCR/Analysis
     extracted_text = models.TextField(blank=True, null=True)
     analysis_data = models.JSONField(default=dict, blank=True)
     is_analyzed = models.BooleanField(default=False)
+    # Full-text index of title / OCR text / description (see documents.search)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -56,10 +66,258 @@ class Document(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user']),
-            models.Index(fields=['vehicle']),
+            models.Index(fields=['vehicle', '-created_at', '-id']),
             models.Index(fields=['document_type']),
+            models.Index(fields=['content_hash']),
+            GinIndex(fields=['search_vector'], name='documents_search_vector_gin'),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.user.email}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stored size, to apply only the difference to the storage counter on save
+        if 'file_size' in instance.__dict__:
+            instance._stored_file_size = instance.file_size
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or SEARCH_FIELDS & set(update_fields):
+            update_search_vectors(Document.objects.filter(pk=self.pk))
+
+
+class DocumentAnalysisCache(models.Model):
+    """Analysis result of a file content, shared by every upload of that content"""
+    
+    content_hash = models.CharField(max_length=64)
+    analyzer_version = models.CharField(max_length=32)
+    
+    extracted_text = models.TextField(blank=True, default='')
+    analysis_data = models.JSONField(default=dict, blank=True)
+    
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'document_analysis_cache'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_hash', 'analyzer_version'],
+                name='document_analysis_cache_key'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.analyzer_version})"
 
+
+
+class DocumentUpload(models.Model):
+    """Resumable chunked upload of a document file (see documents.uploads)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('committed', 'Committed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='document_uploads'
+    )
+    
+    # Document created on commit
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='document_uploads',
+        blank=True,
+        null=True
+    )
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True, null=True)
+    document_type = models.CharField(
+        max_length=20,
+        choices=Document.DOCUMENT_TYPE_CHOICES,
+        default='other'
+    )
+    filename = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100)
+    
+    # Progress: bytes received so far is the offset of the next chunk
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    parts = models.JSONField(default=list, blank=True)  # storage names, in order
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.SET_NULL,
+        related_name='upload',
+        blank=True,
+        null=True
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_uploads'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'status']),
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+
+class DocumentStorageUsage(models.Model):
+    """Storage used by a user's documents, kept up to date on every document write"""
+    
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document_storage_usage'
+    )
+    # Signed: a drifted counter must not make deletions fail (fixed by reconciliation)
+    document_count = models.IntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_storage_usage'
+    
+    def __str__(self):
+        return f"{self.user_id}: {self.total_bytes} bytes in {self.document_count} documents"
+    
+    @property
+    def quota_bytes(self):
+        """Storage quota of the user (None if unlimited)"""
+        return settings.DOCUMENTS_USER_STORAGE_QUOTA or None
+    
+    def exceeds_quota(self, additional_bytes):
+        return self.quota_bytes is not None and self.total_bytes + additional_bytes > self.quota_bytes
+    
+    @staticmethod
+    def count_documents(user_id):
+        """Actual usage recomputed from the documents table"""
+        return Document.objects.filter(user_id=user_id).aggregate(
+            document_count=Count('id'),
+            total_bytes=Coalesce(Sum('file_size'), 0),
+        )
+    
+    @classmethod
+    def for_user(cls, user_id):
+        """Usage row of a user, created from the documents table if missing"""
+        usage = cls.objects.filter(user_id=user_id).first()
+        if usage is None:
+            try:
+                with transaction.atomic():
+                    usage = cls.objects.create(user_id=user_id, **cls.count_documents(user_id))
+            except IntegrityError:
+                usage = cls.objects.get(user_id=user_id)
+        return usage
+    
+    @classmethod
+    def reserve(cls, user_id, additional_bytes):
+        """
+        Check the quota and hold ``additional_bytes`` of it before a document write
+        
+        The usage row is locked only while checking and holding: concurrent
+        writes of the same user see each other's holds, so they cannot
+        overshoot the quota together, and the file itself is written without
+        the lock. The write is counted as usual by the signals; the hold is
+        then given back with release(), whether the write succeeded or not
+        (a hold lost with its process is fixed by the reconciliation).
+        
+        Returns:
+            False if the quota would be exceeded (nothing held)
+        """
+        if additional_bytes <= 0:
+            return True
+        with transaction.atomic():
+            cls.for_user(user_id)
+            usage = cls.objects.select_for_update().get(user_id=user_id)
+            if usage.exceeds_quota(additional_bytes):
+                return False
+            cls.objects.filter(user_id=user_id).update(total_bytes=F('total_bytes') + additional_bytes)
+        return True
+    
+    @classmethod
+    def release(cls, user_id, reserved_bytes):
+        """Give back a hold taken by reserve()"""
+        if reserved_bytes > 0:
+            cls.objects.filter(user_id=user_id).update(total_bytes=F('total_bytes') - reserved_bytes)
+    
+    @classmethod
+    def apply_change(cls, user_id, bytes_delta=0, count_delta=0):
+        """
+        Apply a document write to the counters in one atomic UPDATE
+        
+        The row is updated relative to its current values, so concurrent
+        uploads and deletions never overwrite each other. A missing row is
+        created from the documents table, which already includes this write;
+        removals never create it (the user may be being deleted).
+        """
+        updated = cls.objects.filter(user_id=user_id).update(
+            total_bytes=F('total_bytes') + bytes_delta,
+            document_count=F('document_count') + count_delta,
+        )
+        if updated or (bytes_delta <= 0 and count_delta <= 0):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, **cls.count_documents(user_id))
+        except IntegrityError:
+            # Created concurrently from a count that may miss this write
+            cls.objects.filter(user_id=user_id).update(
+                total_bytes=F('total_bytes') + bytes_delta,
+                document_count=F('document_count') + count_delta,
+            )
+
+
+class DocumentBatch(models.Model):
+    """Batch analysis of documents: progress shared by the web and Celery workers (see documents.batch)"""
+    
+    id = models.UUIDField(primary_key=True, editable=False)  # task_id of the chord callback
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='document_batches'
+    )
+    document_ids = models.JSONField(default=list)
+    total = models.PositiveIntegerField()
+    lanes = models.PositiveSmallIntegerField()
+    
+    # Final outcome of each analysis, counted by the workers
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    
+    summary = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        db_table = 'document_batches'
+        ordering = ['-created_at']
+        constraints = [
+            # One running batch per user
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(finished_at__isnull=True),
+                name='document_batches_one_running_per_user'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.id} ({self.success + self.failed}/{self.total})"
@@ -0,0 +1,100 @@
+"""
+Recherche plein texte dans les documents
+
+Chaque document porte un ``search_vector`` pondéré (titre > texte OCR >
+description) indexé en GIN, calculé pour chacune des configurations de
+DOCUMENTS_SEARCH_CONFIGS (français et anglais) : une requête correspond si
+elle correspond dans l'une d'elles. Le filtrage passe par l'index ; les
+extraits surlignés (ts_headline, coûteux) ne sont calculés que pour la
+page de résultats renvoyée.
+"""
+from html import escape
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVector
+)
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+
+
+# Champs qui alimentent le vecteur de recherche
+SEARCH_FIELDS = {'title', 'extracted_text', 'description'}
+
+# Marqueurs passés à ts_headline, remplacés par <mark> après échappement HTML
+_START_SEL = '\x02'
+_STOP_SEL = '\x03'
+
+
+def document_search_vector():
+    """Expression du vecteur de recherche pondéré de la table des documents"""
+    vector = None
+    for config in settings.DOCUMENTS_SEARCH_CONFIGS:
+        part = (
+            SearchVector('title', weight='A', config=config)
+            + SearchVector('extracted_text', weight='B', config=config)
+            + SearchVector('description', weight='C', config=config)
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def update_search_vectors(queryset):
+    """Recalculer le vecteur de recherche des documents d'un queryset (un UPDATE)"""
+    return queryset.update(search_vector=document_search_vector())
+
+
+def document_search_query(text):
+    """Requête (syntaxe web : "expression", -exclu, or) dans toutes les configurations"""
+    query = None
+    for config in settings.DOCUMENTS_SEARCH_CONFIGS:
+        part = SearchQuery(text, search_type='websearch', config=config)
+        query = part if query is None else query | part
+    return query
+
+
+def search_documents(queryset, text):
+    """
+    Filtrer et classer les documents correspondant à une recherche
+
+    Les résultats sont annotés de ``search_rank`` et triés par pertinence,
+    puis du plus récent au plus ancien.
+    """
+    query = document_search_query(text)
+    return queryset.filter(
+        search_vector=query
+    ).annotate(
+        search_rank=SearchRank(F('search_vector'), query)
+    ).order_by('-search_rank', '-created_at', '-id')
+
+
+def document_headlines(queryset, documents, text):
+    """
+    Extraits surlignés (HTML, termes entre <mark>) de quelques documents
+
+    Returns:
+        {document_id: extrait du texte OCR, à défaut du titre}
+    """
+    ids = [document.id for document in documents]
+    if not ids:
+        return {}
+
+    rows = queryset.filter(id__in=ids).order_by().annotate(
+        headline=SearchHeadline(
+            Coalesce(NullIf('extracted_text', Value('')), 'title'),
+            document_search_query(text),
+            config=settings.DOCUMENTS_SEARCH_CONFIGS[0],
+            start_sel=_START_SEL,
+            stop_sel=_STOP_SEL,
+            max_fragments=3,
+            min_words=5,
+            max_words=20,
+            fragment_delimiter=' … ',
+        )
+    ).values_list('id', 'headline')
+
+    # Le texte OCR est échappé : seuls les <mark> du surlignage restent du HTML
+    return {
+        document_id: escape(headline or '').replace(_START_SEL, '<mark>').replace(_STOP_SEL, '</mark>')
+        for document_id, headline in rows
+    }
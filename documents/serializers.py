@@ -1,8 +1,27 @@
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from .models import Document
+from .models import Document, DocumentStorageUsage, DocumentUpload
+from .services.cache import compute_content_hash
+from .uploads import upload_expires_at
 from vehicles.serializers import VehicleSerializer
 
 
+# Types MIME autorisés à l'upload
+ALLOWED_MIME_TYPES = [
+    'application/pdf',
+    'image/jpeg',
+    'image/jpg',
+    'image/png',
+    'image/gif',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+]
+
+# Types analysés (OCR) après l'upload
+ANALYZABLE_MIME_TYPES = ['image/jpeg', 'image/jpg', 'image/png', 'application/pdf']
+
+
 class DocumentSerializer(serializers.ModelSerializer):
     """Document serializer"""
     
@@ -13,11 +32,11 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = [
             'id', 'user', 'vehicle', 'vehicle_info', 'document_type', 'title',
-            'description', 'file', 'file_url', 'file_size', 'mime_type',
+            'description', 'file', 'file_url', 'file_size', 'mime_type', 'content_hash',
             'extracted_text', 'analysis_data', 'is_analyzed',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'file_size', 'mime_type', 'extracted_text', 
+        read_only_fields = ['id', 'user', 'file_size', 'mime_type', 'content_hash', 'extracted_text', 
                             'analysis_data', 'is_analyzed', 'created_at', 'updated_at']
     
     def get_file_url(self, obj):
@@ -57,17 +76,7 @@ class DocumentCreateSerializer(serializers.ModelSerializer):
                 })
             
             # Types MIME autorisés
-            allowed_types = [
-                'application/pdf',
-                'image/jpeg',
-                'image/jpg',
-                'image/png',
-                'image/gif',
-                'application/msword',
-                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            ]
-            
-            if file.content_type not in allowed_types:
+            if file.content_type not in ALLOWED_MIME_TYPES:
                 raise serializers.ValidationError({
                     'file': f'File type {file.content_type} is not allowed. Allowed types: PDF, JPEG, PNG, GIF, DOC, DOCX.'
                 })
@@ -85,13 +94,15 @@ class DocumentCreateSerializer(serializers.ModelSerializer):
         if file:
             validated_data['file_size'] = file.size
             validated_data['mime_type'] = file.content_type
+            validated_data['content_hash'] = compute_content_hash(file)
         
         document = super().create(validated_data)
 
         # Trigger OCR processing asynchronously via Celery for images and PDFs
         from documents.tasks import async_analyze_document
-        if document.mime_type in ['image/jpeg', 'image/jpg', 'image/png', 'application/pdf']:
-            async_analyze_document.delay(document.id)
+        if document.mime_type in ANALYZABLE_MIME_TYPES:
+            # Après le commit : le worker doit lire le document enregistré
+            transaction.on_commit(lambda: async_analyze_document.delay(document.id))
         
         return document
 
@@ -122,17 +133,7 @@ class DocumentUpdateSerializer(serializers.ModelSerializer):
                 })
             
             # Types MIME autorisés
-            allowed_types = [
-                'application/pdf',
-                'image/jpeg',
-                'image/jpg',
-                'image/png',
-                'image/gif',
-                'application/msword',
-                'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            ]
-            
-            if file.content_type not in allowed_types:
+            if file.content_type not in ALLOWED_MIME_TYPES:
                 raise serializers.ValidationError({
                     'file': f'File type {file.content_type} is not allowed. Allowed types: PDF, JPEG, PNG, GIF, DOC, DOCX.'
                 })
@@ -146,6 +147,7 @@ class DocumentUpdateSerializer(serializers.ModelSerializer):
         if file:
             validated_data['file_size'] = file.size
             validated_data['mime_type'] = file.content_type
+            validated_data['content_hash'] = compute_content_hash(file)
             
             # Reset analysis if file changed
             validated_data['extracted_text'] = None
@@ -155,8 +157,70 @@ class DocumentUpdateSerializer(serializers.ModelSerializer):
         document = super().update(instance, validated_data)
 
         # Trigger OCR processing if file changed
-        if file and document.mime_type in ['image/jpeg', 'image/jpg', 'image/png', 'application/pdf']:
+        if file and document.mime_type in ANALYZABLE_MIME_TYPES:
             from documents.tasks import async_analyze_document
-            async_analyze_document.delay(document.id)
+            # Après le commit : le worker doit lire le nouveau fichier
+            transaction.on_commit(lambda: async_analyze_document.delay(document.id))
         
         return document
+
+
+class DocumentUploadStartSerializer(serializers.ModelSerializer):
+    """Start of a chunked upload: document metadata and total file size"""
+    
+    class Meta:
+        model = DocumentUpload
+        fields = ['vehicle', 'document_type', 'title', 'description', 'filename', 'mime_type', 'total_size']
+    
+    def validate_vehicle(self, vehicle):
+        # Vérifie que le véhicule appartient à l'utilisateur
+        request = self.context.get('request')
+        if vehicle and request and vehicle.owner != request.user:
+            raise serializers.ValidationError('You can only create documents for your own vehicles.')
+        return vehicle
+    
+    def validate_mime_type(self, mime_type):
+        if mime_type not in ALLOWED_MIME_TYPES:
+            raise serializers.ValidationError(
+                f'File type {mime_type} is not allowed. Allowed types: PDF, JPEG, PNG, GIF, DOC, DOCX.'
+            )
+        return mime_type
+    
+    def validate_total_size(self, total_size):
+        max_size = settings.DOCUMENTS_UPLOAD_MAX_SIZE
+        if total_size <= 0 or total_size > max_size:
+            raise serializers.ValidationError(
+                f'File size must be between 1 byte and {max_size / 1024 / 1024}MB.'
+            )
+        
+        request = self.context.get('request')
+        if request and DocumentStorageUsage.for_user(request.user.id).exceeds_quota(total_size):
+            raise serializers.ValidationError('Storage quota exceeded.')
+        return total_size
+    
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    """Progress of a chunked upload (offset = bytes received, next chunk position)"""
+    
+    offset = serializers.IntegerField(source='received_size', read_only=True)
+    chunk_max_size = serializers.SerializerMethodField()
+    expires_at = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DocumentUpload
+        fields = [
+            'id', 'vehicle', 'document_type', 'title', 'description', 'filename', 'mime_type',
+            'total_size', 'offset', 'chunk_max_size', 'status', 'document', 'expires_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+    
+    def get_chunk_max_size(self, obj):
+        return settings.DOCUMENTS_UPLOAD_CHUNK_MAX_SIZE
+    
+    def get_expires_at(self, obj):
+        return upload_expires_at(obj)
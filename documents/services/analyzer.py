@@ -1,20 +1,110 @@
 """
 Service d'analyse de documents avec OCR
 """
-import pytesseract
+from io import BytesIO
+from django.conf import settings
 from PIL import Image
 from PyPDF2 import PdfReader
 import json
 import re
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import logging
+from .ocr import OCREngine
+from .rules import RuleEngine
 
 logger = logging.getLogger(__name__)
 
 
+# Motifs identifiant chaque type de document (score = nombre de motifs trouvés)
+TYPE_PATTERNS = {
+    'invoice': [
+        r'facture',
+        r'invoice',
+        r'montant\s+ttc',
+        r'total\s+ttc',
+        r'n[°o]\s*facture'
+    ],
+    'registration': [
+        r'carte\s+grise',
+        r'certificat\s+d[\']immatriculation',
+        r'immatriculation',
+        r'marque\s+:',
+        r'modèle\s+:'
+    ],
+    'insurance': [
+        r'attestation\s+d[\']assurance',
+        r'contrat\s+d[\']assurance',
+        r'assureur',
+        r'police\s+d[\']assurance',
+        r'numéro\s+de\s+contrat'
+    ],
+    'maintenance': [
+        r'entretien',
+        r'révision',
+        r'maintenance',
+        r'vidange',
+        r'pneus',
+        r'garage'
+    ],
+    'receipt': [
+        r'reçu',
+        r'ticket',
+        r'caisse',
+        r'merci\s+de\s+votre\s+visite'
+    ],
+    'contract': [
+        r'contrat',
+        r'convention',
+        r'signataire',
+        r'article\s+\d+'
+    ]
+}
+
+# Champs extraits (première occurrence dans le texte)
+FIELD_PATTERNS = {
+    'invoice_number': re.compile(r'n[°o]\s*facture\s*:?\s*(\w+)', re.IGNORECASE),
+    'date': re.compile(r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})'),
+    'total_amount': re.compile(r'total\s+ttc\s*:?\s*([\d\s]+[,.]?\d*)\s*€?', re.IGNORECASE),
+    'license_plate': re.compile(r'([A-Z]{2}[-\s]?\d{3}[-\s]?[A-Z]{2})'),
+    'brand': re.compile(r'marque\s*:?\s*([A-Z\s]+)', re.IGNORECASE),
+    'model': re.compile(r'modèle\s*:?\s*([A-Z0-9\s]+)', re.IGNORECASE),
+    'contract_number': re.compile(r'n[°o]\s*contrat\s*:?\s*(\w+)', re.IGNORECASE),
+    'insurer': re.compile(r'assureur\s*:?\s*([A-Z\s]+)', re.IGNORECASE),
+    'service:vidange': re.compile(r'vidange', re.IGNORECASE),
+    'service:pneus': re.compile(r'pneus', re.IGNORECASE),
+    'service:revision': re.compile(r'révision', re.IGNORECASE),
+    'mileage': re.compile(r'(\d{1,3}[\s\.]?\d{3})\s*km', re.IGNORECASE),
+}
+
+MAINTENANCE_SERVICES = [
+    ('service:vidange', 'Vidange'),
+    ('service:pneus', 'Pneus'),
+    ('service:revision', 'Révision'),
+]
+
+# Les mots-clés de type sont cherchés sans tenir compte de la casse
+TYPE_RULE_NAMES = {
+    doc_type: [f'type:{doc_type}:{index}' for index in range(len(patterns))]
+    for doc_type, patterns in TYPE_PATTERNS.items()
+}
+
+# Toutes les règles de l'analyseur, compilées une fois et évaluées en un passage
+ANALYZER_RULES = RuleEngine({
+    **{
+        f'type:{doc_type}:{index}': re.compile(pattern, re.IGNORECASE)
+        for doc_type, patterns in TYPE_PATTERNS.items()
+        for index, pattern in enumerate(patterns)
+    },
+    **FIELD_PATTERNS,
+})
+
+
 class DocumentAnalyzer:
     """Service d'analyse de documents avec OCR et détection de type"""
     
+    # Version de l'analyse : à incrémenter dès que son résultat change (invalide le cache)
+    VERSION = '2'
+    
     # Types de documents supportés
     DOCUMENT_TYPES = {
         'invoice': 'Facture',
@@ -29,6 +119,8 @@ class DocumentAnalyzer:
     def __init__(self):
         """Initialiser l'analyseur"""
         self.tesseract_config = '--oem 3 --psm 6'  # OCR Engine Mode 3, Page Seg Mode 6
+        # Français + Anglais, pages / bandes réparties sur un pool borné
+        self.ocr_engine = OCREngine(lang='fra+eng', config=self.tesseract_config)
     
     def analyze_document(self, file_path: str) -> Dict:
         """
@@ -42,15 +134,18 @@ class DocumentAnalyzer:
         """
         try:
             # 1. Extraire le texte avec OCR
-            extracted_text = self.extract_text(file_path)
+            extracted_text, ocr_metrics = self.extract_text_with_metrics(file_path)
+            
+            # 2. Un seul passage des règles sur le texte
+            matches = ANALYZER_RULES.scan(extracted_text)
             
-            # 2. Détecter le type de document
-            document_type = self.detect_document_type(extracted_text)
+            # 3. Détecter le type de document
+            document_type = self.detect_document_type(extracted_text, matches)
             
-            # 3. Parser les données structurées selon le type
-            structured_data = self.parse_structured_data(extracted_text, document_type)
+            # 4. Parser les données structurées selon le type
+            structured_data = self.parse_structured_data(extracted_text, document_type, matches)
             
-            # 4. Calculer la confiance de l'analyse
+            # 5. Calculer la confiance de l'analyse
             confidence = self.calculate_confidence(extracted_text, structured_data)
             
             return {
@@ -58,6 +153,7 @@ class DocumentAnalyzer:
                 'document_type': document_type,
                 'structured_data': structured_data,
                 'confidence': confidence,
+                'ocr_metrics': ocr_metrics,
                 'status': 'success'
             }
             
@@ -82,99 +178,115 @@ class DocumentAnalyzer:
         Returns:
             Texte extrait
         """
+        return self.extract_text_with_metrics(file_path)[0]
+    
+    def extract_text_with_metrics(self, file_path: str) -> Tuple[str, Optional[Dict]]:
+        """
+        Extraire le texte et les métriques OCR (None sans OCR)
+        
+        Args:
+            file_path: Chemin vers le fichier
+            
+        Returns:
+            (texte extrait, métriques de débit du moteur OCR)
+        """
         try:
             if file_path.lower().endswith('.pdf'):
-                reader = PdfReader(file_path)
-                text = ''
-                for page in reader.pages:
-                    text += (page.extract_text() or '') + '\n'
-                return text.strip()
+                return self.extract_pdf_text(file_path)
 
-            # Ouvrir l'image
-            image = Image.open(file_path)
-            
-            # Convertir en RGB si nécessaire
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Extraire le texte avec Tesseract
-            text = pytesseract.image_to_string(
-                image,
-                lang='fra+eng',  # Français + Anglais
-                config=self.tesseract_config
-            )
-            
-            return text.strip()
+            # OCR parallèle page par page (et par bandes pour les pages hautes)
+            return self.ocr_engine.ocr_file(file_path)
             
         except Exception as e:
             logger.error(f"Error extracting text from {file_path}: {str(e)}")
             raise
     
-    def detect_document_type(self, text: str) -> str:
+    def extract_pdf_text(self, file_path: str) -> Tuple[str, Dict]:
+        """
+        Extraire le texte d'un PDF : couche texte d'abord, OCR des pages scannées
+        
+        Les pages sont lues une à une. Une page dont la couche texte compte
+        moins de DOCUMENTS_PDF_MIN_TEXT_CHARS caractères est considérée
+        comme scannée : ses images sont extraites et passées à l'OCR.
+        
+        Args:
+            file_path: Chemin vers le PDF
+            
+        Returns:
+            (texte extrait dans l'ordre des pages, métriques)
+        """
+        reader = PdfReader(file_path)
+        page_texts = []
+        ocr_targets = []  # index de page de chaque image envoyée à l'OCR
+        
+        def scanned_images():
+            for index, page in enumerate(reader.pages):
+                text = (page.extract_text() or '').strip()
+                page_texts.append(text)
+                if len(text) >= settings.DOCUMENTS_PDF_MIN_TEXT_CHARS:
+                    continue
+                for image in self._page_images(page):
+                    ocr_targets.append(index)
+                    yield image
+        
+        ocr_texts, ocr_metrics = self.ocr_engine.ocr_pages(scanned_images())
+        
+        # Le texte OCR remplace la couche texte (quasi vide) des pages scannées
+        ocr_pages = {}
+        for index, text in zip(ocr_targets, ocr_texts):
+            ocr_pages.setdefault(index, []).append(text)
+        for index, texts in ocr_pages.items():
+            page_texts[index] = '\n'.join(text for text in texts if text) or page_texts[index]
+        
+        metrics = {
+            **ocr_metrics,
+            'pages': len(page_texts),
+            'text_layer_pages': len(page_texts) - len(ocr_pages),
+            'ocr_pages': len(ocr_pages),
+        }
+        return '\n'.join(text for text in page_texts if text).strip(), metrics
+    
+    @staticmethod
+    def _page_images(page):
+        """Images d'une page PDF, avec leur résolution effective (dpi)"""
+        try:
+            files = page.images
+        except Exception as e:
+            logger.warning(f"Cannot read page images: {str(e)}")
+            return
+        
+        page_width_inches = float(page.mediabox.width) / 72 or None
+        for file in files:
+            try:
+                image = Image.open(BytesIO(file.data))
+                image.load()
+            except Exception as e:
+                logger.warning(f"Cannot decode PDF image {file.name}: {str(e)}")
+                continue
+            if page_width_inches:
+                dpi = image.width / page_width_inches
+                image.info['dpi'] = (dpi, dpi)
+            yield image
+    
+    def detect_document_type(self, text: str, matches: Optional[Dict] = None) -> str:
         """
         Détecter le type de document basé sur le texte extrait
         
         Args:
             text: Texte extrait du document
+            matches: Résultat de ANALYZER_RULES.scan(text), s'il est déjà calculé
             
         Returns:
             Type de document détecté
         """
-        text_lower = text.lower()
-        
-        # Patterns pour identifier les types de documents
-        patterns = {
-            'invoice': [
-                r'facture',
-                r'invoice',
-                r'montant\s+ttc',
-                r'total\s+ttc',
-                r'n[°o]\s*facture'
-            ],
-            'registration': [
-                r'carte\s+grise',
-                r'certificat\s+d[\']immatriculation',
-                r'immatriculation',
-                r'marque\s+:',
-                r'modèle\s+:'
-            ],
-            'insurance': [
-                r'attestation\s+d[\']assurance',
-                r'contrat\s+d[\']assurance',
-                r'assureur',
-                r'police\s+d[\']assurance',
-                r'numéro\s+de\s+contrat'
-            ],
-            'maintenance': [
-                r'entretien',
-                r'révision',
-                r'maintenance',
-                r'vidange',
-                r'pneus',
-                r'garage'
-            ],
-            'receipt': [
-                r'reçu',
-                r'ticket',
-                r'caisse',
-                r'merci\s+de\s+votre\s+visite'
-            ],
-            'contract': [
-                r'contrat',
-                r'convention',
-                r'signataire',
-                r'article\s+\d+'
-            ]
-        }
+        if matches is None:
+            matches = ANALYZER_RULES.scan(text)
         
-        # Compter les matches pour chaque type
-        scores = {}
-        for doc_type, type_patterns in patterns.items():
-            score = 0
-            for pattern in type_patterns:
-                if re.search(pattern, text_lower):
-                    score += 1
-            scores[doc_type] = score
+        # Nombre de motifs trouvés pour chaque type
+        scores = {
+            doc_type: sum(1 for name in rule_names if name in matches)
+            for doc_type, rule_names in TYPE_RULE_NAMES.items()
+        }
         
         # Retourner le type avec le meilleur score
         if max(scores.values()) > 0:
@@ -182,108 +294,96 @@ class DocumentAnalyzer:
         
         return 'other'
     
-    def parse_structured_data(self, text: str, document_type: str) -> Dict:
+    def parse_structured_data(self, text: str, document_type: str, matches: Optional[Dict] = None) -> Dict:
         """
         Parser les données structurées selon le type de document
         
         Args:
             text: Texte extrait
             document_type: Type de document détecté
+            matches: Résultat de ANALYZER_RULES.scan(text), s'il est déjà calculé
             
         Returns:
             Données structurées extraites
         """
+        if matches is None:
+            matches = ANALYZER_RULES.scan(text)
+        
         data = {}
         
         if document_type == 'invoice':
-            data = self._parse_invoice(text)
+            data = self._parse_invoice(matches)
         elif document_type == 'registration':
-            data = self._parse_registration(text)
+            data = self._parse_registration(matches)
         elif document_type == 'insurance':
-            data = self._parse_insurance(text)
+            data = self._parse_insurance(matches)
         elif document_type == 'maintenance':
-            data = self._parse_maintenance(text)
+            data = self._parse_maintenance(matches)
         
         return data
     
-    def _parse_invoice(self, text: str) -> Dict:
+    def _parse_invoice(self, matches: Dict) -> Dict:
         """Parser une facture"""
         data = {}
         
         # Numéro de facture
-        invoice_number = re.search(r'n[°o]\s*facture\s*:?\s*(\w+)', text, re.IGNORECASE)
-        if invoice_number:
-            data['invoice_number'] = invoice_number.group(1)
+        if 'invoice_number' in matches:
+            data['invoice_number'] = matches['invoice_number'].group(1)
         
         # Date
-        date_pattern = re.search(r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})', text)
-        if date_pattern:
-            data['date'] = date_pattern.group(1)
+        if 'date' in matches:
+            data['date'] = matches['date'].group(1)
         
         # Montant total
-        amount_pattern = re.search(r'total\s+ttc\s*:?\s*([\d\s]+[,.]?\d*)\s*€?', text, re.IGNORECASE)
-        if amount_pattern:
-            data['total_amount'] = amount_pattern.group(1).strip()
+        if 'total_amount' in matches:
+            data['total_amount'] = matches['total_amount'].group(1).strip()
         
         return data
     
-    def _parse_registration(self, text: str) -> Dict:
+    def _parse_registration(self, matches: Dict) -> Dict:
         """Parser une carte grise"""
         data = {}
         
         # Immatriculation
-        plate_pattern = re.search(r'([A-Z]{2}[-\s]?\d{3}[-\s]?[A-Z]{2})', text)
-        if plate_pattern:
-            data['license_plate'] = plate_pattern.group(1)
+        if 'license_plate' in matches:
+            data['license_plate'] = matches['license_plate'].group(1)
         
         # Marque
-        brand_pattern = re.search(r'marque\s*:?\s*([A-Z\s]+)', text, re.IGNORECASE)
-        if brand_pattern:
-            data['brand'] = brand_pattern.group(1).strip()
+        if 'brand' in matches:
+            data['brand'] = matches['brand'].group(1).strip()
         
         # Modèle
-        model_pattern = re.search(r'modèle\s*:?\s*([A-Z0-9\s]+)', text, re.IGNORECASE)
-        if model_pattern:
-            data['model'] = model_pattern.group(1).strip()
+        if 'model' in matches:
+            data['model'] = matches['model'].group(1).strip()
         
         return data
     
-    def _parse_insurance(self, text: str) -> Dict:
+    def _parse_insurance(self, matches: Dict) -> Dict:
         """Parser une attestation d'assurance"""
         data = {}
         
         # Numéro de contrat
-        contract_pattern = re.search(r'n[°o]\s*contrat\s*:?\s*(\w+)', text, re.IGNORECASE)
-        if contract_pattern:
-            data['contract_number'] = contract_pattern.group(1)
+        if 'contract_number' in matches:
+            data['contract_number'] = matches['contract_number'].group(1)
         
         # Assureur
-        insurer_pattern = re.search(r'assureur\s*:?\s*([A-Z\s]+)', text, re.IGNORECASE)
-        if insurer_pattern:
-            data['insurer'] = insurer_pattern.group(1).strip()
+        if 'insurer' in matches:
+            data['insurer'] = matches['insurer'].group(1).strip()
         
         return data
     
-    def _parse_maintenance(self, text: str) -> Dict:
+    def _parse_maintenance(self, matches: Dict) -> Dict:
         """Parser une facture d'entretien"""
         data = {}
         
         # Chercher types de services
-        services = []
-        if re.search(r'vidange', text, re.IGNORECASE):
-            services.append('Vidange')
-        if re.search(r'pneus', text, re.IGNORECASE):
-            services.append('Pneus')
-        if re.search(r'révision', text, re.IGNORECASE):
-            services.append('Révision')
-        
+        services = [label for name, label in MAINTENANCE_SERVICES if name in matches]
         if services:
             data['services'] = services
         
         # Kilométrage
-        mileage_pattern = re.search(r'(\d{1,3}[\s\.]?\d{3})\s*km', text, re.IGNORECASE)
-        if mileage_pattern:
-            data['mileage'] = mileage_pattern.group(1).replace(' ', '').replace('.', '')
+        if 'mileage' in matches:
+            data['mileage'] = matches['mileage'].group(1).replace(' ', '').replace('.', '')
         
         return data
     
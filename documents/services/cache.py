@@ -0,0 +1,70 @@
+"""
+Cache des résultats d'analyse par contenu
+
+Le résultat d'une analyse est rangé sous le SHA-256 du fichier et la
+version de l'analyseur : un même contenu téléversé plusieurs fois n'est
+analysé qu'une fois, et changer DocumentAnalyzer.VERSION invalide le cache.
+"""
+import hashlib
+from typing import Dict, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import DocumentAnalysisCache
+from .analyzer import DocumentAnalyzer
+
+
+def compute_content_hash(file) -> str:
+    """SHA-256 d'un fichier (upload ou FieldFile), lu par blocs"""
+    digest = hashlib.sha256()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def get_cached_analysis(content_hash: str) -> Optional[Dict]:
+    """Résultat d'analyse en cache pour ce contenu (None si absent)"""
+    entry = (
+        DocumentAnalysisCache.objects
+        .filter(content_hash=content_hash, analyzer_version=DocumentAnalyzer.VERSION)
+        .first()
+    )
+    if entry is None:
+        return None
+
+    DocumentAnalysisCache.objects.filter(pk=entry.pk).update(
+        hits=F('hits') + 1, last_used_at=timezone.now()
+    )
+    return {
+        'extracted_text': entry.extracted_text,
+        **entry.analysis_data,
+        'status': 'success',
+        'cached': True,
+    }
+
+
+def store_analysis(content_hash: str, analysis_result: Dict):
+    """Ranger une analyse réussie (la première écriture gagne en cas de course)"""
+    if analysis_result.get('status') != 'success':
+        return
+
+    try:
+        with transaction.atomic():
+            DocumentAnalysisCache.objects.create(
+                content_hash=content_hash,
+                analyzer_version=DocumentAnalyzer.VERSION,
+                extracted_text=analysis_result.get('extracted_text', ''),
+                analysis_data={
+                    'document_type': analysis_result.get('document_type'),
+                    'structured_data': analysis_result.get('structured_data'),
+                    'confidence': analysis_result.get('confidence'),
+                },
+            )
+    except IntegrityError:
+        pass
@@ -0,0 +1,294 @@
+"""
+Moteur OCR parallèle
+
+Un document est découpé en pages (images multi-pages) et les pages hautes
+en bandes horizontales, coupées sur les lignes les plus claires pour ne pas
+trancher une ligne de texte. Chaque morceau est confié à tesseract, qui
+tourne dans son propre processus : un pool de threads borné, unique par
+processus et partagé par les moteurs des analyseurs, suffit à occuper
+``max_workers`` cœurs sans fork (interdit dans les processus
+enfants daemon des workers Celery). Le texte est réassemblé dans l'ordre.
+
+Sans réglage explicite, le pool reçoit la part de cœurs d'un processus
+worker (cœurs disponibles / CELERY_WORKER_CONCURRENCY) et chaque tesseract
+est limité à un thread OpenMP, pour ne jamais surcharger la machine. Si
+CELERY_WORKER_CONCURRENCY n'est pas réglé, Celery lance un processus par
+cœur : le pool de chaque processus est alors d'un seul tesseract.
+
+Avant tesseract, chaque page est passée en niveaux de gris, ramenée à
+DOCUMENTS_OCR_TARGET_DPI et binarisée (seuil d'Otsu) : les photos et scans
+haute résolution coûtent bien moins cher sans perdre en précision.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pytesseract
+from django.conf import settings
+from PIL import Image, ImageSequence
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    """Cœurs utilisables par ce processus (affinité / cgroups compris)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_max_workers() -> int:
+    """Taille du pool : réglage explicite, sinon part de cœurs d'un worker Celery"""
+    if settings.DOCUMENTS_OCR_MAX_WORKERS > 0:
+        return settings.DOCUMENTS_OCR_MAX_WORKERS
+    cpus = available_cpus()
+    # Concurrence non réglée : Celery démarre autant de processus que de cœurs
+    concurrency = getattr(settings, 'CELERY_WORKER_CONCURRENCY', None) or cpus
+    return max(1, cpus // concurrency)
+
+
+# Plus grand côté d'une page sans résolution connue : A4 (11,7 pouces)
+PAGE_LONG_SIDE_INCHES = 11.7
+
+# En dessous, la résolution déclarée n'est pas celle d'un scan (72 dpi par
+# défaut des photos de téléphone) : elle est traitée comme inconnue
+MIN_TRUSTED_DPI = 150
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Seuil d'Otsu d'une image en niveaux de gris (uint8)"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = gray.size
+    levels = np.arange(256)
+    weight_dark = np.cumsum(histogram)
+    weight_light = total - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    between = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+    return int(np.argmax(between))
+
+
+def preprocess_page(image: Image.Image, target_dpi: int = None) -> Image.Image:
+    """
+    Niveaux de gris, réduction à target_dpi et binarisation d'une page
+
+    La résolution source vient de image.info['dpi'] ; sans elle (ou si elle
+    est invraisemblable, voir MIN_TRUSTED_DPI), le plus grand côté est ramené
+    à celui d'une page A4 à target_dpi.
+    """
+    target_dpi = target_dpi or settings.DOCUMENTS_OCR_TARGET_DPI
+    gray = image.convert('L')
+
+    dpi = image.info.get('dpi')
+    if dpi and dpi[0] and dpi[0] >= MIN_TRUSTED_DPI:
+        # Résolution connue : les pages longues (tickets) gardent leur hauteur utile
+        scale = min(1.0, target_dpi / float(dpi[0]))
+    else:
+        scale = min(1.0, PAGE_LONG_SIDE_INCHES * target_dpi / max(gray.size))
+    if scale < 1.0:
+        size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+        gray = gray.resize(size, Image.LANCZOS)
+
+    pixels = np.asarray(gray)
+    binary = np.where(pixels > otsu_threshold(pixels), 255, 0).astype(np.uint8)
+    return Image.fromarray(binary, mode='L')
+
+
+class OCRMetrics:
+    """Compteurs cumulés du moteur (par processus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.pages = 0
+        self.tiles = 0
+        self.pixels = 0
+        self.wall_seconds = 0.0
+        self.ocr_seconds = 0.0
+
+    def record(self, run: Dict):
+        with self._lock:
+            self.runs += 1
+            self.pages += run['pages']
+            self.tiles += run['tiles']
+            self.pixels += run['pixels']
+            self.wall_seconds += run['wall_seconds']
+            self.ocr_seconds += run['ocr_seconds']
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            wall = self.wall_seconds
+            return {
+                'runs': self.runs,
+                'pages': self.pages,
+                'tiles': self.tiles,
+                'wall_seconds': round(wall, 3),
+                'ocr_seconds': round(self.ocr_seconds, 3),
+                'pages_per_second': round(self.pages / wall, 3) if wall else 0.0,
+                'megapixels_per_second': round(self.pixels / 1e6 / wall, 3) if wall else 0.0,
+            }
+
+
+class OCRPool:
+    """Pool de threads tesseract, créé à la demande et recréé après un fork (workers prefork)"""
+
+    def __init__(self):
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def get(self, max_workers: int) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    # Un tesseract = un cœur : pas de threads OpenMP en plus du pool
+                    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max_workers, thread_name_prefix='ocr'
+                    )
+                    self._executor_pid = pid
+        return self._executor
+
+
+# Pool du processus, partagé par tous les moteurs sans max_workers explicite :
+# deux analyseurs ne peuvent pas occuper chacun toute la part de cœurs du worker
+_process_pool = OCRPool()
+
+
+class OCREngine:
+    """OCR tesseract parallélisé par page / bande sur un pool borné"""
+
+    def __init__(self, lang: str = 'fra+eng', config: str = '--oem 3 --psm 6',
+                 max_workers: int = None, tile_height: int = None, preprocess: bool = True):
+        self.lang = lang
+        self.config = config
+        self.preprocess = preprocess
+        self._max_workers = max_workers
+        self._tile_height = tile_height
+        self.metrics = OCRMetrics()
+        self._pool = OCRPool() if max_workers else _process_pool
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers or default_max_workers()
+
+    @property
+    def tile_height(self) -> int:
+        return self._tile_height or settings.DOCUMENTS_OCR_TILE_HEIGHT
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        return self._pool.get(self.max_workers)
+
+    # Découpage
+
+    def split_tiles(self, image: Image.Image) -> List[Image.Image]:
+        """Découper une page haute en bandes, sur les lignes les plus claires"""
+        height = image.height
+        count = min(self.max_workers, height // self.tile_height)
+        if count < 2:
+            return [image]
+
+        gray = np.asarray(image.convert('L'), dtype=np.float32)
+        row_brightness = gray.mean(axis=1)
+        band = height / count
+        window = max(1, int(band * 0.1))
+
+        cuts = [0]
+        for i in range(1, count):
+            nominal = int(band * i)
+            low, high = max(cuts[-1] + 1, nominal - window), min(height - 1, nominal + window)
+            cuts.append(low + int(np.argmax(row_brightness[low:high + 1])))
+        cuts.append(height)
+
+        return [image.crop((0, top, image.width, bottom)) for top, bottom in zip(cuts, cuts[1:])]
+
+    def _ocr_tile(self, tile: Image.Image) -> Tuple[str, float]:
+        started = time.perf_counter()
+        text = pytesseract.image_to_string(tile, lang=self.lang, config=self.config)
+        return text.strip(), time.perf_counter() - started
+
+    # OCR
+
+    def ocr_pages(self, pages: Iterable[Image.Image]) -> Tuple[List[str], Dict]:
+        """
+        OCR d'une suite de pages (itérée paresseusement)
+
+        Returns:
+            (texte de chaque page, dans l'ordre ; métriques du passage)
+        """
+        executor = self._get_executor()
+        workers = self.max_workers
+        started = time.perf_counter()
+        # Au plus 2 morceaux en attente par thread : les pages ne sont pas toutes en mémoire
+        pending = deque()
+        page_texts: List[List[str]] = []
+        run = {'pages': 0, 'tiles': 0, 'pixels': 0, 'ocr_seconds': 0.0}
+
+        def collect_oldest():
+            page_index, future = pending.popleft()
+            text, seconds = future.result()
+            run['ocr_seconds'] += seconds
+            if text:
+                page_texts[page_index].append(text)
+
+        for page_index, page in enumerate(pages):
+            if self.preprocess:
+                page = preprocess_page(page)
+            elif page.mode not in ('RGB', 'L'):
+                page = page.convert('RGB')
+            page_texts.append([])
+            run['pages'] += 1
+            run['pixels'] += page.width * page.height
+
+            for tile in self.split_tiles(page):
+                while len(pending) >= 2 * workers:
+                    collect_oldest()
+                pending.append((page_index, executor.submit(self._ocr_tile, tile)))
+                run['tiles'] += 1
+
+        while pending:
+            collect_oldest()
+
+        run['wall_seconds'] = time.perf_counter() - started
+        run['workers'] = workers
+        self.metrics.record(run)
+
+        return ['\n'.join(texts) for texts in page_texts], self._describe(run)
+
+    def ocr_images(self, pages: Iterable[Image.Image]) -> Tuple[str, Dict]:
+        """
+        OCR d'une suite de pages
+
+        Returns:
+            (texte réassemblé dans l'ordre, métriques du passage)
+        """
+        texts, metrics = self.ocr_pages(pages)
+        return '\n\n'.join(text for text in texts if text).strip(), metrics
+
+    def ocr_file(self, file_path: str) -> Tuple[str, Dict]:
+        """OCR d'un fichier image (toutes les pages d'un TIFF multi-pages)"""
+        with Image.open(file_path) as image:
+            pages = (frame.copy() for frame in ImageSequence.Iterator(image))
+            return self.ocr_images(pages)
+
+    @staticmethod
+    def _describe(run: Dict) -> Dict:
+        wall = run['wall_seconds']
+        return {
+            'pages': run['pages'],
+            'tiles': run['tiles'],
+            'workers': run['workers'],
+            'wall_seconds': round(wall, 3),
+            'ocr_seconds': round(run['ocr_seconds'], 3),
+            'pages_per_second': round(run['pages'] / wall, 3) if wall else 0.0,
+            # Part du temps des threads réellement passée dans tesseract
+            'parallel_efficiency': round(run['ocr_seconds'] / (wall * run['workers']), 3) if wall else 0.0,
+        }
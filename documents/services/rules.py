@@ -0,0 +1,124 @@
+"""
+Moteur de règles des analyseurs de documents
+
+Les règles (mots-clés de classification, extraction de champs) sont
+compilées une fois à l'import. Chaque règle qui commence par un texte fixe
+(« facture », « carte » pour la carte grise, une marque...) a ce texte pour mot-clé ;
+tous les mots-clés sont fusionnés en une seule alternance, cherchée en un
+passage sur le texte (casse ignorée). Seules les règles dont le mot-clé
+est présent, et celles sans mot-clé, sont ensuite évaluées. Le résultat
+est, pour chaque règle, sa première correspondance : exactement ce que
+donnerait un re.search par règle, sans relire le texte pour chaque règle
+absente.
+"""
+import re
+from typing import Dict, Iterable, Optional, Union
+
+RulePattern = Union[str, re.Pattern]
+
+# Caractères qui terminent le texte fixe en tête d'un motif
+_SPECIAL = set('.^$*+?{}[]|()')
+
+# En dessous, un mot-clé filtre trop peu pour valoir son coût dans l'alternance
+MIN_KEYWORD_LENGTH = 3
+
+
+def literal_prefix(pattern: re.Pattern) -> str:
+    """Texte fixe par lequel commence toute correspondance du motif ('' si aucun)"""
+    source = pattern.pattern
+    if pattern.flags & re.VERBOSE or '|' in source:
+        return ''
+
+    prefix = []
+    index = 0
+    while index < len(source):
+        char = source[index]
+        if char == '\\':
+            # Seuls les échappements de ponctuation (\-, \ , \') sont littéraux
+            if index + 1 >= len(source) or source[index + 1].isalnum():
+                break
+            literal, step = source[index + 1], 2
+        elif char in _SPECIAL:
+            break
+        else:
+            literal, step = char, 1
+        # Un caractère optionnel ou répété un nombre variable de fois ne compte plus
+        if source[index + step:index + step + 1] in ('*', '?', '{'):
+            break
+        prefix.append(literal)
+        index += step
+    return ''.join(prefix)
+
+
+class RuleEngine:
+    """Ensemble de règles nommées évaluées en un seul passage"""
+
+    def __init__(self, rules: Dict[str, RulePattern]):
+        self.rules = {
+            name: pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+            for name, pattern in rules.items()
+        }
+        self.keywords = {}
+        for name, pattern in self.rules.items():
+            keyword = literal_prefix(pattern).casefold()
+            if len(keyword) >= MIN_KEYWORD_LENGTH:
+                self.keywords[name] = keyword
+
+        # Plus longs d'abord : à une position, l'alternance garde le plus long mot-clé
+        ordered = sorted(set(self.keywords.values()), key=len, reverse=True)
+        # Lookahead : une correspondance n'en masque pas une autre qui la chevauche
+        self._keyword_scan = re.compile(
+            '(?=(' + '|'.join(re.escape(keyword) for keyword in ordered) + '))'
+        ) if ordered else None
+        # Un mot-clé trouvé implique ceux qui en sont le début (même position)
+        self._implied = {
+            keyword: [other for other in ordered if keyword.startswith(other)]
+            for keyword in ordered
+        }
+
+    def present_keywords(self, text: str) -> set:
+        """Mots-clés présents dans le texte (un seul passage)"""
+        present = set()
+        if self._keyword_scan is None:
+            return present
+        for found in {match.group(1) for match in self._keyword_scan.finditer(text.casefold())}:
+            present.update(self._implied[found])
+        return present
+
+    def scan(self, text: str) -> Dict[str, re.Match]:
+        """Première correspondance de chaque règle (absente si aucune)"""
+        present = self.present_keywords(text)
+        found = {}
+        for name, pattern in self.rules.items():
+            keyword = self.keywords.get(name)
+            if keyword is not None and keyword not in present:
+                continue
+            match = pattern.search(text)
+            if match:
+                found[name] = match
+        return found
+
+    def scan_separately(self, text: str) -> Dict[str, re.Match]:
+        """Référence : un re.search par règle (benchmark, vérification)"""
+        found = {}
+        for name, pattern in self.rules.items():
+            match = pattern.search(text)
+            if match:
+                found[name] = match
+        return found
+
+    @staticmethod
+    def first(matches: Dict[str, re.Match], names: Iterable[str]) -> Optional[re.Match]:
+        """Correspondance de la première règle trouvée parmi names (ordre de priorité)"""
+        for name in names:
+            if name in matches:
+                return matches[name]
+        return None
+
+
+def keyword_rules(prefix: str, keywords: Iterable[str], flags: int = re.IGNORECASE) -> Dict[str, re.Pattern]:
+    """Règles de recherche littérale (sous-chaîne) d'une liste de mots-clés"""
+    return {
+        f'{prefix}:{keyword}': re.compile(re.escape(keyword), flags)
+        for keyword in keywords
+    }
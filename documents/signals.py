@@ -0,0 +1,34 @@
+"""
+Signal handlers for documents
+
+Keep the per-user storage counters (DocumentStorageUsage) in step with
+document creations, file replacements and deletions, whatever the path
+(API, chunked uploads, admin, cascades). Each change is one relative
+UPDATE in the same transaction as the document write.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Document, DocumentStorageUsage
+
+
+@receiver(post_save, sender=Document)
+def update_storage_usage_on_save(sender, instance, created, update_fields=None, **kwargs):
+    size = instance.file_size or 0
+    if created:
+        DocumentStorageUsage.apply_change(instance.user_id, bytes_delta=size, count_delta=1)
+    elif hasattr(instance, '_stored_file_size') and (update_fields is None or 'file_size' in update_fields):
+        delta = size - (instance._stored_file_size or 0)
+        if delta:
+            DocumentStorageUsage.apply_change(instance.user_id, bytes_delta=delta)
+    else:
+        # Taille d'origine inconnue : l'écart éventuel est corrigé par la réconciliation
+        return
+    instance._stored_file_size = instance.file_size
+
+
+@receiver(post_delete, sender=Document)
+def update_storage_usage_on_delete(sender, instance, **kwargs):
+    DocumentStorageUsage.apply_change(
+        instance.user_id, bytes_delta=-(instance.file_size or 0), count_delta=-1
+    )
@@ -1,69 +1,54 @@
 """
 Tâches Celery pour l'analyse de documents
 """
-from celery import shared_task
-from .models import Document
+from celery import shared_task, chain, chord, group
+from celery.exceptions import Retry
+from celery.utils import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Document, DocumentAnalysisCache, DocumentStorageUsage
 from .services.analyzer import document_analyzer
+from .services.cache import compute_content_hash, get_cached_analysis, store_analysis
+from .uploads import prune_uploads
+from .batch import batch_lanes, create_batch, record_outcome, get_progress, close_batch
+from vehicles.odometer import sync_document_reading
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def async_analyze_document(document_id: int):
+def _retry_or_give_up(task, exc):
+    """Relancer l'analyse avec backoff tant qu'il reste des essais (hors appel direct)"""
+    if not task.request.called_directly and task.request.retries < task.max_retries:
+        countdown = settings.DOCUMENTS_ANALYSIS_RETRY_DELAY * 2 ** task.request.retries
+        raise task.retry(exc=exc, countdown=countdown)
+
+
+@shared_task(bind=True, max_retries=settings.DOCUMENTS_ANALYSIS_MAX_RETRIES)
+def async_analyze_document(self, document_id: int, batch_id: str = None):
     """
     Analyser un document de manière asynchrone
     
+    Les échecs (OCR, stockage, base) sont relancés avec backoff ; seule
+    l'issue finale est enregistrée et comptée dans le lot éventuel.
+    
     Args:
         document_id: ID du document à analyser
+        batch_id: Lot d'analyse dont fait partie le document
         
     Returns:
         Résultat de l'analyse
     """
     try:
-        document = Document.objects.get(id=document_id)
-        
-        # Vérifier que le fichier existe
-        if not document.file:
-            logger.error(f"Document {document_id} has no file attached")
-            return {'status': 'error', 'message': 'No file attached'}
-        
-        # Analyser le document
-        file_path = document.file.path
-        analysis_result = document_analyzer.analyze_document(file_path)
-        
-        # Mettre à jour le document avec les résultats
-        document.extracted_text = analysis_result.get('extracted_text', '')
-        document.analysis_data = {
-            'document_type': analysis_result.get('document_type'),
-            'structured_data': analysis_result.get('structured_data'),
-            'confidence': analysis_result.get('confidence'),
-            'status': analysis_result.get('status')
-        }
-        document.is_analyzed = analysis_result.get('status') == 'success'
-
-        if document.document_type == 'other' and analysis_result.get('document_type'):
-            document.document_type = analysis_result.get('document_type')
-
-        document.save(update_fields=['extracted_text', 'analysis_data', 'is_analyzed', 'document_type'])
-        
-        logger.info(
-            f"Document {document_id} analyzed successfully "
-            f"(type: {analysis_result.get('document_type')}, "
-            f"confidence: {analysis_result.get('confidence')})"
-        )
-        
-        return {
-            'status': 'success',
-            'document_id': document_id,
-            'document_type': analysis_result.get('document_type'),
-            'confidence': analysis_result.get('confidence')
-        }
-        
-    except Document.DoesNotExist:
-        logger.error(f"Document {document_id} not found")
-        return {'status': 'error', 'message': 'Document not found'}
+        result = _analyze_document(self, document_id)
+    except Retry:
+        raise
     except Exception as e:
+        _retry_or_give_up(self, e)
         logger.error(f"Error analyzing document {document_id}: {str(e)}")
         try:
             document = Document.objects.get(id=document_id)
@@ -72,43 +57,235 @@ def async_analyze_document(document_id: int):
             document.save(update_fields=['is_analyzed', 'analysis_data'])
         except Exception:
             pass
-        return {'status': 'error', 'message': str(e)}
+        result = {'status': 'error', 'document_id': document_id, 'message': str(e)}
+    
+    if batch_id:
+        record_outcome(batch_id, result['status'] == 'success')
+    return result
+
+
+def _analyze_document(task, document_id):
+    try:
+        document = Document.objects.get(id=document_id)
+    except Document.DoesNotExist:
+        logger.error(f"Document {document_id} not found")
+        return {'status': 'error', 'document_id': document_id, 'message': 'Document not found'}
+    
+    # Vérifier que le fichier existe
+    if not document.file:
+        logger.error(f"Document {document_id} has no file attached")
+        return {'status': 'error', 'document_id': document_id, 'message': 'No file attached'}
+    
+    # Empreinte du contenu (documents téléversés avant son calcul à l'upload)
+    if not document.content_hash:
+        with document.file.open('rb') as file:
+            document.content_hash = compute_content_hash(file)
+        document.save(update_fields=['content_hash'])
+    
+    # Contenu déjà analysé : simple lecture du cache
+    analysis_result = get_cached_analysis(document.content_hash)
+    if analysis_result is None:
+        analysis_result = document_analyzer.analyze_document(document.file.path)
+        if analysis_result.get('status') != 'success':
+            # Nouvel essai avant d'enregistrer l'échec
+            _retry_or_give_up(task, RuntimeError(analysis_result.get('error_message', 'Analysis failed')))
+        store_analysis(document.content_hash, analysis_result)
+    
+    # Mettre à jour le document avec les résultats
+    document.extracted_text = analysis_result.get('extracted_text', '')
+    document.analysis_data = {
+        'document_type': analysis_result.get('document_type'),
+        'structured_data': analysis_result.get('structured_data'),
+        'confidence': analysis_result.get('confidence'),
+        'ocr': analysis_result.get('ocr_metrics'),
+        'cached': analysis_result.get('cached', False),
+        'status': analysis_result.get('status')
+    }
+    document.is_analyzed = analysis_result.get('status') == 'success'
+
+    if document.document_type == 'other' and analysis_result.get('document_type'):
+        document.document_type = analysis_result.get('document_type')
+
+    # (recalcule aussi le vecteur de recherche plein texte du document)
+    document.save(update_fields=['extracted_text', 'analysis_data', 'is_analyzed', 'document_type'])
+    
+    # Kilométrage relevé sur le document (factures d'entretien)
+    sync_document_reading(document)
+    
+    logger.info(
+        f"Document {document_id} analyzed "
+        f"(status: {analysis_result.get('status')}, "
+        f"type: {analysis_result.get('document_type')}, "
+        f"confidence: {analysis_result.get('confidence')}, "
+        f"cached: {analysis_result.get('cached', False)}, "
+        f"ocr: {analysis_result.get('ocr_metrics')})"
+    )
+    
+    return {
+        'status': 'success' if document.is_analyzed else 'error',
+        'document_id': document_id,
+        'document_type': analysis_result.get('document_type'),
+        'confidence': analysis_result.get('confidence')
+    }
+
+
+def start_batch_analysis(user_id: int, document_ids: list) -> str:
+    """
+    Lancer l'analyse d'un lot et renvoyer son task_id
+    
+    Les documents sont répartis en DOCUMENTS_BATCH_USER_CONCURRENCY files
+    (chaînes) exécutées en parallèle : le lot n'occupe jamais plus de
+    workers que ce plafond. Un chord appelle finish_batch_analysis quand
+    toutes les files sont terminées ; son task_id identifie le lot. Si une
+    file échoue, le chord n'appelle que abort_batch_analysis.
+    
+    Raises:
+        BatchAlreadyRunning: l'utilisateur a déjà un lot en cours
+    """
+    batch_id = uuid()
+    lanes = batch_lanes(len(document_ids))
+    create_batch(batch_id, user_id, document_ids)
+    
+    header = group(
+        chain([async_analyze_document.si(doc_id, batch_id) for doc_id in document_ids[lane::lanes]])
+        for lane in range(lanes)
+    )
+    callback = finish_batch_analysis.si(batch_id).set(task_id=batch_id)
+    callback.on_error(abort_batch_analysis.si(batch_id))
+    # Les workers doivent voir le lot enregistré
+    transaction.on_commit(lambda: chord(header)(callback))
+    return batch_id
 
 
 @shared_task
-def batch_analyze_documents(document_ids: list):
+def finish_batch_analysis(batch_id: str):
     """
-    Analyser plusieurs documents en batch
+    Synthèse d'un lot, une fois toutes ses analyses terminées
     
-    Args:
-        document_ids: Liste des IDs de documents à analyser
-        
     Returns:
         Résumé des analyses
     """
+    progress = get_progress(batch_id)
+    if progress is None:
+        return {'status': 'error', 'message': 'Batch expired'}
+    
     results = {
-        'total': len(document_ids),
-        'success': 0,
-        'failed': 0,
-        'details': []
+        'total': progress['total'],
+        'success': progress['success'],
+        'failed': progress['failed'],
     }
-    
-    for doc_id in document_ids:
-        result = async_analyze_document(doc_id)
-        
-        if result.get('status') == 'success':
-            results['success'] += 1
-        else:
-            results['failed'] += 1
-        
-        results['details'].append({
-            'document_id': doc_id,
-            'result': result
-        })
+    close_batch(batch_id, results)
     
     logger.info(
-        f"Batch analysis completed: {results['success']} success, "
+        f"Batch analysis {batch_id} completed: {results['success']} success, "
+        f"{results['failed']} failed out of {results['total']}"
+    )
+    
+    return results
+
+
+@shared_task
+def abort_batch_analysis(batch_id: str):
+    """
+    Terminer un lot dont une file a échoué (errback du chord)
+    
+    Les documents restants de cette file ne seront pas analysés : sans
+    cela, la synthèse ne viendrait jamais et l'utilisateur resterait bloqué.
+    """
+    progress = get_progress(batch_id)
+    if progress is None:
+        return {'status': 'error', 'message': 'Batch expired'}
+    
+    results = {
+        'total': progress['total'],
+        'success': progress['success'],
+        'failed': progress['failed'],
+        'error': 'Batch aborted',
+    }
+    close_batch(batch_id, results)
+    
+    logger.error(
+        f"Batch analysis {batch_id} aborted after {results['success']} success, "
         f"{results['failed']} failed out of {results['total']}"
     )
     
     return results
+
+
+@shared_task
+def batch_analyze_documents(document_ids: list):
+    """
+    Analyser plusieurs documents en batch (analyses parallèles plafonnées)
+    
+    Args:
+        document_ids: Liste des IDs de documents à analyser
+        
+    Returns:
+        task_id du lot (voir start_batch_analysis)
+    """
+    user_id = Document.objects.filter(id__in=document_ids).values_list('user_id', flat=True).first()
+    return start_batch_analysis(user_id, document_ids)
+
+
+@shared_task
+def prune_analysis_cache(unused_days: int = 180):
+    """
+    Supprimer les analyses en cache d'anciennes versions de l'analyseur
+    ou inutilisées depuis unused_days jours
+    """
+    threshold = timezone.now() - timedelta(days=unused_days)
+    deleted, _ = DocumentAnalysisCache.objects.filter(
+        ~Q(analyzer_version=document_analyzer.VERSION) | Q(last_used_at__lt=threshold)
+    ).delete()
+    
+    logger.info(f"Pruned {deleted} cached document analyses")
+    return {'deleted': deleted}
+
+
+@shared_task
+def prune_stale_uploads():
+    """Abandonner les envois par morceaux expirés (morceaux stockés compris)"""
+    discarded = prune_uploads()
+    
+    logger.info(f"Discarded {discarded} stale document uploads")
+    return {'discarded': discarded}
+
+
+@shared_task
+def reconcile_storage_usage():
+    """
+    Corriger les compteurs de stockage qui ont dérivé de la table des documents
+    
+    Les écritures hors modèle (update() en masse, SQL brut) échappent aux
+    compteurs. Chaque compteur faux est verrouillé avant d'être recalculé :
+    les transactions en cours s'appliquent ensuite sur la valeur corrigée.
+    """
+    documents = Document.objects.filter(user_id=OuterRef('user_id')).order_by().values('user_id')
+    drifted = (
+        DocumentStorageUsage.objects
+        .annotate(
+            actual_count=Coalesce(Subquery(
+                documents.annotate(count=Count('id')).values('count'), output_field=IntegerField()
+            ), 0),
+            actual_bytes=Coalesce(Subquery(
+                documents.annotate(total=Sum('file_size')).values('total')
+            ), 0),
+        )
+        .exclude(document_count=F('actual_count'), total_bytes=F('actual_bytes'))
+        .values_list('user_id', flat=True)
+    )
+    
+    fixed = 0
+    for user_id in list(drifted):
+        with transaction.atomic():
+            usage = DocumentStorageUsage.objects.select_for_update().filter(user_id=user_id).first()
+            if usage is None:
+                continue
+            DocumentStorageUsage.objects.filter(user_id=user_id).update(
+                **DocumentStorageUsage.count_documents(user_id)
+            )
+        fixed += 1
+    
+    if fixed:
+        logger.warning(f"Reconciled document storage counters of {fixed} user(s)")
+    return {'fixed': fixed}
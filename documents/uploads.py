@@ -0,0 +1,267 @@
+"""
+Envois de documents par morceaux (reprenables)
+
+Protocole : start (métadonnées, taille totale) -> PUT des morceaux à
+l'offset courant -> commit. Chaque morceau est lu par blocs depuis la
+requête (mémoire bornée, débord sur disque au-delà de
+FILE_UPLOAD_MAX_MEMORY_SIZE) et rangé tel quel dans le stockage ; en cas de
+coupure, le client relit l'offset reçu (status) et reprend de là.
+
+Au commit, les morceaux sont relus à la suite et écrits en un seul flux
+dans le fichier final : le SHA-256 et la taille sont calculés au passage,
+sans jamais tenir le fichier entier en mémoire.
+"""
+import hashlib
+import posixpath
+import tempfile
+from datetime import timedelta
+from io import UnsupportedOperation
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .models import Document, DocumentStorageUsage, DocumentUpload
+
+
+UPLOADS_DIRECTORY = 'document_uploads'
+
+# Taille des blocs lus depuis la requête et depuis les morceaux stockés
+BLOCK_SIZE = 64 * 1024
+
+
+class ChunkParser(BaseParser):
+    """Corps brut d'un morceau (application/octet-stream), lu par blocs"""
+
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        limit = settings.DOCUMENTS_UPLOAD_CHUNK_MAX_SIZE
+        spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        size = 0
+        while stream is not None:
+            block = stream.read(BLOCK_SIZE)
+            if not block:
+                break
+            size += len(block)
+            if size > limit:
+                spooled.close()
+                raise ParseError(f'Chunk size must not exceed {limit} bytes.')
+            spooled.write(block)
+        spooled.seek(0)
+        chunk = File(spooled, name='chunk')
+        chunk.size = size
+        return chunk
+
+
+class AssembledUpload(File):
+    """
+    Fichier final lu à la volée depuis les morceaux d'un envoi (lecture unique)
+
+    Le hash et la taille sont cumulés pendant la lecture.
+    """
+
+    def __init__(self, upload, storage=None):
+        super().__init__(None, name=upload.filename)
+        self.storage = storage or default_storage
+        self.parts = list(upload.parts)
+        self.size = upload.total_size
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+        self._blocks = None
+        self._buffer = b''
+
+    def _read_blocks(self):
+        for name in self.parts:
+            with self.storage.open(name, 'rb') as part:
+                while True:
+                    block = part.read(BLOCK_SIZE)
+                    if not block:
+                        break
+                    self.digest.update(block)
+                    self.bytes_read += len(block)
+                    yield block
+
+    def seek(self, offset, whence=0):
+        # Seul le retour au début avant toute lecture est possible (flux)
+        if offset or whence or self._blocks is not None:
+            raise UnsupportedOperation('seek')
+
+    def tell(self):
+        return self.bytes_read - len(self._buffer)
+
+    def read(self, size=-1):
+        if self._blocks is None:
+            self._blocks = self._read_blocks()
+        while size is None or size < 0 or len(self._buffer) < size:
+            block = next(self._blocks, b'')
+            if not block:
+                break
+            self._buffer += block
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def chunks(self, chunk_size=None):
+        while True:
+            data = self.read(chunk_size or self.DEFAULT_CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        self._blocks = None
+
+
+def upload_directory(upload):
+    return posixpath.join(UPLOADS_DIRECTORY, str(upload.id))
+
+
+def upload_expires_at(upload):
+    return upload.updated_at + timedelta(hours=settings.DOCUMENTS_UPLOAD_EXPIRY_HOURS)
+
+
+class UploadConflict(Exception):
+    """Morceau ou commit incompatible avec l'état de l'envoi"""
+
+
+class StorageQuotaExceeded(Exception):
+    """Le document ne tient plus dans le quota de stockage de l'utilisateur"""
+
+
+def append_chunk(upload_id, user, offset, chunk):
+    """
+    Ranger un morceau à l'offset attendu
+
+    L'envoi est verrouillé le temps de l'écriture : deux morceaux concurrents
+    ne peuvent pas prendre la même place.
+
+    Raises:
+        DocumentUpload.DoesNotExist, UploadConflict, ValueError
+    """
+    with transaction.atomic():
+        upload = DocumentUpload.objects.select_for_update().get(id=upload_id, user=user)
+        if upload.status != 'pending':
+            raise UploadConflict('Upload already committed.')
+        if offset != upload.received_size:
+            raise UploadConflict(f'Expected offset {upload.received_size}.')
+        if upload.received_size + chunk.size > upload.total_size:
+            raise ValueError('Chunk exceeds the declared total size.')
+
+        name = default_storage.save(
+            posixpath.join(upload_directory(upload), f'{offset:012d}.part'), chunk
+        )
+        upload.parts.append(name)
+        upload.received_size += chunk.size
+        upload.save(update_fields=['parts', 'received_size', 'updated_at'])
+    return upload
+
+
+def commit_upload(upload_id, user):
+    """
+    Assembler les morceaux en un Document et lancer son analyse
+
+    Un commit répété (réponse perdue) renvoie le document déjà créé.
+
+    Returns:
+        (document, created)
+
+    Raises:
+        DocumentUpload.DoesNotExist, UploadConflict, StorageQuotaExceeded
+    """
+    upload = DocumentUpload.objects.get(id=upload_id, user=user)
+    if upload.status == 'committed':
+        return _committed_document(upload), False
+
+    # Quota revérifié au commit (le stockage a pu se remplir depuis le start) ;
+    # la place est tenue pendant l'assemblage, sans verrouiller le compteur
+    if not DocumentStorageUsage.reserve(upload.user_id, upload.total_size):
+        raise StorageQuotaExceeded('Storage quota exceeded.')
+    try:
+        return _assemble_upload(upload_id, user)
+    finally:
+        DocumentStorageUsage.release(upload.user_id, upload.total_size)
+
+
+def _committed_document(upload):
+    if upload.document is None:
+        raise UploadConflict('The uploaded document was deleted.')
+    return upload.document
+
+
+def _assemble_upload(upload_id, user):
+    from .serializers import ANALYZABLE_MIME_TYPES
+    from .tasks import async_analyze_document
+
+    with transaction.atomic():
+        # Verrou de l'envoi seul : deux commits concurrents ne créent qu'un document
+        upload = DocumentUpload.objects.select_for_update().get(id=upload_id, user=user)
+        if upload.status == 'committed':
+            return _committed_document(upload), False
+        if upload.received_size != upload.total_size:
+            raise UploadConflict(
+                f'Upload incomplete: {upload.received_size}/{upload.total_size} bytes received.'
+            )
+
+        content = AssembledUpload(upload)
+        document = Document(
+            user=upload.user,
+            vehicle=upload.vehicle,
+            title=upload.title,
+            description=upload.description,
+            document_type=upload.document_type,
+            mime_type=upload.mime_type,
+        )
+        document.file.save(upload.filename, content, save=False)
+        if content.bytes_read != upload.total_size:
+            # Morceau stocké manquant ou tronqué : pas de document incomplet
+            document.file.delete(save=False)
+            raise UploadConflict(
+                f'Stored chunks are incomplete: {content.bytes_read}/{upload.total_size} bytes.'
+            )
+        document.file_size = content.bytes_read
+        document.content_hash = content.digest.hexdigest()
+        document.save()
+
+        upload.status = 'committed'
+        upload.document = document
+        upload.parts = []
+        upload.save(update_fields=['status', 'document', 'parts', 'updated_at'])
+
+        transaction.on_commit(lambda: delete_upload_files(upload))
+        if document.mime_type in ANALYZABLE_MIME_TYPES:
+            transaction.on_commit(lambda: async_analyze_document.delay(document.id))
+    return document, True
+
+
+def delete_upload_files(upload):
+    """Supprimer les morceaux stockés d'un envoi (y compris ceux d'écritures interrompues)"""
+    directory = upload_directory(upload)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        default_storage.delete(posixpath.join(directory, name))
+
+
+def discard_upload(upload):
+    """Abandonner un envoi : morceaux et suivi"""
+    delete_upload_files(upload)
+    upload.delete()
+
+
+def prune_uploads():
+    """Abandonner les envois inactifs depuis DOCUMENTS_UPLOAD_EXPIRY_HOURS (et les commits anciens)"""
+    threshold = timezone.now() - timedelta(hours=settings.DOCUMENTS_UPLOAD_EXPIRY_HOURS)
+    count = 0
+    for upload in DocumentUpload.objects.filter(updated_at__lt=threshold).iterator():
+        discard_upload(upload)
+        count += 1
+    return count
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DocumentViewSet
+from .views import DocumentViewSet, DocumentUploadViewSet
 
 app_name = 'documents'
 
 router = DefaultRouter()
 router.register(r'documents', DocumentViewSet, basename='document')
+router.register(r'document-uploads', DocumentUploadViewSet, basename='document-upload')
 
 urlpatterns = [
     path('', include(router.urls)),
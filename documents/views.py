@@ -1,17 +1,25 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Q
+from django.core.files.base import File
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
 from datetime import date, timedelta
-from .models import Document
+from .models import Document, DocumentStorageUsage, DocumentUpload
 from .serializers import (
     DocumentSerializer, DocumentCreateSerializer, DocumentDetailSerializer,
-    DocumentUpdateSerializer
+    DocumentUpdateSerializer, DocumentUploadStartSerializer, DocumentUploadSerializer
+)
+from .tasks import async_analyze_document, start_batch_analysis
+from .batch import BatchAlreadyRunning, get_active_batch, get_progress
+from .search import document_headlines, search_documents
+from .uploads import (
+    ChunkParser, StorageQuotaExceeded, UploadConflict, append_chunk, commit_upload, discard_upload
 )
-from .tasks import async_analyze_document, batch_analyze_documents
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -37,7 +45,7 @@ class DocumentViewSet(viewsets.ModelViewSet):
         """Filter documents by user"""
         return Document.objects.filter(
             user=self.request.user
-        ).select_related('vehicle')
+        ).select_related('vehicle').defer('search_vector')
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -54,8 +62,31 @@ class DocumentViewSet(viewsets.ModelViewSet):
         upload = self.request.FILES.get('file')
         file_size = upload.size if upload else 0
 
-        # Limits were removed
-        serializer.save()
+        # Compteur de stockage : vérification sans parcourir les documents ;
+        # la place est tenue le temps de l'écriture du fichier
+        user_id = self.request.user.id
+        if not DocumentStorageUsage.reserve(user_id, file_size):
+            raise ValidationError({'file': 'Storage quota exceeded.'})
+        try:
+            serializer.save()
+        finally:
+            DocumentStorageUsage.release(user_id, file_size)
+    
+    def perform_update(self, serializer):
+        """Enforce the storage quota when the file is replaced"""
+        upload = self.request.FILES.get('file')
+        if upload is None:
+            serializer.save()
+            return
+        
+        user_id = self.request.user.id
+        growth = upload.size - (serializer.instance.file_size or 0)
+        if not DocumentStorageUsage.reserve(user_id, growth):
+            raise ValidationError({'file': 'Storage quota exceeded.'})
+        try:
+            serializer.save()
+        finally:
+            DocumentStorageUsage.release(user_id, growth)
     
     @action(detail=False, methods=['get'])
     def by_type(self, request):
@@ -70,6 +101,33 @@ class DocumentViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Full-text search in titles and OCR text (?q=, ranked, paginated)
+        
+        Accepts the list filters (vehicle, document_type, is_analyzed); each
+        result carries its rank and a highlighted excerpt (<mark>).
+        """
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {'error': 'The q parameter is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        page = self.paginate_queryset(search_documents(queryset, text))
+        
+        # Extraits calculés pour la seule page renvoyée
+        headlines = document_headlines(self.get_queryset(), page, text)
+        data = self.get_serializer(page, many=True).data
+        for document, item in zip(page, data):
+            item['rank'] = round(document.search_rank, 4)
+            item['headline'] = headlines.get(document.id, '')
+        
+        return self.get_paginated_response(data)
+    
     @action(detail=False, methods=['get'])
     def unanalyzed(self, request):
         """Get unanalyzed documents"""
@@ -80,25 +138,40 @@ class DocumentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get document statistics"""
-        queryset = self.get_queryset()
+        queryset = self.get_queryset().order_by()
         
-        total = queryset.count()
+        # Comptages en une requête agrégée, stockage lu sur le compteur de l'utilisateur
+        counts = queryset.aggregate(
+            total=Count('id'),
+            analyzed=Count('id', filter=Q(is_analyzed=True)),
+        )
         by_type = queryset.values('document_type').annotate(count=Count('id'))
-        
-        analyzed = queryset.filter(is_analyzed=True).count()
-        unanalyzed = queryset.filter(is_analyzed=False).count()
-        
-        total_size = sum(doc.file_size for doc in queryset if doc.file_size)
+        total_size = DocumentStorageUsage.for_user(request.user.id).total_bytes
         
         return Response({
-            'total_documents': total,
+            'total_documents': counts['total'],
             'by_type': list(by_type),
-            'analyzed': analyzed,
-            'unanalyzed': unanalyzed,
+            'analyzed': counts['analyzed'],
+            'unanalyzed': counts['total'] - counts['analyzed'],
             'total_storage_bytes': total_size,
             'total_storage_mb': round(total_size / 1024 / 1024, 2) if total_size else 0
         })
     
+    @action(detail=False, methods=['get'])
+    def storage(self, request):
+        """Storage used by the user's documents and remaining quota"""
+        usage = DocumentStorageUsage.for_user(request.user.id)
+        quota = usage.quota_bytes
+        
+        return Response({
+            'document_count': usage.document_count,
+            'used_bytes': usage.total_bytes,
+            'used_mb': round(usage.total_bytes / 1024 / 1024, 2),
+            'quota_bytes': quota,
+            'available_bytes': max(0, quota - usage.total_bytes) if quota is not None else None,
+            'used_percent': round(100 * usage.total_bytes / quota, 1) if quota else None,
+        })
+    
     @action(detail=False, methods=['get'])
     def by_vehicle(self, request):
         """Get documents grouped by vehicle"""
@@ -109,23 +182,34 @@ class DocumentViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
-        # Group by vehicle
+        # Effectifs et tailles par véhicule calculés par la base
+        groups = {
+            row['vehicle']: row for row in queryset.order_by().values('vehicle').annotate(
+                document_count=Count('id'),
+                total_size=Coalesce(Sum('file_size'), 0),
+            )
+        }
+        
+        # Documents sérialisés en une fois, déjà triés par véhicule
+        documents = queryset.order_by('vehicle_id', '-created_at', '-id')
+        data = self.get_serializer(documents, many=True).data
+        
         vehicles = {}
-        for document in queryset:
-            vehicle_key = str(document.vehicle.id)
-            if vehicle_key not in vehicles:
-                vehicles[vehicle_key] = {
+        for document, item in zip(documents, data):
+            if document.vehicle_id not in vehicles:
+                group = groups[document.vehicle_id]
+                vehicles[document.vehicle_id] = {
                     'vehicle': {
                         'id': document.vehicle.id,
                         'make': document.vehicle.make,
                         'model': document.vehicle.model,
                         'year': document.vehicle.year
-                    },
+                    } if document.vehicle else None,
+                    'document_count': group['document_count'],
+                    'total_size': group['total_size'],
                     'documents': []
                 }
-            vehicles[vehicle_key]['documents'].append(
-                DocumentSerializer(document, context={'request': request}).data
-            )
+            vehicles[document.vehicle_id]['documents'].append(item)
         
         return Response(list(vehicles.values()))
     
@@ -160,7 +244,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def batch_analyze(self, request):
         """Analyze multiple documents in batch"""
-        document_ids = request.data.get('document_ids', [])
+        # Dédoublonner en gardant l'ordre
+        document_ids = list(dict.fromkeys(request.data.get('document_ids', [])))
         
         if not document_ids:
             return Response(
@@ -176,11 +261,120 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Lancer l'analyse batch avec Celery
-        task = batch_analyze_documents.delay(document_ids)
+        # Un seul lot en cours par utilisateur (ses analyses sont déjà plafonnées) ;
+        # la place est prise à l'enregistrement du lot, deux requêtes ne peuvent pas l'obtenir
+        try:
+            if get_active_batch(request.user.id):
+                raise BatchAlreadyRunning()
+            # Lancer l'analyse batch avec Celery (analyses parallèles, relancées une à une)
+            task_id = start_batch_analysis(request.user.id, document_ids)
+        except BatchAlreadyRunning:
+            active = get_active_batch(request.user.id) or {}
+            active.pop('user_id', None)
+            return Response(
+                {'error': 'A batch analysis is already running.', 'progress': active},
+                status=status.HTTP_409_CONFLICT
+            )
         
         return Response({
             'message': f'Batch analysis started for {len(document_ids)} documents.',
             'document_count': len(document_ids),
-            'task_id': task.id
+            'task_id': task_id
         }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def batch_status(self, request):
+        """Progress of a batch analysis (task_id returned by batch_analyze)"""
+        progress = get_progress(request.query_params.get('task_id', ''))
+        
+        if progress is None or progress.pop('user_id') != request.user.id:
+            return Response(
+                {'error': 'Batch analysis not found.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(progress)
+
+
+class DocumentUploadViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                            mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                            viewsets.GenericViewSet):
+    """
+    Resumable chunked document uploads
+    
+    create: Start an upload (document metadata, filename, mime_type, total_size)
+    list: Uploads of the current user
+    retrieve: Upload status; offset is where the next chunk starts
+    chunk: PUT raw bytes (application/octet-stream) at ?offset=
+    commit: Assemble the chunks into a document and start its analysis
+    destroy: Abort an upload
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    lookup_value_regex = '[0-9a-f-]{36}'
+    
+    def get_queryset(self):
+        return DocumentUpload.objects.filter(user=self.request.user)
+    
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return DocumentUploadStartSerializer
+        return DocumentUploadSerializer
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save()
+        return Response(DocumentUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+    
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+    
+    @action(detail=True, methods=['put'], parser_classes=[ChunkParser])
+    def chunk(self, request, pk=None):
+        """Append a chunk at ?offset= (or Upload-Offset header)"""
+        try:
+            offset = int(request.query_params.get('offset', request.headers.get('Upload-Offset', '')))
+        except ValueError:
+            return Response(
+                {'error': 'A numeric offset is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Corps vide : rien n'est passé au parser
+        chunk = request.data
+        if not isinstance(chunk, File) or not chunk.size:
+            return Response({'error': 'Empty chunk.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            upload = append_chunk(pk, request.user, offset, chunk)
+        except DocumentUpload.DoesNotExist:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        except UploadConflict as e:
+            # Le client reprend à l'offset renvoyé
+            upload = self.get_object()
+            return Response(
+                {'error': str(e), 'offset': upload.received_size, 'status': upload.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(DocumentUploadSerializer(upload).data)
+    
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        """Create the document from the received chunks (idempotent)"""
+        try:
+            document, created = commit_upload(pk, request.user)
+        except DocumentUpload.DoesNotExist:
+            return Response({'error': 'Upload not found.'}, status=status.HTTP_404_NOT_FOUND)
+        except UploadConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        except StorageQuotaExceeded as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(
+            DocumentSerializer(document, context=self.get_serializer_context()).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
@@ -8,8 +8,9 @@ class GarageAdmin(admin.ModelAdmin):
     list_display = ['name', 'city', 'postal_code', 'average_rating', 'total_reviews']
     list_filter = ['city', 'country', 'average_rating']
     search_fields = ['name', 'address', 'city', 'email']
+    raw_id_fields = ['owner']
     ordering = ['-average_rating', 'name']
-    readonly_fields = ['average_rating', 'total_reviews', 'created_at', 'updated_at']
+    readonly_fields = ['average_rating', 'total_reviews', 'rating_sum', 'created_at', 'updated_at']
 
 
 @admin.register(GarageReview)
@@ -0,0 +1,120 @@
+"""
+HTTP and server-side caching of the public garage catalog
+
+Catalog responses (list, detail, top_rated, by_specialty) are cached per
+URL under a versioned namespace, together with their ETag and
+Last-Modified. Conditional requests are answered with 304 straight from
+the cached validators. Any garage or review write bumps the version (see
+garages.signals), which changes every ETag and drops every cached body.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from common.cache import get_cache_version, make_cache_key, bump_cache_version
+
+
+CATALOG_RESPONSES_NAMESPACE = 'garages:responses'
+CATALOG_MODIFIED_KEY = f'{CATALOG_RESPONSES_NAMESPACE}:modified'
+
+
+def invalidate_catalog_responses():
+    """Drop cached catalog responses and move Last-Modified forward"""
+    cache.set(CATALOG_MODIFIED_KEY, int(time.time()), timeout=None)
+    bump_cache_version(CATALOG_RESPONSES_NAMESPACE)
+
+
+def _latest_updated_at(data):
+    """Latest ``updated_at`` (epoch seconds) found in serialized garage data"""
+    if isinstance(data, dict):
+        if 'results' in data:
+            data = data['results']
+        else:
+            data = [data]
+
+    latest = 0
+    for item in data or []:
+        value = parse_datetime(str(item.get('updated_at') or '')) if isinstance(item, dict) else None
+        if value is not None:
+            latest = max(latest, int(value.timestamp()))
+    return latest
+
+
+def _set_cache_headers(response, etag, last_modified, public=True):
+    """
+    Validators and Cache-Control of a catalog response
+
+    Only actions open to anonymous users may be stored by shared caches;
+    the others are private to the browser of the authenticated client.
+    """
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    if public:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.GARAGES_HTTP_MAX_AGE,
+            s_maxage=settings.GARAGES_HTTP_SHARED_MAX_AGE,
+        )
+        patch_vary_headers(response, ['Accept'])
+    else:
+        patch_cache_control(response, private=True, max_age=settings.GARAGES_HTTP_MAX_AGE)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+    return response
+
+
+def _is_public_action(view):
+    return all(isinstance(permission, AllowAny) for permission in view.get_permissions())
+
+
+def catalog_cache(view_method):
+    """
+    Cache a GET catalog action and answer conditional requests
+
+    The cache key covers the full path (query string included) and the
+    negotiated media type. Only 200 responses are cached. Actions that
+    require authentication are marked private for HTTP caches.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET':
+            return view_method(self, request, *args, **kwargs)
+
+        public = _is_public_action(self)
+        version = get_cache_version(CATALOG_RESPONSES_NAMESPACE)
+        key = make_cache_key(
+            CATALOG_RESPONSES_NAMESPACE,
+            request.accepted_media_type,
+            hashlib.md5(request.get_full_path().encode()).hexdigest()
+        )
+
+        entry = cache.get(key)
+        if entry is None:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            etag = quote_etag(hashlib.md5(f'{key}:{version}'.encode()).hexdigest())
+            last_modified = max(_latest_updated_at(response.data), cache.get(CATALOG_MODIFIED_KEY) or 0)
+            entry = {'data': response.data, 'etag': etag, 'last_modified': last_modified}
+            cache.set(key, entry, settings.GARAGES_RESPONSE_CACHE_TIMEOUT)
+
+        conditional = get_conditional_response(
+            request, etag=entry['etag'], last_modified=entry['last_modified'] or None
+        )
+        if conditional is not None:
+            return _set_cache_headers(conditional, entry['etag'], entry['last_modified'], public)
+
+        return _set_cache_headers(Response(entry['data']), entry['etag'], entry['last_modified'], public)
+
+    return wrapper
@@ -0,0 +1,72 @@
+"""
+Geospatial helpers for garages
+"""
+import math
+
+from django.db.models import Q
+
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Calculate distance between two points using Haversine formula (in km)"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+
+    return EARTH_RADIUS_KM * c
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing a circle
+
+    Longitudes may fall outside [-180, 180] when the box crosses the
+    antimeridian; ``bounding_box_filter`` handles the wrap.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+
+    if min_lat <= -90 or max_lat >= 90:
+        # The circle contains a pole: every longitude is a candidate
+        return max(min_lat, -90), min(max_lat, 90), -180, 180
+
+    delta_lng = math.degrees(
+        math.asin(min(1, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))))
+    )
+    return min_lat, max_lat, lng - delta_lng, lng + delta_lng
+
+
+def bounding_box_filter(lat, lng, radius_km):
+    """Q object selecting rows whose indexed coordinates fall in the bounding box"""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    condition = Q(latitude__gte=min_lat, latitude__lte=max_lat)
+
+    if min_lng < -180:
+        return condition & (Q(longitude__gte=min_lng + 360) | Q(longitude__lte=max_lng))
+    if max_lng > 180:
+        return condition & (Q(longitude__gte=min_lng) | Q(longitude__lte=max_lng - 360))
+    return condition & Q(longitude__gte=min_lng, longitude__lte=max_lng)
+
+
+def garages_within_radius(queryset, lat, lng, radius_km):
+    """
+    Return (garage, distance_km) pairs within radius_km, nearest first
+
+    Only the garages inside the bounding box are fetched, through the
+    (latitude, longitude) index; exact haversine runs on those candidates.
+    """
+    candidates = queryset.filter(bounding_box_filter(lat, lng, radius_km))
+
+    results = []
+    for garage in candidates:
+        distance = haversine_km(lat, lng, garage.latitude, garage.longitude)
+        if distance <= radius_km:
+            results.append((garage, distance))
+
+    results.sort(key=lambda item: item[1])
+    return results
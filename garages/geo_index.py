@@ -0,0 +1,117 @@
+"""
+In-memory geo index of garages
+
+Each process keeps the coordinates of every located garage in NumPy arrays
+and answers radius / nearest-k queries with one vectorized haversine pass.
+The index is loaded lazily and reloaded when the garage catalog version
+(bumped on garage writes, see garages.signals) changes. The version lives
+in the cache, so invalidation only reaches other processes through a
+shared cache; the index is also reloaded after GARAGES_GEO_INDEX_MAX_AGE
+seconds, which bounds staleness from writes that bypass the signals.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from common.cache import get_cache_version, bump_cache_version
+from .geo import EARTH_RADIUS_KM
+
+
+GARAGE_CATALOG_NAMESPACE = 'garages:catalog'
+
+
+def invalidate_garage_catalog():
+    """Mark every process-local garage index as stale"""
+    bump_cache_version(GARAGE_CATALOG_NAMESPACE)
+
+
+class GarageGeoIndex:
+    """Coordinates of all located garages as NumPy arrays"""
+
+    def __init__(self):
+        self.version = None
+        self.loaded_at = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.lat = np.empty(0)
+        self.lng = np.empty(0)
+        self.cos_lat = np.empty(0)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self, version=None):
+        """(Re)load the arrays from the database"""
+        from .models import Garage
+
+        rows = np.array(
+            list(
+                Garage.objects.filter(latitude__isnull=False, longitude__isnull=False)
+                .order_by()
+                .values_list('id', 'latitude', 'longitude')
+            ),
+            dtype=np.float64
+        ).reshape(-1, 3)
+
+        lat = np.radians(rows[:, 1])
+        # Swap all arrays at once so readers never see a mix of two loads
+        self.ids, self.lat, self.lng, self.cos_lat = (
+            rows[:, 0].astype(np.int64), lat, np.radians(rows[:, 2]), np.cos(lat)
+        )
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def is_stale(self, version):
+        if version != self.version or self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at > settings.GARAGES_GEO_INDEX_MAX_AGE
+
+    def refresh(self):
+        """Reload the index if the garage catalog changed since the last load, or if it is too old"""
+        version = get_cache_version(GARAGE_CATALOG_NAMESPACE)
+        if self.is_stale(version):
+            with self._lock:
+                if self.is_stale(version):
+                    self.load(version)
+        return self
+
+    def distances(self, lat, lng):
+        """Haversine distance (km) from a point to every indexed garage"""
+        lat, lng = np.radians(lat), np.radians(lng)
+        ids, g_lat, g_lng, cos_lat = self.ids, self.lat, self.lng, self.cos_lat
+
+        a = (
+            np.sin((g_lat - lat) / 2) ** 2
+            + np.cos(lat) * cos_lat * np.sin((g_lng - lng) / 2) ** 2
+        )
+        return ids, 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+    def nearest(self, lat, lng, radius_km=None, limit=None):
+        """
+        Return [(garage_id, distance_km)] nearest first
+
+        Only garages within ``radius_km`` (if given) are kept; with ``limit``
+        the k nearest are selected with argpartition before sorting.
+        """
+        ids, distances = self.distances(lat, lng)
+
+        candidates = np.arange(len(ids))
+        if radius_km is not None:
+            candidates = np.flatnonzero(distances <= radius_km)
+
+        if limit is not None and 0 < limit < len(candidates):
+            top = np.argpartition(distances[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+        return list(zip(ids[candidates].tolist(), distances[candidates].tolist()))
+
+
+_index = GarageGeoIndex()
+
+
+def get_garage_geo_index():
+    """Return this process' garage geo index, refreshed if stale"""
+    return _index.refresh()
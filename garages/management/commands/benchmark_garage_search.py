@@ -0,0 +1,81 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from garages.models import Garage
+from garages.search import search_garages, update_search_vectors
+
+
+CITIES = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nice', 'Nantes', 'Strasbourg', 'Bordeaux', 'Lille', 'Rennes']
+WORDS = ['Garage', 'Auto', 'Moderne', 'Express', 'Service', 'Central', 'Pneus', 'Carrosserie', 'Mécanique', 'Atelier']
+SPECIALTIES = ['Vidange', 'Révision', 'Freinage', 'Climatisation', 'Pneumatiques', 'Carrosserie', 'Diagnostic', 'Embrayage']
+QUERIES = ['vidange', 'carrosserie lyon', 'garage moderne', 'freinage', 'mecanique', 'Carosserie']
+
+
+class Command(BaseCommand):
+    help = 'Compares ranked full-text garage search with the former ILIKE search on a synthetic catalog (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--garages', type=int, default=100000, help='Synthetic garages to create')
+        parser.add_argument('--runs', type=int, default=5, help='Runs per query')
+        parser.add_argument('--page-size', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._populate(options['garages'])
+            self.stdout.write(f"{'query':<20} {'ilike (ms)':>12} {'full-text (ms)':>15} {'matches':>9}")
+
+            for text in QUERIES:
+                ilike = self._time(lambda: self._ilike(text), options['runs'], options['page_size'])
+                ranked = self._time(
+                    lambda: search_garages(Garage.objects.all(), text, lat=48.85, lng=2.35),
+                    options['runs'], options['page_size']
+                )
+                self.stdout.write(f"{text:<20} {ilike[0]:>12.1f} {ranked[0]:>15.1f} {ranked[1]:>9}")
+
+            # Leave the database untouched
+            transaction.set_rollback(True)
+
+    def _populate(self, count):
+        self.stdout.write(f'Creating {count} synthetic garages...')
+        rng = random.Random(42)
+        garages = [
+            Garage(
+                name=f"{' '.join(rng.sample(WORDS, 2))} {i}",
+                email=f'garage{i}@example.com',
+                address=f'{rng.randint(1, 300)} rue {rng.choice(WORDS)}',
+                city=rng.choice(CITIES),
+                specialties=rng.sample(SPECIALTIES, 3),
+                latitude=rng.uniform(43, 50),
+                longitude=rng.uniform(-1, 7),
+            )
+            for i in range(count)
+        ]
+        Garage.objects.bulk_create(garages, batch_size=5000)
+        update_search_vectors(Garage.objects.all())
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Garage._meta.db_table}')
+
+    def _ilike(self, text):
+        """Equivalent of the former DRF SearchFilter on name/address/city/specialties"""
+        queryset = Garage.objects.all()
+        for term in text.split():
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(address__icontains=term)
+                | Q(city__icontains=term) | Q(specialties__icontains=term)
+            )
+        return queryset.order_by('-average_rating', 'name')
+
+    def _time(self, build, runs, page_size):
+        """Median time (ms) of a paginated request: count + first page"""
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            queryset = build()
+            matches = queryset.count()
+            list(queryset[:page_size])
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return timings[len(timings) // 2], matches
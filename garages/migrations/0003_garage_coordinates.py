@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_coordinates(apps, schema_editor):
+    Garage = apps.get_model('garages', 'Garage')
+    garages = []
+    for garage in Garage.objects.exclude(location__isnull=True).only('id', 'location'):
+        try:
+            lng, lat = garage.location['coordinates']
+            garage.latitude, garage.longitude = float(lat), float(lng)
+        except (TypeError, KeyError, ValueError):
+            continue
+        garages.append(garage)
+    Garage.objects.bulk_update(garages, ['latitude', 'longitude'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garages', '0002_garage_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='garage',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='garage',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='garage',
+            index=models.Index(fields=['latitude', 'longitude'], name='garages_latitud_3d912d_idx'),
+        ),
+        migrations.RunPython(backfill_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:37
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Garage = apps.get_model('garages', 'Garage')
+    GarageReview = apps.get_model('garages', 'GarageReview')
+    rows = (
+        GarageReview.objects.order_by()
+        .values('garage_id')
+        .annotate(count=Count('id'), total=Sum('rating'))
+    )
+    for row in rows:
+        Garage.objects.filter(id=row['garage_id']).update(
+            total_reviews=row['count'],
+            rating_sum=row['total'],
+            average_rating=round(row['total'] / row['count'], 2)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garages', '0003_garage_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='garage',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:42
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+
+def backfill_search_vector(apps, schema_editor):
+    Garage = apps.get_model('garages', 'Garage')
+    config = settings.GARAGES_SEARCH_CONFIG
+    Garage.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('city', weight='B', config=config)
+        + SearchVector(Cast('specialties', TextField()), weight='B', config=config)
+        + SearchVector('address', weight='C', config=config)
+        + SearchVector('description', weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garages', '0004_garage_rating_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='garage',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='garage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='garages_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='garage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='garages_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
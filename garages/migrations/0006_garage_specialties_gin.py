@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:45
+
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('garages', '0005_garage_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='garage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['specialties'], name='garages_specialties_gin', opclasses=['jsonb_path_ops']),
+        ),
+    ]
@@ -1,4 +1,11 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Case, DecimalField, F, FloatField, When
+from django.db.models.functions import Cast
+from django.conf import settings
+from django.utils import timezone
+from .search import SEARCH_FIELDS, update_search_vectors
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -7,6 +14,13 @@ class Garage(models.Model):
     
     # Basic information
     name = models.CharField(max_length=200)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='owned_garages'
+    )
     email = models.EmailField()
     phone = models.CharField(max_length=20, blank=True, null=True)
     
@@ -22,6 +36,9 @@ class Garage(models.Model):
         null=True,
         help_text='GeoJSON Point: {"type": "Point", "coordinates": [longitude, latitude]}'
     )
+    # Indexed copy of the location coordinates, kept in sync on save
+    latitude = models.FloatField(blank=True, null=True, editable=False)
+    longitude = models.FloatField(blank=True, null=True, editable=False)
     
     # Details
     description = models.TextField(blank=True, null=True)
@@ -36,6 +53,11 @@ class Garage(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)]
     )
     total_reviews = models.IntegerField(default=0)
+    # Running sum of review ratings, average_rating = rating_sum / total_reviews
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Weighted full-text document, maintained on save (see garages.search)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -48,10 +70,56 @@ class Garage(models.Model):
             models.Index(fields=['city']),
             models.Index(fields=['postal_code']),
             models.Index(fields=['-average_rating']),
+            models.Index(fields=['latitude', 'longitude']),
+            GinIndex(fields=['search_vector'], name='garages_search_vector_gin'),
+            GinIndex(fields=['name'], name='garages_name_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['specialties'], name='garages_specialties_gin', opclasses=['jsonb_path_ops']),
         ]
     
     def __str__(self):
         return self.name
+    
+    def sync_coordinates(self):
+        """Copy the GeoJSON location into the indexed latitude/longitude columns"""
+        try:
+            lng, lat = self.location['coordinates']
+            self.latitude, self.longitude = float(lat), float(lng)
+        except (TypeError, KeyError, ValueError):
+            self.latitude = self.longitude = None
+    
+    @classmethod
+    def apply_review_change(cls, garage_id, count_delta=0, rating_delta=0):
+        """
+        Apply a review change to the rating counters in one atomic UPDATE
+        
+        The new average is computed by the database from the current row
+        values, so concurrent reviews never overwrite each other.
+        """
+        new_count = F('total_reviews') + count_delta
+        new_sum = F('rating_sum') + rating_delta
+        cls.objects.filter(id=garage_id).update(
+            total_reviews=new_count,
+            rating_sum=new_sum,
+            average_rating=Case(
+                When(total_reviews__gt=-count_delta, then=Cast(
+                    Cast(new_sum, FloatField()) / new_count,
+                    DecimalField(max_digits=3, decimal_places=2)
+                )),
+                default=0,
+                output_field=DecimalField(max_digits=3, decimal_places=2)
+            ),
+            updated_at=timezone.now()
+        )
+    
+    def save(self, *args, **kwargs):
+        self.sync_coordinates()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'location' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude'}
+        super().save(*args, **kwargs)
+        
+        if update_fields is None or SEARCH_FIELDS & set(update_fields):
+            update_search_vectors(Garage.objects.filter(pk=self.pk))
 
 
 class GarageReview(models.Model):
@@ -0,0 +1,121 @@
+"""
+Full-text search for garages
+
+Garages carry a weighted ``search_vector`` (name > city/specialties >
+address/description) indexed with GIN, plus a trigram index on the name
+for typo tolerance (pg_trgm). Matches are ranked by a blended score of
+text relevance, proximity (when lat/lng are given) and rating.
+"""
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.db.models import F, FloatField, Q, TextField, Value
+from django.db.models.functions import (
+    ASin, Cast, Coalesce, Cos, Greatest, Radians, Sin, Sqrt
+)
+from rest_framework.filters import BaseFilterBackend
+
+from .geo import EARTH_RADIUS_KM
+
+
+# Fields that feed the search vector
+SEARCH_FIELDS = {'name', 'city', 'specialties', 'address', 'description'}
+
+# Weights of the blended score
+RATING_WEIGHT = 0.2
+DISTANCE_WEIGHT = 0.3
+# Distance (km) at which the proximity bonus is halved
+DISTANCE_SCALE_KM = 10
+
+
+def garage_search_vector():
+    """Weighted search vector expression for the Garage table"""
+    config = settings.GARAGES_SEARCH_CONFIG
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('city', weight='B', config=config)
+        + SearchVector(Cast('specialties', TextField()), weight='B', config=config)
+        + SearchVector('address', weight='C', config=config)
+        + SearchVector('description', weight='C', config=config)
+    )
+
+
+def update_search_vectors(queryset):
+    """Recompute the search vector of every garage in a queryset (one UPDATE)"""
+    return queryset.update(search_vector=garage_search_vector())
+
+
+def distance_km_expression(lat, lng):
+    """Haversine distance (km) from a point, computed by the database"""
+    dlat = Radians(F('latitude') - lat)
+    dlng = Radians(F('longitude') - lng)
+    a = (
+        Sin(dlat / 2) * Sin(dlat / 2)
+        + Cos(Radians(Value(lat))) * Cos(Radians(F('latitude'))) * Sin(dlng / 2) * Sin(dlng / 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def search_garages(queryset, text, lat=None, lng=None):
+    """
+    Filter and rank garages matching a free-text query
+
+    A garage matches when its search vector matches the query or when its
+    name is trigram-similar to it. Results are annotated with
+    ``search_rank``, ``search_similarity``, ``distance_km`` (if located)
+    and ``search_score`` and ordered by score.
+    """
+    config = settings.GARAGES_SEARCH_CONFIG
+    query = SearchQuery(text, search_type='websearch', config=config)
+
+    queryset = queryset.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=text)
+    ).annotate(
+        search_rank=SearchRank(F('search_vector'), query),
+        search_similarity=TrigramSimilarity('name', text),
+    )
+
+    score = (
+        Greatest(F('search_rank'), F('search_similarity'))
+        + Value(RATING_WEIGHT / 5) * Cast('average_rating', FloatField())
+    )
+    if lat is not None and lng is not None:
+        queryset = queryset.annotate(distance_km=distance_km_expression(lat, lng))
+        # Proximity bonus decays with distance; unlocated garages get none
+        score = score + Coalesce(
+            Value(DISTANCE_WEIGHT) / (Value(1.0) + F('distance_km') / DISTANCE_SCALE_KM),
+            Value(0.0)
+        )
+
+    return queryset.annotate(
+        search_score=score
+    ).order_by('-search_score', '-average_rating', 'name')
+
+
+class GarageSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search on ``?search=``, optionally near ``?lat=&lng=``
+
+    Must run after OrderingFilter: relevance ordering replaces the default
+    ordering unless the client asked for an explicit ``?ordering=``.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+        except (KeyError, TypeError, ValueError):
+            lat = lng = None
+
+        ordered = queryset.query.order_by
+        queryset = search_garages(queryset, text, lat=lat, lng=lng)
+        if 'ordering' in request.query_params and ordered:
+            queryset = queryset.order_by(*ordered)
+        return queryset
@@ -0,0 +1,40 @@
+"""
+Signal handlers for garages
+
+Invalidate the process-local garage geo indexes when the set of located
+garages changes, the cached specialty facets when specialties change and
+the cached catalog responses on any garage or review write.
+Invalidation runs after commit so a reload never picks up pre-commit data
+under the new version.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Garage, GarageReview
+from .caching import invalidate_catalog_responses
+from .geo_index import invalidate_garage_catalog
+from .specialties import invalidate_specialty_facets
+
+
+@receiver(post_save, sender=Garage)
+def invalidate_catalog_on_garage_save(sender, instance, update_fields=None, **kwargs):
+    transaction.on_commit(invalidate_catalog_responses)
+    # Partial saves that do not touch the field (e.g. rating updates) are skipped
+    if update_fields is None or {'location', 'latitude', 'longitude'} & set(update_fields):
+        transaction.on_commit(invalidate_garage_catalog)
+    if update_fields is None or 'specialties' in update_fields:
+        transaction.on_commit(invalidate_specialty_facets)
+
+
+@receiver(post_delete, sender=Garage)
+def invalidate_catalog_on_garage_delete(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_garage_catalog)
+    transaction.on_commit(invalidate_specialty_facets)
+    transaction.on_commit(invalidate_catalog_responses)
+
+
+@receiver([post_save, post_delete], sender=GarageReview)
+def invalidate_catalog_on_review_change(sender, instance, **kwargs):
+    # Reviews are embedded in garage responses and move the ratings
+    transaction.on_commit(invalidate_catalog_responses)
@@ -0,0 +1,54 @@
+"""
+Specialty facets for garages
+
+Garage specialties are a JSON list indexed with GIN (jsonb_path_ops), so
+``specialties__contains`` filters are answered from the index. Facet
+counts (specialty -> number of garages) are computed by unnesting the
+lists in one grouped query and cached per filter combination; the cache is
+invalidated whenever a garage's specialties change (see garages.signals).
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Func, TextField
+from common.cache import make_cache_key, bump_cache_version
+
+
+SPECIALTY_FACETS_NAMESPACE = 'garages:specialties'
+
+
+def invalidate_specialty_facets():
+    bump_cache_version(SPECIALTY_FACETS_NAMESPACE)
+
+
+def filter_by_specialties(queryset, specialties):
+    """Keep garages offering every given specialty (GIN containment lookup)"""
+    if not specialties:
+        return queryset
+    return queryset.filter(specialties__contains=list(specialties))
+
+
+def compute_specialty_counts(queryset):
+    """Return [{'specialty', 'count'}] for a Garage queryset, most common first"""
+    rows = (
+        queryset.order_by()
+        .annotate(specialty=Func(
+            F('specialties'),
+            function='jsonb_array_elements_text',
+            output_field=TextField()
+        ))
+        .values('specialty')
+        .annotate(count=Count('id', distinct=True))
+        .order_by('-count', 'specialty')
+    )
+    return list(rows)
+
+
+def get_cached_specialty_counts(queryset, params=None):
+    """Return cached facet counts for a filter combination, computing them on a miss"""
+    key = make_cache_key(SPECIALTY_FACETS_NAMESPACE, params=params)
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute_specialty_counts(queryset)
+        cache.set(key, counts, settings.GARAGES_FACETS_CACHE_TIMEOUT)
+    return counts
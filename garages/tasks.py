@@ -0,0 +1,54 @@
+"""
+Celery tasks for garages
+"""
+
+import logging
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Coalesce
+from .models import Garage
+from .caching import invalidate_catalog_responses
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_garage_ratings():
+    """
+    Fix rating counters that drifted from the reviews table
+
+    Reviews written outside the API (admin, shell, raw SQL) bypass the
+    incremental counters. Each drifted garage is locked before being
+    recounted so in-flight review transactions are applied on top of the
+    corrected values.
+    """
+    drifted = (
+        Garage.objects.order_by()
+        .annotate(
+            actual_count=Count('reviews'),
+            actual_sum=Coalesce(Sum('reviews__rating'), Value(0))
+        )
+        .exclude(total_reviews=F('actual_count'), rating_sum=F('actual_sum'))
+        .values_list('id', flat=True)
+    )
+
+    fixed = 0
+    for garage_id in list(drifted):
+        with transaction.atomic():
+            garage = Garage.objects.select_for_update().filter(id=garage_id).first()
+            if garage is None:
+                continue
+            totals = garage.reviews.aggregate(count=Count('id'), total=Sum('rating'))
+            count, total = totals['count'], totals['total'] or 0
+            Garage.objects.filter(id=garage_id).update(
+                total_reviews=count,
+                rating_sum=total,
+                average_rating=round(total / count, 2) if count else 0
+            )
+        fixed += 1
+
+    if fixed:
+        invalidate_catalog_responses()
+        logger.warning("Reconciled rating counters of %s garage(s)", fixed)
+    return fixed
@@ -3,13 +3,19 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Avg, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from .models import Garage, GarageReview
 from .serializers import (
     GarageSerializer, GarageCreateSerializer, GarageDetailSerializer,
     GarageUpdateSerializer, GarageReviewSerializer
 )
-import math
+from .geo import bounding_box_filter, garages_within_radius
+from .geo_index import get_garage_geo_index
+from .caching import catalog_cache
+from .search import GarageSearchFilter
+from .specialties import filter_by_specialties, get_cached_specialty_counts
 
 
 class GarageViewSet(viewsets.ModelViewSet):
@@ -24,15 +30,15 @@ class GarageViewSet(viewsets.ModelViewSet):
     destroy: Delete a garage
     """
     queryset = Garage.objects.all()
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # GarageSearchFilter ranks ?search= results and must follow OrderingFilter
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, GarageSearchFilter]
     filterset_fields = ['city', 'postal_code', 'country']
-    search_fields = ['name', 'address', 'city', 'specialties']
     ordering_fields = ['name', 'average_rating', 'total_reviews', 'created_at']
     ordering = ['-average_rating', 'name']
     
     def get_permissions(self):
         """Allow anyone to view garages, but require auth for create/update/delete"""
-        if self.action in ['list', 'retrieve', 'search_nearby', 'top_rated']:
+        if self.action in ['list', 'retrieve', 'search_nearby', 'top_rated', 'by_specialty', 'specialties']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
@@ -46,6 +52,18 @@ class GarageViewSet(viewsets.ModelViewSet):
             return GarageDetailSerializer
         return GarageSerializer
     
+    def perform_create(self, serializer):
+        """The creating user manages the garage"""
+        serializer.save(owner=self.request.user)
+    
+    @catalog_cache
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @catalog_cache
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['post'])
     def add_review(self, request, pk=None):
         """Add a review to a garage"""
@@ -53,18 +71,15 @@ class GarageViewSet(viewsets.ModelViewSet):
         
         serializer = GarageReviewSerializer(data=request.data)
         if serializer.is_valid():
-            review = serializer.save(garage=garage)
-            
-            # Update garage rating
-            avg_rating = garage.reviews.aggregate(Avg('rating'))['rating__avg']
-            garage.average_rating = avg_rating or 0
-            garage.total_reviews = garage.reviews.count()
-            garage.save()
+            with transaction.atomic():
+                review = serializer.save(garage=garage)
+                Garage.apply_review_change(garage.id, count_delta=1, rating_delta=review.rating)
             
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @catalog_cache
     def top_rated(self, request):
         """Get top rated garages"""
         limit = int(request.query_params.get('limit', 10))
@@ -78,66 +93,144 @@ class GarageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def search_nearby(self, request):
         """
-        Search garages nearby based on coordinates
-        Query params: lat, lng, radius (in km, default 10)
+        Search garages nearby based on coordinates, nearest first (paginated)
+        Query params: lat, lng, radius (in km, default 10), limit (k nearest)
         """
         try:
             lat = float(request.query_params.get('lat'))
             lng = float(request.query_params.get('lng'))
             radius = float(request.query_params.get('radius', 10))
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit else None
         except (TypeError, ValueError):
             return Response(
                 {'error': 'Invalid coordinates. Please provide lat and lng parameters.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Simple distance calculation (not precise for large distances)
-        # For production, consider using PostGIS or more accurate geospatial queries
-        garages = []
-        for garage in self.get_queryset():
-            if garage.location and 'coordinates' in garage.location:
-                g_lng, g_lat = garage.location['coordinates']
-                
-                # Calculate approximate distance using Haversine formula
-                distance = self._calculate_distance(lat, lng, g_lat, g_lng)
-                
-                if distance <= radius:
-                    garage_data = GarageSerializer(garage).data
-                    garage_data['distance_km'] = round(distance, 2)
-                    garages.append(garage_data)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+            return Response(
+                {'error': 'Invalid coordinates or radius.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if settings.GARAGES_GEO_INDEX_ENABLED:
+            # (garage_id, distance) pairs; garages are fetched for the page only
+            nearby = get_garage_geo_index().nearest(lat, lng, radius, limit=limit)
+        else:
+            nearby = garages_within_radius(self.get_queryset(), lat, lng, radius)
+            if limit:
+                nearby = nearby[:limit]
+        
+        # Serialize only the requested page
+        page = self.paginate_queryset(nearby)
+        items = page if page is not None else nearby
         
-        # Sort by distance
-        garages.sort(key=lambda x: x['distance_km'])
+        if settings.GARAGES_GEO_INDEX_ENABLED:
+            garages_by_id = self.get_queryset().in_bulk([garage_id for garage_id, _ in items])
+            items = [
+                (garages_by_id[garage_id], distance)
+                for garage_id, distance in items
+                if garage_id in garages_by_id
+            ]
         
+        garages = []
+        for garage, distance in items:
+            garage_data = GarageSerializer(garage).data
+            garage_data['distance_km'] = round(distance, 2)
+            garages.append(garage_data)
+        
+        if page is not None:
+            return self.get_paginated_response(garages)
         return Response(garages)
     
+    def _specialty_params(self, request):
+        """Specialties requested with ?specialty=A&specialty=B or ?specialty=A,B"""
+        return [
+            value.strip()
+            for param in request.query_params.getlist('specialty')
+            for value in param.split(',')
+            if value.strip()
+        ]
+    
+    def _geo_params(self, request):
+        """(lat, lng, radius) from the query string, or None when absent"""
+        if 'lat' not in request.query_params or 'lng' not in request.query_params:
+            return None
+        lat = float(request.query_params['lat'])
+        lng = float(request.query_params['lng'])
+        radius = float(request.query_params.get('radius', 10))
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+            raise ValueError('Invalid coordinates or radius')
+        return lat, lng, radius
+    
     @action(detail=False, methods=['get'])
+    @catalog_cache
     def by_specialty(self, request):
-        """Get garages grouped by specialty"""
-        specialty = request.query_params.get('specialty')
-        
-        if specialty:
-            queryset = self.get_queryset().filter(
-                specialties__contains=[specialty]
+        """
+        Get garages offering one or more specialties (paginated)
+        Query params: specialty (repeatable or comma-separated), city, postal_code,
+        country, lat/lng/radius (km) to restrict to a zone, nearest first
+        """
+        try:
+            geo = self._geo_params(request)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Invalid coordinates or radius.'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        else:
-            queryset = self.get_queryset()
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
-    
-    def _calculate_distance(self, lat1, lon1, lat2, lon2):
-        """Calculate distance between two points using Haversine formula (in km)"""
-        R = 6371  # Earth's radius in kilometers
+        queryset = filter_by_specialties(
+            self.filter_queryset(self.get_queryset()),
+            self._specialty_params(request)
+        )
+        
+        if geo is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                serializer = self.get_serializer(page, many=True)
+                return self.get_paginated_response(serializer.data)
+            serializer = self.get_serializer(queryset, many=True)
+            return Response(serializer.data)
+        
+        nearby = garages_within_radius(queryset, *geo)
+        page = self.paginate_queryset(nearby)
+        items = page if page is not None else nearby
         
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        garages = []
+        for garage, distance in items:
+            garage_data = self.get_serializer(garage).data
+            garage_data['distance_km'] = round(distance, 2)
+            garages.append(garage_data)
+        
+        if page is not None:
+            return self.get_paginated_response(garages)
+        return Response(garages)
+    
+    @action(detail=False, methods=['get'])
+    def specialties(self, request):
+        """
+        Number of garages per specialty, for filter chips (cached)
+        Accepts the same filters as by_specialty (city, specialty, lat/lng/radius...)
+        """
+        try:
+            geo = self._geo_params(request)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Invalid coordinates or radius.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
+        queryset = filter_by_specialties(
+            self.filter_queryset(self.get_queryset()),
+            self._specialty_params(request)
+        )
+        if geo is not None:
+            # Bounding box only: facet counts do not need exact distances
+            queryset = queryset.filter(bounding_box_filter(*geo))
         
-        return R * c
+        params = {key: ','.join(request.query_params.getlist(key)) for key in request.query_params}
+        return Response(get_cached_specialty_counts(queryset, params=params))
 
 
 class GarageReviewViewSet(viewsets.ModelViewSet):
@@ -160,23 +253,27 @@ class GarageReviewViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         """Update garage rating after creating review"""
-        review = serializer.save()
-        garage = review.garage
-        
-        # Update garage rating
-        avg_rating = garage.reviews.aggregate(Avg('rating'))['rating__avg']
-        garage.average_rating = avg_rating or 0
-        garage.total_reviews = garage.reviews.count()
-        garage.save()
+        with transaction.atomic():
+            review = serializer.save()
+            Garage.apply_review_change(review.garage_id, count_delta=1, rating_delta=review.rating)
+    
+    def perform_update(self, serializer):
+        """Move the review's rating between garage counters"""
+        with transaction.atomic():
+            # Locked re-read: concurrent edits each apply their delta from the previous one
+            serializer.instance = GarageReview.objects.select_for_update().get(pk=serializer.instance.pk)
+            old_garage_id, old_rating = serializer.instance.garage_id, serializer.instance.rating
+            review = serializer.save()
+            if review.garage_id != old_garage_id:
+                Garage.apply_review_change(old_garage_id, count_delta=-1, rating_delta=-old_rating)
+                Garage.apply_review_change(review.garage_id, count_delta=1, rating_delta=review.rating)
+            elif review.rating != old_rating:
+                Garage.apply_review_change(review.garage_id, rating_delta=review.rating - old_rating)
     
     def perform_destroy(self, instance):
         """Update garage rating after deleting review"""
-        garage = instance.garage
-        instance.delete()
-        
-        # Update garage rating
-        avg_rating = garage.reviews.aggregate(Avg('rating'))['rating__avg']
-        garage.average_rating = avg_rating or 0
-        garage.total_reviews = garage.reviews.count()
-        garage.save()
-
+        with transaction.atomic():
+            deleted, _ = instance.delete()
+            # Already deleted by a concurrent or repeated request: counted once
+            if deleted:
+                Garage.apply_review_change(instance.garage_id, count_delta=-1, rating_delta=-instance.rating)
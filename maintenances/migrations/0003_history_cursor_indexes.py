@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('maintenances', '0002_initial'),
+        ('vehicles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='maintenance',
+            name='maintenance_vehicle_d6f2e4_idx',
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['vehicle', '-service_date', '-id'], name='maintenance_vehicle_5ebd9b_idx'),
+        ),
+    ]
@@ -55,7 +55,7 @@ class Maintenance(models.Model):
         db_table = 'maintenances'
         ordering = ['-service_date']
         indexes = [
-            models.Index(fields=['vehicle', '-service_date']),
+            models.Index(fields=['vehicle', '-service_date', '-id']),
             models.Index(fields=['created_by']),
             models.Index(fields=['status']),
         ]
@@ -0,0 +1,15 @@
+"""
+Signal handlers for maintenances
+
+Feed the vehicle odometer with the mileage recorded on maintenances.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from vehicles.odometer import sync_maintenance_reading
+from .models import Maintenance
+
+
+@receiver(post_save, sender=Maintenance)
+def sync_odometer_on_maintenance_save(sender, instance, **kwargs):
+    sync_maintenance_reading(instance)
@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Sum, Count, Avg, Q
 from datetime import datetime, timedelta
+from common.pagination import KeysetPagination
 from .models import Maintenance
 from .serializers import (
     MaintenanceSerializer, MaintenanceCreateSerializer,
@@ -110,7 +111,12 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def by_vehicle(self, request):
-        """Get maintenances grouped by vehicle"""
+        """
+        Get maintenances grouped by vehicle (cursor-paginated)
+        
+        A page holds the next maintenances in (service_date, id) order grouped
+        by vehicle; count and total_cost cover each vehicle's whole history.
+        """
         vehicle_id = request.query_params.get('vehicle_id')
         
         if vehicle_id:
@@ -118,11 +124,22 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
         else:
             queryset = self.get_queryset()
         
+        paginator = KeysetPagination(ordering=('-service_date', '-id'))
+        page = paginator.paginate_queryset(queryset, request)
+        
+        vehicle_ids = {maintenance.vehicle_id for maintenance in page}
+        totals = {
+            row['vehicle_id']: row
+            for row in queryset.filter(vehicle_id__in=vehicle_ids).order_by()
+            .values('vehicle_id').annotate(count=Count('id'), total_cost=Sum('cost'))
+        }
+        
         # Group by vehicle
         vehicles_data = {}
-        for maintenance in queryset:
+        for maintenance in page:
             vehicle_key = str(maintenance.vehicle.id)
             if vehicle_key not in vehicles_data:
+                vehicle_totals = totals.get(maintenance.vehicle_id, {})
                 vehicles_data[vehicle_key] = {
                     'vehicle': {
                         'id': maintenance.vehicle.id,
@@ -131,16 +148,12 @@ class MaintenanceViewSet(viewsets.ModelViewSet):
                         'year': maintenance.vehicle.year
                     },
                     'maintenances': [],
-                    'total_cost': 0,
-                    'count': 0
+                    'total_cost': float(vehicle_totals.get('total_cost') or 0),
+                    'count': vehicle_totals.get('count', 0)
                 }
             
             vehicles_data[vehicle_key]['maintenances'].append(
                 MaintenanceSerializer(maintenance).data
             )
-            vehicles_data[vehicle_key]['count'] += 1
-            if maintenance.cost:
-                vehicles_data[vehicle_key]['total_cost'] += float(maintenance.cost)
         
-        return Response(list(vehicles_data.values()))
-
+        return paginator.get_paginated_response(list(vehicles_data.values()))
@@ -217,12 +217,8 @@ class VehicleHealthPredictor:
 
     @staticmethod
     def _get_vehicle_mileage(vehicle):
-        from maintenances.models import Maintenance
-        latest = Maintenance.objects.filter(
-            vehicle=vehicle,
-            mileage__isnull=False
-        ).order_by('-service_date').first()
-        return latest.mileage if latest else None
+        """Kilométrage actuel estimé (dernier relevé projeté avec le km/jour stocké)"""
+        return vehicle.projected_mileage()
 
 
 class FailurePredictor:
@@ -5,9 +5,10 @@ from .models import Report, ReportTemplate
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'report_type', 'format', 'status', 'created_at', 'file_size_mb']
-    list_filter = ['report_type', 'format', 'status', 'created_at']
+    list_filter = ['report_type', 'format', 'status', 'is_batch', 'created_at']
     search_fields = ['user__username', 'user__email', 'vehicle__license_plate']
     readonly_fields = ['id', 'created_at', 'completed_at', 'download_url']
+    filter_horizontal = ['batch_vehicles']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -17,6 +18,9 @@ class ReportAdmin(admin.ModelAdmin):
         ('Filters', {
             'fields': ('vehicle', 'date_from', 'date_to')
         }),
+        ('Batch', {
+            'fields': ('is_batch', 'batch_vehicles', 'progress_total', 'progress_completed', 'progress_failed')
+        }),
         ('Configuration', {
             'fields': ('include_charts', 'include_images', 'include_summary', 'include_details')
         }),
@@ -0,0 +1,175 @@
+"""
+Efficient report file delivery.
+
+Handles conditional requests (ETag / If-None-Match), HTTP Range requests and,
+when configured, hands the transfer off to the front proxy via
+X-Accel-Redirect (nginx) or X-Sendfile (Apache / lighttpd).
+"""
+import hashlib
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'zip': 'application/zip',
+}
+
+CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def compute_etag(report, stat):
+    """
+    Build a strong ETag for a report file.
+
+    Report files are written once and never modified in place, so the report
+    id combined with the file size and modification time identifies the exact
+    byte sequence without reading the file.
+    """
+    raw = f"{report.id}:{stat.st_size}:{stat.st_mtime_ns}"
+    return quote_etag(hashlib.sha256(raw.encode()).hexdigest()[:32])
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range ``Range`` header.
+
+    Returns a ``(start, end)`` tuple (inclusive), ``None`` when the header
+    should be ignored (absent, malformed or multi-range) and raises
+    ``ValueError`` when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        # Suffix range: last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError('Unsatisfiable range')
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, size - 1)
+
+
+def _iter_file(path, start, length):
+    """Yield ``length`` bytes of ``path`` starting at ``start``."""
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = handle.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _sendfile_response(path):
+    """Return an empty response telling the proxy to serve ``path``, or None."""
+    backend = getattr(settings, 'REPORTS_SENDFILE_BACKEND', '')
+    if not backend:
+        return None
+
+    response = HttpResponse()
+    if backend == 'nginx':
+        root = os.path.abspath(str(settings.REPORTS_SENDFILE_ROOT))
+        relative = os.path.relpath(os.path.abspath(path), root)
+        if relative.startswith('..'):
+            # File lives outside the internal location, serve it ourselves
+            return None
+        location = settings.REPORTS_SENDFILE_URL.rstrip('/')
+        response['X-Accel-Redirect'] = quote(f"{location}/{relative.replace(os.sep, '/')}")
+    elif backend == 'sendfile':
+        response['X-Sendfile'] = os.path.abspath(path)
+    else:
+        return None
+
+    return response
+
+
+def serve_report_file(request, report, filename=None):
+    """
+    Serve a report file with ETag, Range and proxy offload support.
+
+    The in-process streaming path is used whenever no sendfile backend is
+    configured.
+    """
+    path = report.file_path
+    stat = os.stat(path)
+    etag = compute_etag(report, stat)
+    last_modified = stat.st_mtime
+
+    # 304 Not Modified / 412 Precondition Failed
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if conditional is not None:
+        conditional['ETag'] = etag
+        return conditional
+
+    filename = filename or os.path.basename(path)
+    file_format = 'zip' if report.is_batch else report.format
+    content_type = CONTENT_TYPES.get(file_format, 'application/octet-stream')
+
+    response = _sendfile_response(path)
+    if response is not None:
+        # The proxy handles Range itself
+        response['Content-Type'] = content_type
+    else:
+        size = stat.st_size
+        byte_range = None
+
+        # Only honor Range when If-Range is absent or still matches
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range or etag in parse_etags(if_range):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        if byte_range is None:
+            start, end = 0, size - 1
+            response = StreamingHttpResponse(
+                _iter_file(path, 0, size),
+                content_type=content_type,
+            )
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _iter_file(path, start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        response['Content-Length'] = str(max(end - start + 1, 0))
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
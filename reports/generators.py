@@ -21,10 +21,10 @@ from django.utils import timezone
 class BasePDFGenerator:
     """Base class for PDF report generation"""
     
-    def __init__(self, report):
+    def __init__(self, report, vehicle=None):
         self.report = report
         self.user = report.user
-        self.vehicle = report.vehicle
+        self.vehicle = vehicle or report.vehicle
         self.styles = getSampleStyleSheet()
         self.elements = []
         
@@ -189,10 +189,10 @@ class VehicleSummaryPDFGenerator(BasePDFGenerator):
 class BaseExcelGenerator:
     """Base class for Excel report generation"""
     
-    def __init__(self, report):
+    def __init__(self, report, vehicle=None):
         self.report = report
         self.user = report.user
-        self.vehicle = report.vehicle
+        self.vehicle = vehicle or report.vehicle
         self.wb = Workbook()
         self.ws = self.wb.active
         
@@ -327,10 +327,10 @@ class VehicleSummaryExcelGenerator(BaseExcelGenerator):
 class CSVGenerator:
     """Generate CSV reports"""
     
-    def __init__(self, report):
+    def __init__(self, report, vehicle=None):
         self.report = report
         self.user = report.user
-        self.vehicle = report.vehicle
+        self.vehicle = vehicle or report.vehicle
     
     def generate(self, output_path):
         """Generate CSV report"""
@@ -452,3 +452,28 @@ class CSVGenerator:
                 diag.severity,
                 'Resolved' if diag.resolved else 'Unresolved'
             ])
+
+
+REPORT_EXTENSIONS = {
+    'pdf': 'pdf',
+    'excel': 'xlsx',
+    'csv': 'csv',
+}
+
+
+def render_report(report, output_path, vehicle=None):
+    """
+    Render a report to ``output_path`` using the generator matching its format
+
+    ``vehicle`` overrides ``report.vehicle`` so a batch report can render one
+    file per vehicle from a single Report record.
+    """
+    if report.format == 'pdf':
+        generator = VehicleSummaryPDFGenerator(report, vehicle=vehicle)
+    elif report.format == 'excel':
+        generator = VehicleSummaryExcelGenerator(report, vehicle=vehicle)
+    else:
+        generator = CSVGenerator(report, vehicle=vehicle)
+    
+    generator.generate(output_path)
+    return output_path
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('vehicles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='batch_vehicles',
+            field=models.ManyToManyField(blank=True, related_name='batch_reports', to='vehicles.vehicle'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='is_batch',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='progress_completed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='progress_failed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='progress_total',
+            field=models.IntegerField(default=0),
+        ),
+    ]
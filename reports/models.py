@@ -39,6 +39,13 @@ class Report(models.Model):
     date_from = models.DateField(null=True, blank=True)
     date_to = models.DateField(null=True, blank=True)
     
+    # Batch reports: one file per vehicle, bundled into a single ZIP archive
+    is_batch = models.BooleanField(default=False)
+    batch_vehicles = models.ManyToManyField(Vehicle, blank=True, related_name='batch_reports')
+    progress_total = models.IntegerField(default=0)
+    progress_completed = models.IntegerField(default=0)
+    progress_failed = models.IntegerField(default=0)
+    
     # Report configuration
     include_charts = models.BooleanField(default=True)
     include_images = models.BooleanField(default=True)
@@ -74,6 +81,14 @@ class Report(models.Model):
             return f"/api/reports/{self.id}/download/"
         return None
     
+    @property
+    def progress_percent(self):
+        """Percentage of batch items processed (completed or failed)"""
+        if not self.progress_total:
+            return 100 if self.status == 'completed' else 0
+        done = self.progress_completed + self.progress_failed
+        return round(done * 100 / self.progress_total)
+    
     @property
     def is_expired(self):
         """Check if report has expired"""
@@ -37,6 +37,62 @@ class ReportCreateSerializer(serializers.Serializer):
         return data
 
 
+class ReportBatchCreateSerializer(serializers.Serializer):
+    """Serializer for creating a multi-vehicle batch report"""
+    
+    report_type = serializers.ChoiceField(choices=Report.REPORT_TYPES)
+    format = serializers.ChoiceField(choices=Report.FORMATS)
+    date_from = serializers.DateField(required=False, allow_null=True)
+    date_to = serializers.DateField(required=False, allow_null=True)
+    include_charts = serializers.BooleanField(default=True)
+    include_images = serializers.BooleanField(default=True)
+    include_summary = serializers.BooleanField(default=True)
+    include_details = serializers.BooleanField(default=True)
+    
+    # Vehicle selection: explicit ids and/or filters (all vehicles if omitted)
+    vehicle_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    make = serializers.CharField(required=False)
+    model = serializers.CharField(required=False)
+    fuel_type = serializers.ChoiceField(choices=Vehicle.FUEL_TYPE_CHOICES, required=False)
+    transmission = serializers.ChoiceField(choices=Vehicle.TRANSMISSION_CHOICES, required=False)
+    year_min = serializers.IntegerField(required=False)
+    year_max = serializers.IntegerField(required=False)
+    
+    def get_vehicles(self):
+        """Resolve the selected vehicles of the current user"""
+        data = self.validated_data
+        vehicles = Vehicle.objects.filter(owner=self.context['request'].user)
+        
+        if data.get('vehicle_ids'):
+            vehicles = vehicles.filter(id__in=data['vehicle_ids'])
+        if data.get('make'):
+            vehicles = vehicles.filter(make__iexact=data['make'])
+        if data.get('model'):
+            vehicles = vehicles.filter(model__iexact=data['model'])
+        if data.get('fuel_type'):
+            vehicles = vehicles.filter(fuel_type=data['fuel_type'])
+        if data.get('transmission'):
+            vehicles = vehicles.filter(transmission=data['transmission'])
+        if data.get('year_min'):
+            vehicles = vehicles.filter(year__gte=data['year_min'])
+        if data.get('year_max'):
+            vehicles = vehicles.filter(year__lte=data['year_max'])
+        
+        return vehicles
+    
+    def validate(self, data):
+        """Validate date range"""
+        date_from = data.get('date_from')
+        date_to = data.get('date_to')
+        
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError({
+                'date_from': 'Start date must be before end date'
+            })
+        
+        return data
+
+
 class ReportSerializer(serializers.ModelSerializer):
     """Serializer for Report model"""
     
@@ -52,11 +108,15 @@ class ReportSerializer(serializers.ModelSerializer):
             'id', 'report_type', 'report_type_display', 'format', 'format_display',
             'vehicle', 'vehicle_name', 'date_from', 'date_to',
             'include_charts', 'include_images', 'include_summary', 'include_details',
+            'is_batch', 'progress_total', 'progress_completed', 'progress_failed',
+            'progress_percent',
             'status', 'status_display', 'file_size', 'error_message',
             'created_at', 'completed_at', 'expires_at', 'download_url'
         ]
         read_only_fields = [
             'id', 'status', 'file_size', 'error_message',
+            'is_batch', 'progress_total', 'progress_completed', 'progress_failed',
+            'progress_percent',
             'created_at', 'completed_at', 'expires_at', 'download_url'
         ]
     
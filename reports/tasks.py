@@ -0,0 +1,159 @@
+"""
+Celery tasks for batch report generation
+
+A batch report renders one file per vehicle in parallel (one task per
+vehicle) and a chord callback streams the rendered files into a single ZIP
+archive tracked by one Report record.
+"""
+import os
+import shutil
+import zipfile
+from datetime import timedelta
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .generators import REPORT_EXTENSIONS, render_report
+from .models import Report
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Already-compressed formats are stored as-is in the archive
+STORED_FORMATS = {'pdf', 'excel'}
+
+
+def get_batch_dir(report):
+    """Working directory holding the per-vehicle files of a batch"""
+    return os.path.join(settings.MEDIA_ROOT, 'reports', str(report.user_id), f'batch_{report.id}')
+
+
+@shared_task
+def generate_report_batch(report_id):
+    """
+    Fan out one rendering task per vehicle and assemble the archive once
+    all of them have finished
+    """
+    try:
+        report = Report.objects.get(id=report_id, is_batch=True)
+    except Report.DoesNotExist:
+        logger.error(f"Batch report {report_id} not found")
+        return {'status': 'error', 'message': 'Report not found'}
+
+    vehicle_ids = list(report.batch_vehicles.values_list('id', flat=True))
+    if not vehicle_ids:
+        report.status = 'failed'
+        report.error_message = 'No vehicles selected'
+        report.save(update_fields=['status', 'error_message'])
+        return {'status': 'error', 'message': 'No vehicles selected'}
+
+    os.makedirs(get_batch_dir(report), exist_ok=True)
+
+    report.status = 'processing'
+    report.progress_total = len(vehicle_ids)
+    report.progress_completed = 0
+    report.progress_failed = 0
+    report.save(update_fields=['status', 'progress_total', 'progress_completed', 'progress_failed'])
+
+    chord(
+        render_batch_item.s(str(report.id), vehicle_id) for vehicle_id in vehicle_ids
+    )(assemble_batch_archive.s(str(report.id)))
+
+    logger.info(f"Batch report {report_id} dispatched for {len(vehicle_ids)} vehicles")
+    return {'status': 'dispatched', 'report_id': str(report.id), 'total': len(vehicle_ids)}
+
+
+@shared_task
+def render_batch_item(report_id, vehicle_id):
+    """Render the report of a single vehicle of a batch"""
+    try:
+        report = Report.objects.select_related('user').get(id=report_id)
+        vehicle = report.batch_vehicles.get(id=vehicle_id)
+
+        name = slugify(f"{vehicle.make} {vehicle.model} {vehicle.license_plate or ''}")
+        filename = f"{report.report_type}_{vehicle.id}_{name}.{REPORT_EXTENSIONS[report.format]}"
+        file_path = os.path.join(get_batch_dir(report), filename)
+
+        render_report(report, file_path, vehicle=vehicle)
+
+        Report.objects.filter(id=report_id).update(progress_completed=F('progress_completed') + 1)
+        return {'vehicle_id': vehicle_id, 'status': 'success', 'file_path': file_path}
+
+    except Exception as e:
+        logger.error(f"Error rendering batch report {report_id} for vehicle {vehicle_id}: {str(e)}")
+        Report.objects.filter(id=report_id).update(progress_failed=F('progress_failed') + 1)
+        return {'vehicle_id': vehicle_id, 'status': 'error', 'message': str(e)}
+
+
+@shared_task
+def assemble_batch_archive(results, report_id):
+    """
+    Stream the rendered files into a single ZIP archive
+
+    Files are copied into the archive chunk by chunk, so the archive is never
+    held in memory regardless of the number of vehicles.
+    """
+    try:
+        report = Report.objects.get(id=report_id)
+    except Report.DoesNotExist:
+        logger.error(f"Batch report {report_id} not found")
+        return {'status': 'error', 'message': 'Report not found'}
+
+    batch_dir = get_batch_dir(report)
+    succeeded = [r for r in results if r.get('status') == 'success']
+    failed = [r for r in results if r.get('status') != 'success']
+
+    try:
+        if not succeeded:
+            raise ValueError('No vehicle report could be generated')
+
+        timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
+        archive_path = os.path.join(
+            os.path.dirname(batch_dir),
+            f"{report.report_type}_batch_{timestamp}.zip"
+        )
+        compression = zipfile.ZIP_STORED if report.format in STORED_FORMATS else zipfile.ZIP_DEFLATED
+
+        # Write to a temporary name so a partial archive is never served
+        tmp_path = f"{archive_path}.part"
+        with zipfile.ZipFile(tmp_path, 'w', compression=compression, allowZip64=True) as archive:
+            for item in succeeded:
+                archive.write(item['file_path'], arcname=os.path.basename(item['file_path']))
+
+            if failed:
+                errors = '\n'.join(f"vehicle {r['vehicle_id']}: {r.get('message', '')}" for r in failed)
+                archive.writestr('errors.txt', errors)
+        os.replace(tmp_path, archive_path)
+
+        report.status = 'completed'
+        report.file_path = archive_path
+        report.file_size = os.path.getsize(archive_path)
+        report.completed_at = timezone.now()
+        report.expires_at = timezone.now() + timedelta(days=7)
+        report.error_message = f"{len(failed)} vehicle report(s) failed" if failed else ''
+        report.save(update_fields=[
+            'status', 'file_path', 'file_size', 'completed_at', 'expires_at', 'error_message'
+        ])
+
+    except Exception as e:
+        logger.error(f"Error assembling batch report {report_id}: {str(e)}")
+        report.status = 'failed'
+        report.error_message = str(e)
+        report.save(update_fields=['status', 'error_message'])
+
+    finally:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    logger.info(
+        f"Batch report {report_id} assembled: {len(succeeded)} success, "
+        f"{len(failed)} failed out of {len(results)}"
+    )
+    return {
+        'status': report.status,
+        'report_id': report_id,
+        'success': len(succeeded),
+        'failed': len(failed),
+    }
@@ -2,7 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.http import FileResponse, Http404
+from django.http import Http404
 from django.utils import timezone
 from django.db.models import Count, Sum, Q
 from datetime import timedelta
@@ -11,16 +11,18 @@ from .models import Report, ReportTemplate
 from .serializers import (
     ReportSerializer,
     ReportCreateSerializer,
+    ReportBatchCreateSerializer,
     ReportTemplateSerializer,
     ReportStatsSerializer
 )
 from .generators import (
-    VehicleSummaryPDFGenerator,
-    VehicleSummaryExcelGenerator,
-    CSVGenerator,
     BasePDFGenerator,
-    BaseExcelGenerator
+    BaseExcelGenerator,
+    REPORT_EXTENSIONS,
+    render_report,
 )
+from .downloads import serve_report_file
+from .tasks import generate_report_batch
 
 
 class ReportViewSet(viewsets.ModelViewSet):
@@ -33,6 +35,7 @@ class ReportViewSet(viewsets.ModelViewSet):
     - GET /api/reports/{id}/ - Get report details
     - DELETE /api/reports/{id}/ - Delete report
     - GET /api/reports/{id}/download/ - Download report file
+    - POST /api/reports/batch/ - Create a multi-vehicle batch report (ZIP)
     - GET /api/reports/stats/ - Get report statistics
     """
     
@@ -113,31 +116,72 @@ class ReportViewSet(viewsets.ModelViewSet):
         
         # Generate filename
         timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-        extension = {
-            'pdf': 'pdf',
-            'excel': 'xlsx',
-            'csv': 'csv'
-        }[report.format]
+        extension = REPORT_EXTENSIONS[report.format]
         
         filename = f"{report.report_type}_{timestamp}.{extension}"
         file_path = os.path.join(reports_dir, filename)
         
         # Generate report based on format
-        if report.format == 'pdf':
-            generator = VehicleSummaryPDFGenerator(report)
-            generator.generate(file_path)
-        elif report.format == 'excel':
-            generator = VehicleSummaryExcelGenerator(report)
-            generator.generate(file_path)
-        elif report.format == 'csv':
-            generator = CSVGenerator(report)
-            generator.generate(file_path)
+        render_report(report, file_path)
         
         return file_path
     
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Create a batch report: one file per vehicle bundled into a ZIP archive
+        
+        Vehicles are selected with `vehicle_ids` and/or filters (make, model,
+        fuel_type, transmission, year_min, year_max). Rendering runs on
+        Celery workers; poll the returned report for progress.
+        """
+        from django.conf import settings
+        serializer = ReportBatchCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        
+        vehicle_ids = list(serializer.get_vehicles().values_list('id', flat=True))
+        if not vehicle_ids:
+            return Response(
+                {'error': 'No vehicles match the selection'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        max_vehicles = settings.REPORTS_BATCH_MAX_VEHICLES
+        if len(vehicle_ids) > max_vehicles:
+            return Response(
+                {'error': f'A batch is limited to {max_vehicles} vehicles'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = serializer.validated_data
+        report = Report.objects.create(
+            user=request.user,
+            report_type=data['report_type'],
+            format=data['format'],
+            date_from=data.get('date_from'),
+            date_to=data.get('date_to'),
+            include_charts=data.get('include_charts', True),
+            include_images=data.get('include_images', True),
+            include_summary=data.get('include_summary', True),
+            include_details=data.get('include_details', True),
+            is_batch=True,
+            progress_total=len(vehicle_ids),
+        )
+        report.batch_vehicles.set(vehicle_ids)
+        
+        generate_report_batch.delay(str(report.id))
+        
+        response_serializer = ReportSerializer(report, context={'request': request})
+        return Response(response_serializer.data, status=status.HTTP_202_ACCEPTED)
+    
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
-        """Download report file"""
+        """
+        Download report file
+        
+        Supports ETag / If-None-Match and HTTP Range requests, and offloads
+        the transfer to the front proxy when REPORTS_SENDFILE_BACKEND is set.
+        """
         report = self.get_object()
         
         # Check if report is completed
@@ -161,23 +205,7 @@ class ReportViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_410_GONE
             )
         
-        # Return file
-        file_handle = open(report.file_path, 'rb')
-        content_types = {
-            'pdf': 'application/pdf',
-            'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            'csv': 'text/csv'
-        }
-        
-        response = FileResponse(
-            file_handle,
-            content_type=content_types.get(report.format, 'application/octet-stream')
-        )
-        
-        filename = os.path.basename(report.file_path)
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        return serve_report_file(request, report)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Vehicle, CarBrand, CarModel
+from .models import Vehicle, CarBrand, CarModel, OdometerReading
 
 
 @admin.register(CarBrand)
@@ -26,5 +26,19 @@ class VehicleAdmin(admin.ModelAdmin):
     list_filter = ['fuel_type', 'transmission', 'year']
     search_fields = ['make', 'model', 'license_plate', 'vin', 'owner__email']
     ordering = ['-created_at']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'current_mileage', 'current_mileage_date', 'daily_km_rate',
+        'created_at', 'updated_at'
+    ]
 
+
+
+@admin.register(OdometerReading)
+class OdometerReadingAdmin(admin.ModelAdmin):
+    """Odometer reading admin"""
+    list_display = ['vehicle', 'mileage', 'reading_date', 'source', 'created_at']
+    list_filter = ['source']
+    search_fields = ['vehicle__make', 'vehicle__model', 'vehicle__license_plate']
+    raw_id_fields = ['vehicle', 'maintenance', 'document', 'created_by']
+    ordering = ['-reading_date']
+    readonly_fields = ['created_at']
@@ -0,0 +1,114 @@
+"""
+Per-process cache of the car brand / model catalog
+
+Catalog responses are kept in process memory, keyed by URL and negotiated
+media type, and tagged with the catalog version shared through the cache
+backend. CarBrand / CarModel writes bump that version (see
+vehicles.signals): every process then drops its entries on the next
+request. Matching If-None-Match requests are answered with 304 without
+touching the database.
+
+The version only reaches other processes through a shared cache: without
+one the process cache is disabled (VEHICLES_CATALOG_CACHE_ENABLED). Entries
+are also dropped after VEHICLES_CATALOG_CACHE_MAX_AGE seconds, which bounds
+staleness from writes that bypass the signals; ETags hash the response
+content, so they change whenever the data does.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+from common.cache import get_cache_version, bump_cache_version
+
+
+CAR_CATALOG_NAMESPACE = 'vehicles:catalog'
+
+# Upper bound on cached URLs per process (search/filter combinations)
+MAX_ENTRIES = 512
+
+
+def invalidate_car_catalog():
+    bump_cache_version(CAR_CATALOG_NAMESPACE)
+
+
+class CatalogResponseCache:
+    """Process-local {key: (data, etag)} store bound to one catalog version"""
+
+    def __init__(self):
+        self.version = None
+        self.started_at = None
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def is_stale(self, version):
+        if version != self.version or self.started_at is None:
+            return True
+        return time.monotonic() - self.started_at > settings.VEHICLES_CATALOG_CACHE_MAX_AGE
+
+    def current(self):
+        """Return the current catalog version, dropping entries of older ones or too old"""
+        version = get_cache_version(CAR_CATALOG_NAMESPACE)
+        if self.is_stale(version):
+            with self._lock:
+                if self.is_stale(version):
+                    self.entries = {}
+                    self.version = version
+                    self.started_at = time.monotonic()
+        return version
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self.entries) >= MAX_ENTRIES:
+                self.entries = {}
+            self.entries[key] = value
+
+
+_cache = CatalogResponseCache()
+
+
+def _with_headers(response, etag):
+    response['ETag'] = etag
+    # Clients may keep the catalog but must revalidate it (cheap 304)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def catalog_response(view_method):
+    """Serve a GET catalog action from the per-process cache, with ETag / 304"""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method != 'GET' or not settings.VEHICLES_CATALOG_CACHE_ENABLED:
+            return view_method(self, request, *args, **kwargs)
+
+        _cache.current()
+        key = f'{request.accepted_media_type}:{request.get_full_path()}'
+
+        entry = _cache.get(key)
+        if entry is None:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = json.dumps(response.data, sort_keys=True, default=str)
+            etag = quote_etag(hashlib.md5(f'{key}:{content}'.encode()).hexdigest())
+            entry = (response.data, etag)
+            _cache.set(key, entry)
+
+        data, etag = entry
+        conditional = get_conditional_response(request, etag=etag)
+        if conditional is not None:
+            return _with_headers(conditional, etag)
+        return _with_headers(Response(data), etag)
+
+    return wrapper
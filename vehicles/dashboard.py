@@ -0,0 +1,157 @@
+"""
+Vehicle dashboard
+
+Assembles everything the vehicle screen shows (vehicle, latest health
+score, active failure predictions, pending recommendations, upcoming
+maintenances, reminders, recent documents) in one response. Every section
+is a sliced ``Prefetch`` and every section total a subquery annotation on
+the vehicle query, so a dashboard costs one query for the vehicles plus one
+per requested section, whatever the number of vehicles.
+"""
+
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from documents.models import Document
+from documents.serializers import DocumentSerializer
+from maintenances.models import Maintenance
+from maintenances.serializers import MaintenanceSerializer
+from ml_predictions.models import VehicleHealthScore, FailurePrediction, MaintenanceRecommendation
+from ml_predictions.serializers import (
+    VehicleHealthScoreSerializer, FailurePredictionSerializer, MaintenanceRecommendationSerializer
+)
+from reminders.models import Reminder
+from reminders.serializers import ReminderSerializer
+from .serializers import VehicleSerializer
+
+
+DASHBOARD_SECTIONS = (
+    'health', 'predictions', 'recommendations', 'maintenances', 'reminders', 'documents'
+)
+DEFAULT_SECTION_LIMIT = 5
+MAX_SECTION_LIMIT = 20
+
+
+def parse_dashboard_params(query_params):
+    """
+    Read ``sections`` (comma-separated, all by default) and ``limit``
+    (items per section) from the query string
+    """
+    raw = query_params.get('sections')
+    if raw:
+        sections = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = sorted(set(sections) - set(DASHBOARD_SECTIONS))
+        if unknown:
+            raise ValidationError({
+                'sections': f"Unknown sections: {', '.join(unknown)}. "
+                            f"Available: {', '.join(DASHBOARD_SECTIONS)}"
+            })
+    else:
+        sections = list(DASHBOARD_SECTIONS)
+
+    try:
+        limit = int(query_params.get('limit', DEFAULT_SECTION_LIMIT))
+    except ValueError:
+        raise ValidationError({'limit': 'limit must be an integer'})
+    limit = max(1, min(limit, MAX_SECTION_LIMIT))
+
+    return [name for name in DASHBOARD_SECTIONS if name in sections], limit
+
+
+def _section_querysets(user):
+    """Unsliced queryset of each section, in display order"""
+    now = timezone.now()
+    return {
+        'health': VehicleHealthScore.objects.order_by('-calculated_at'),
+        'predictions': (
+            FailurePrediction.objects.filter(status='active')
+            .order_by('-failure_probability', '-id')
+        ),
+        'recommendations': (
+            MaintenanceRecommendation.objects.filter(is_completed=False, dismissed=False)
+            .select_related('failure_prediction')
+            .order_by('recommended_by_date', '-created_at')
+        ),
+        'maintenances': (
+            Maintenance.objects.filter(status='SCHEDULED', service_date__gte=now)
+            .select_related('created_by', 'performed_by')
+            .order_by('service_date', 'id')
+        ),
+        'reminders': (
+            Reminder.objects.filter(user=user, status__in=['pending', 'sent'])
+            .order_by('remind_at')
+        ),
+        'documents': Document.objects.order_by('-created_at', '-id'),
+    }
+
+
+SECTION_RELATIONS = {
+    'health': 'health_scores',
+    'predictions': 'failure_predictions',
+    'recommendations': 'ml_recommendations',
+    'maintenances': 'maintenances',
+    'reminders': 'reminders',
+    'documents': 'documents',
+}
+
+SECTION_SERIALIZERS = {
+    'health': VehicleHealthScoreSerializer,
+    'predictions': FailurePredictionSerializer,
+    'recommendations': MaintenanceRecommendationSerializer,
+    'maintenances': MaintenanceSerializer,
+    'reminders': ReminderSerializer,
+    'documents': DocumentSerializer,
+}
+
+
+def _count_subquery(queryset):
+    """Number of rows of ``queryset`` belonging to the outer vehicle"""
+    counts = (
+        queryset.filter(vehicle=OuterRef('pk'))
+        .order_by().values('vehicle')
+        .annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_dashboard(queryset, user, sections, limit):
+    """Prefetch the requested sections and annotate their totals on a vehicle queryset"""
+    section_querysets = _section_querysets(user)
+    prefetches = []
+    totals = {}
+
+    for name in sections:
+        section_queryset = section_querysets[name]
+        size = 1 if name == 'health' else limit
+        prefetches.append(Prefetch(
+            SECTION_RELATIONS[name],
+            queryset=section_queryset[:size],
+            to_attr=f'dashboard_{name}'
+        ))
+        if name != 'health':
+            totals[f'dashboard_{name}_total'] = _count_subquery(section_queryset)
+
+    return queryset.select_related('owner').annotate(**totals).prefetch_related(*prefetches)
+
+
+def serialize_dashboard(vehicle, sections, context):
+    """Dashboard payload of a vehicle fetched through with_dashboard()"""
+    data = {
+        'vehicle': VehicleSerializer(vehicle, context=context).data,
+        'projected_mileage': vehicle.projected_mileage(),
+    }
+
+    for name in sections:
+        items = getattr(vehicle, f'dashboard_{name}')
+        serializer_class = SECTION_SERIALIZERS[name]
+        if name == 'health':
+            data[name] = serializer_class(items[0], context=context).data if items else None
+        else:
+            data[name] = {
+                'count': getattr(vehicle, f'dashboard_{name}_total'),
+                'results': serializer_class(items, many=True, context=context).data,
+            }
+
+    return data
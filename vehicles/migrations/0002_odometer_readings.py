@@ -0,0 +1,95 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:50
+
+import django.db.models.deletion
+from django.conf import settings
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_readings(apps, schema_editor):
+    """Seed readings from maintenance mileages and denormalize the latest one"""
+    Maintenance = apps.get_model('maintenances', 'Maintenance')
+    OdometerReading = apps.get_model('vehicles', 'OdometerReading')
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+
+    maintenances = Maintenance.objects.filter(
+        mileage__isnull=False, mileage__gte=0, service_date__lte=timezone.now()
+    ).values('id', 'vehicle_id', 'mileage', 'service_date', 'created_by_id')
+    OdometerReading.objects.bulk_create([
+        OdometerReading(
+            vehicle_id=m['vehicle_id'],
+            mileage=m['mileage'],
+            reading_date=m['service_date'],
+            source='maintenance',
+            maintenance_id=m['id'],
+            created_by_id=m['created_by_id'],
+        )
+        for m in maintenances.iterator()
+    ], batch_size=1000)
+
+    window = timedelta(days=getattr(settings, 'VEHICLES_ODOMETER_RATE_WINDOW_DAYS', 365))
+    vehicle_ids = OdometerReading.objects.values_list('vehicle_id', flat=True).distinct()
+    for vehicle_id in vehicle_ids.iterator():
+        readings = OdometerReading.objects.filter(vehicle_id=vehicle_id)
+        latest = readings.order_by('-reading_date', '-id').first()
+        baseline = readings.filter(
+            reading_date__gte=latest.reading_date - window
+        ).order_by('reading_date', 'id').first()
+        days = (latest.reading_date - baseline.reading_date).total_seconds() / 86400
+        rate = None
+        if days >= 1 and latest.mileage >= baseline.mileage:
+            rate = round((latest.mileage - baseline.mileage) / days, 2)
+        Vehicle.objects.filter(id=vehicle_id).update(
+            current_mileage=latest.mileage,
+            current_mileage_date=latest.reading_date,
+            daily_km_rate=rate
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_history_cursor_indexes'),
+        ('maintenances', '0003_history_cursor_indexes'),
+        ('vehicles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='current_mileage',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='current_mileage_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='daily_km_rate',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='OdometerReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mileage', models.PositiveIntegerField()),
+                ('reading_date', models.DateTimeField()),
+                ('source', models.CharField(choices=[('manual', 'Manual'), ('maintenance', 'Maintenance'), ('document', 'Document')], default='manual', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='odometer_readings', to=settings.AUTH_USER_MODEL)),
+                ('document', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='odometer_reading', to='documents.document')),
+                ('maintenance', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='odometer_reading', to='maintenances.maintenance')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='odometer_readings', to='vehicles.vehicle')),
+            ],
+            options={
+                'db_table': 'odometer_readings',
+                'ordering': ['-reading_date', '-id'],
+                'indexes': [models.Index(fields=['vehicle', '-reading_date', '-id'], name='odometer_re_vehicle_7aee9d_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_readings, migrations.RunPython.noop),
+    ]
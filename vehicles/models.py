@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class CarBrand(models.Model):
@@ -80,6 +81,11 @@ class Vehicle(models.Model):
         null=True
     )
     
+    # Odometer, denormalized from the latest OdometerReading (see vehicles.odometer)
+    current_mileage = models.IntegerField(blank=True, null=True, editable=False)
+    current_mileage_date = models.DateTimeField(blank=True, null=True, editable=False)
+    daily_km_rate = models.FloatField(blank=True, null=True, editable=False)  # km/day
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -95,4 +101,68 @@ class Vehicle(models.Model):
     
     def __str__(self):
         return f"{self.year} {self.make} {self.model}"
+    
+    def projected_mileage(self, at=None):
+        """Estimated odometer at a given time (default: now) from the stored km/day rate"""
+        if self.current_mileage is None:
+            return None
+        if not self.daily_km_rate or not self.current_mileage_date:
+            return self.current_mileage
+        at = at or timezone.now()
+        days = max((at - self.current_mileage_date).total_seconds() / 86400, 0)
+        return int(self.current_mileage + self.daily_km_rate * days)
+
+
+class OdometerReading(models.Model):
+    """Odometer reading of a vehicle at a point in time"""
+    
+    SOURCE_CHOICES = [
+        ('manual', 'Manual'),
+        ('maintenance', 'Maintenance'),
+        ('document', 'Document'),
+    ]
+    
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.CASCADE,
+        related_name='odometer_readings'
+    )
+    mileage = models.PositiveIntegerField()
+    reading_date = models.DateTimeField()
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='manual')
+    
+    # Origin of automatic readings (one reading per maintenance / document)
+    maintenance = models.OneToOneField(
+        'maintenances.Maintenance',
+        on_delete=models.CASCADE,
+        related_name='odometer_reading',
+        blank=True,
+        null=True
+    )
+    document = models.OneToOneField(
+        'documents.Document',
+        on_delete=models.CASCADE,
+        related_name='odometer_reading',
+        blank=True,
+        null=True
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='odometer_readings',
+        blank=True,
+        null=True
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'odometer_readings'
+        ordering = ['-reading_date', '-id']
+        indexes = [
+            models.Index(fields=['vehicle', '-reading_date', '-id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.vehicle} - {self.mileage} km ({self.reading_date:%Y-%m-%d})"
 
@@ -0,0 +1,112 @@
+"""
+Odometer readings
+
+Readings come from manual entries, maintenances and analyzed documents.
+Each write refreshes the vehicle's denormalized odometer (latest mileage,
+its date and a rolling km/day rate) so readers get the current or
+projected mileage from the vehicle row itself, without querying history.
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import Vehicle, OdometerReading
+
+
+# OdometerReading.mileage is a PositiveIntegerField (int4)
+MAX_MILEAGE = 2147483647
+
+
+def _is_valid_mileage(mileage):
+    return mileage is not None and 0 <= mileage <= MAX_MILEAGE
+
+
+def refresh_vehicle_odometer(vehicle_id):
+    """
+    Recompute the denormalized odometer of a vehicle from its readings
+
+    The km/day rate spans the readings of the last
+    VEHICLES_ODOMETER_RATE_WINDOW_DAYS days; when they cover less than a day
+    the latest older reading is used as the baseline.
+    """
+    readings = OdometerReading.objects.filter(vehicle_id=vehicle_id).order_by('-reading_date', '-id')
+    latest = readings.values('mileage', 'reading_date').first()
+
+    if latest is None:
+        Vehicle.objects.filter(id=vehicle_id).update(
+            current_mileage=None, current_mileage_date=None, daily_km_rate=None
+        )
+        return
+
+    window_start = latest['reading_date'] - timedelta(days=settings.VEHICLES_ODOMETER_RATE_WINDOW_DAYS)
+    baseline = (
+        readings.filter(reading_date__gte=window_start)
+        .order_by('reading_date', 'id')
+        .values('mileage', 'reading_date')
+        .first()
+    )
+    if baseline is None or latest['reading_date'] - baseline['reading_date'] < timedelta(days=1):
+        baseline = (
+            readings.filter(reading_date__lt=latest['reading_date'] - timedelta(days=1))
+            .values('mileage', 'reading_date')
+            .first()
+        )
+
+    rate = None
+    if baseline is not None:
+        days = (latest['reading_date'] - baseline['reading_date']).total_seconds() / 86400
+        if days >= 1 and latest['mileage'] >= baseline['mileage']:
+            rate = round((latest['mileage'] - baseline['mileage']) / days, 2)
+
+    Vehicle.objects.filter(id=vehicle_id).update(
+        current_mileage=latest['mileage'],
+        current_mileage_date=latest['reading_date'],
+        daily_km_rate=rate
+    )
+
+
+def _save_source_reading(lookup, vehicle_id, defaults):
+    """update_or_create a source-bound reading, refreshing the vehicle it left"""
+    previous_vehicle_id = (
+        OdometerReading.objects.filter(**lookup).values_list('vehicle_id', flat=True).first()
+    )
+    OdometerReading.objects.update_or_create(**lookup, defaults={'vehicle_id': vehicle_id, **defaults})
+    if previous_vehicle_id is not None and previous_vehicle_id != vehicle_id:
+        refresh_vehicle_odometer(previous_vehicle_id)
+
+
+def sync_maintenance_reading(maintenance):
+    """Create, update or drop the reading fed by a maintenance"""
+    if not _is_valid_mileage(maintenance.mileage) or maintenance.service_date > timezone.now():
+        # Planned maintenances carry a target mileage, not a reading (and an
+        # out-of-range mileage is not a reading either)
+        OdometerReading.objects.filter(maintenance=maintenance).delete()
+        return
+
+    _save_source_reading({'maintenance': maintenance}, maintenance.vehicle_id, {
+        'mileage': maintenance.mileage,
+        'reading_date': maintenance.service_date,
+        'source': 'maintenance',
+        'created_by_id': maintenance.created_by_id,
+    })
+
+
+def sync_document_reading(document):
+    """Record the mileage found by the analysis of a vehicle document"""
+    structured = (document.analysis_data or {}).get('structured_data') or {}
+    try:
+        mileage = int(structured.get('mileage'))
+    except (TypeError, ValueError):
+        mileage = None
+
+    # Misread OCR values outside the column range are dropped
+    if document.vehicle_id is None or not _is_valid_mileage(mileage):
+        OdometerReading.objects.filter(document=document).delete()
+        return
+
+    _save_source_reading({'document': document}, document.vehicle_id, {
+        'mileage': mileage,
+        'reading_date': document.created_at,
+        'source': 'document',
+        'created_by_id': document.user_id,
+    })
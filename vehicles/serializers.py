@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Vehicle, CarBrand, CarModel
+from django.utils import timezone
+from .models import Vehicle, CarBrand, CarModel, OdometerReading
 
 
 class CarBrandSerializer(serializers.ModelSerializer):
@@ -39,9 +40,13 @@ class VehicleSerializer(serializers.ModelSerializer):
             'id', 'owner', 'owner_email', 'owner_name',
             'make', 'model', 'year', 'license_plate', 'vin',
             'color', 'fuel_type', 'transmission',
+            'current_mileage', 'current_mileage_date', 'daily_km_rate',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'owner', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'owner', 'current_mileage', 'current_mileage_date',
+            'daily_km_rate', 'created_at', 'updated_at'
+        ]
     
     def get_owner_name(self, obj):
         return obj.owner.get_full_name()
@@ -91,3 +96,21 @@ class VehicleDetailSerializer(VehicleSerializer):
     
     def get_documents_count(self, obj):
         return obj.documents.count()
+
+
+class OdometerReadingSerializer(serializers.ModelSerializer):
+    """Odometer reading serializer (manual entries)"""
+    
+    class Meta:
+        model = OdometerReading
+        fields = [
+            'id', 'vehicle', 'mileage', 'reading_date', 'source',
+            'maintenance', 'document', 'created_at'
+        ]
+        read_only_fields = ['id', 'vehicle', 'source', 'maintenance', 'document', 'created_at']
+        extra_kwargs = {'reading_date': {'required': False}}
+    
+    def validate_reading_date(self, value):
+        if value > timezone.now():
+            raise serializers.ValidationError("Reading date cannot be in the future")
+        return value
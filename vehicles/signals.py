@@ -0,0 +1,33 @@
+"""
+Signal handlers for vehicles
+
+Bump the car catalog version after commit on CarBrand / CarModel writes so
+per-process catalog caches never keep pre-commit data under a new version,
+and keep the denormalized vehicle odometer in sync with its readings.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import CarBrand, CarModel, Vehicle, OdometerReading
+from .catalog import invalidate_car_catalog
+from .odometer import refresh_vehicle_odometer
+
+
+@receiver([post_save, post_delete], sender=CarBrand)
+@receiver([post_save, post_delete], sender=CarModel)
+def invalidate_catalog_on_change(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_car_catalog)
+
+
+@receiver(post_save, sender=OdometerReading)
+def refresh_odometer_on_reading_save(sender, instance, **kwargs):
+    refresh_vehicle_odometer(instance.vehicle_id)
+
+
+@receiver(post_delete, sender=OdometerReading)
+def refresh_odometer_on_reading_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Vehicle):
+        # The whole vehicle is being deleted
+        return
+    refresh_vehicle_odometer(instance.vehicle_id)
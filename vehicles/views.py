@@ -3,11 +3,17 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from .models import Vehicle, CarBrand, CarModel
 from .serializers import (
     VehicleSerializer, VehicleCreateSerializer, VehicleDetailSerializer,
-    CarBrandSerializer, CarModelSerializer
+    CarBrandSerializer, CarModelSerializer, OdometerReadingSerializer
 )
+from .catalog import catalog_response
+from .dashboard import parse_dashboard_params, with_dashboard, serialize_dashboard
+from common.pagination import paginate_history
 
 
 
@@ -29,7 +35,16 @@ class CarBrandViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
     
+    @catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['get'])
+    @catalog_response
     def models(self, request, pk=None):
         """Get all models for a specific brand"""
         brand = self.get_object()
@@ -56,6 +71,14 @@ class CarModelViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'brand__name']
     ordering_fields = ['name', 'year_start', 'created_at']
     ordering = ['brand__name', 'name']
+    
+    @catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
 class VehicleViewSet(viewsets.ModelViewSet):
@@ -95,51 +118,109 @@ class VehicleViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get'])
     def maintenances(self, request, pk=None):
-        """Get all maintenances for this vehicle"""
+        """Get the maintenances of this vehicle, newest first (cursor-paginated)"""
         vehicle = self.get_object()
-        maintenances = vehicle.maintenances.all().order_by('-service_date')
         
         # Import here to avoid circular dependency
         from maintenances.serializers import MaintenanceSerializer
-        serializer = MaintenanceSerializer(maintenances, many=True)
-        return Response(serializer.data)
+        return paginate_history(
+            request,
+            vehicle.maintenances.select_related('vehicle', 'created_by', 'performed_by'),
+            MaintenanceSerializer,
+            ordering=('-service_date', '-id')
+        )
     
     @action(detail=True, methods=['get'])
     def documents(self, request, pk=None):
-        """Get all documents for this vehicle"""
+        """Get the documents of this vehicle, newest first (cursor-paginated)"""
         vehicle = self.get_object()
-        documents = vehicle.documents.all().order_by('-created_at')
         
         # Import here to avoid circular dependency
         from documents.serializers import DocumentSerializer
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+        return paginate_history(
+            request, vehicle.documents.all(), DocumentSerializer,
+            ordering=('-created_at', '-id')
+        )
     
     @action(detail=True, methods=['get'])
     def diagnostics(self, request, pk=None):
-        """Get all diagnostics for this vehicle"""
+        """Get the diagnostics of this vehicle, newest first (cursor-paginated)"""
         vehicle = self.get_object()
-        diagnostics = vehicle.diagnostics.all().order_by('-created_at')
         
         # Import here to avoid circular dependency
         from diagnostics.serializers import DiagnosticSerializer
-        serializer = DiagnosticSerializer(diagnostics, many=True)
-        return Response(serializer.data)
+        return paginate_history(
+            request, vehicle.diagnostics.select_related('vehicle'), DiagnosticSerializer,
+            ordering=('-created_at', '-id')
+        )
+    
+    @action(detail=True, methods=['get', 'post'])
+    def odometer(self, request, pk=None):
+        """
+        GET: odometer readings of this vehicle, newest first (cursor-paginated)
+        POST: record a manual reading (mileage, reading_date defaults to now)
+        """
+        vehicle = self.get_object()
+        
+        if request.method == 'POST':
+            serializer = OdometerReadingSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(
+                vehicle=vehicle,
+                source='manual',
+                created_by=request.user,
+                reading_date=serializer.validated_data.get('reading_date') or timezone.now()
+            )
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        
+        return paginate_history(
+            request, vehicle.odometer_readings.all(), OdometerReadingSerializer,
+            ordering=('-reading_date', '-id')
+        )
+    
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        """
+        Everything the vehicle screen shows, in one request
+        
+        Query params: sections (comma-separated, all by default), limit (items per section)
+        """
+        sections, limit = parse_dashboard_params(request.query_params)
+        queryset = with_dashboard(self.get_queryset(), request.user, sections, limit)
+        vehicle = get_object_or_404(queryset, pk=pk)
+        self.check_object_permissions(request, vehicle)
+        return Response(serialize_dashboard(vehicle, sections, self.get_serializer_context()))
+    
+    @action(detail=False, methods=['get'])
+    def fleet_dashboard(self, request):
+        """Dashboards of all the user's vehicles (paginated, same params as dashboard)"""
+        sections, limit = parse_dashboard_params(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(with_dashboard(queryset, request.user, sections, limit))
+        context = self.get_serializer_context()
+        data = [serialize_dashboard(vehicle, sections, context) for vehicle in page]
+        return self.get_paginated_response(data)
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get vehicle statistics for the user"""
-        queryset = self.get_queryset()
+        # One grouped query feeds the total and both breakdowns
+        rows = (
+            self.get_queryset().order_by()
+            .values('fuel_type', 'transmission')
+            .annotate(count=Count('id'))
+        )
         
-        total = queryset.count()
+        total = 0
         by_fuel_type = {}
         by_transmission = {}
         
-        for vehicle in queryset:
-            if vehicle.fuel_type:
-                by_fuel_type[vehicle.fuel_type] = by_fuel_type.get(vehicle.fuel_type, 0) + 1
-            if vehicle.transmission:
-                by_transmission[vehicle.transmission] = by_transmission.get(vehicle.transmission, 0) + 1
+        for row in rows:
+            total += row['count']
+            if row['fuel_type']:
+                by_fuel_type[row['fuel_type']] = by_fuel_type.get(row['fuel_type'], 0) + row['count']
+            if row['transmission']:
+                by_transmission[row['transmission']] = by_transmission.get(row['transmission'], 0) + row['count']
         
         return Response({
             'total': total,